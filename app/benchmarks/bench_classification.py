@@ -0,0 +1,75 @@
+# app/benchmarks/bench_classification.py - Classification ABC / XYZ du catalogue
+"""
+Mesure rapport_service.calculer_classification (parts de valeur consommée,
+coefficient de variation mensuel, valorisation du stock) sur une base temporaire,
+puis la lecture de la matrice et d'une page filtrée.
+
+Usage : python app/benchmarks/bench_classification.py [--produits 100000] [--mouvements 5000000] [--jours 365]
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models import database  # noqa: E402
+from services import rapport_service  # noqa: E402
+
+def remplir(nb_produits, nb_mouvements, nb_jours):
+    """Produits aux prix variés et mouvements pseudo-aléatoires générés par SQLite"""
+    debut = (date.today() - timedelta(days=nb_jours - 1)).isoformat()
+    with database.transaction() as conn:
+        conn.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO produits (reference, nom, quantite, seuil_min, prix_achat, prix_vente)
+            SELECT printf('BENCH-%07d', i), 'Produit ' || i, abs(random()) % 500, 5,
+                   1 + abs(random()) % 100, 2 + abs(random()) % 200 FROM n
+        """, (nb_produits,))
+        premier, dernier = conn.execute("SELECT MIN(id), MAX(id) FROM produits").fetchone()
+        conn.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO mouvements (produit_id, type, quantite, date_mouvement)
+            SELECT ? + abs(random()) % (? - ? + 1),
+                   CASE WHEN abs(random()) % 3 = 0 THEN 'entree' ELSE 'sortie' END,
+                   1 + abs(random()) % 9,
+                   datetime(?, '+' || (abs(random()) % (? * 86400)) || ' seconds')
+            FROM n
+        """, (nb_mouvements, premier, dernier, premier, debut, nb_jours))
+
+def chronometrer(fonction):
+    debut = time.perf_counter()
+    fonction()
+    return (time.perf_counter() - debut) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--produits", type=int, default=100_000)
+    parser.add_argument("--mouvements", type=int, default=5_000_000)
+    parser.add_argument("--jours", type=int, default=365, help="période couverte par les mouvements")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as dossier:
+        database.DB_PATH = Path(dossier) / "bench.db"
+        debut = time.perf_counter()
+        remplir(args.produits, args.mouvements, args.jours)
+        database.rebuild_mouvements_daily()
+        print(f"{args.produits} produits, {args.mouvements} mouvements sur {args.jours} jours "
+              f"(base préparée en {time.perf_counter() - debut:.0f} s)\n")
+
+        for nb_mois in (3, 12):
+            resultat = rapport_service.calculer_classification(nb_mois=nb_mois)
+            print(f"Classification sur {nb_mois:>2} mois : {resultat['duree']:>6.2f} s "
+                  f"({resultat['produits']} produits)")
+
+        print(f"\n{'Matrice ABC x XYZ':<28} {chronometrer(rapport_service.get_matrice_abc_xyz):>8.1f} ms")
+        page = lambda: rapport_service.get_classification_page(('A',), ('Y', 'Z'), page=3)
+        print(f"{'Page 3 des produits AY/AZ':<28} {chronometrer(page):>8.1f} ms")
+        database.close_pool()
+
+if __name__ == "__main__":
+    main()
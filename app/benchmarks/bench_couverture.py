@@ -0,0 +1,69 @@
+# app/benchmarks/bench_couverture.py - Calcul de la couverture de stock
+"""
+Mesure alerte_service.calculer_couverture (consommation moyenne, écart-type,
+point de commande de tout le catalogue) sur une base temporaire.
+Les mouvements sont générés en SQL et agrégés dans mouvements_daily avant la mesure.
+
+Usage : python app/benchmarks/bench_couverture.py [--produits 100000] [--mouvements 10000000] [--jours 365]
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models import database  # noqa: E402
+from services import alerte_service  # noqa: E402
+
+def remplir(nb_produits, nb_mouvements, nb_jours):
+    """Produits et mouvements pseudo-aléatoires générés par SQLite (sans aller-retour Python)"""
+    debut = (date.today() - timedelta(days=nb_jours - 1)).isoformat()
+    with database.transaction() as conn:
+        conn.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO produits (reference, nom, quantite, seuil_min, prix_vente)
+            SELECT printf('BENCH-%07d', i), 'Produit ' || i, abs(random()) % 500, 5, 9.99 FROM n
+        """, (nb_produits,))
+        premier, dernier = conn.execute("SELECT MIN(id), MAX(id) FROM produits").fetchone()
+        conn.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO mouvements (produit_id, type, quantite, date_mouvement)
+            SELECT ? + abs(random()) % (? - ? + 1),
+                   CASE WHEN abs(random()) % 3 = 0 THEN 'entree' ELSE 'sortie' END,
+                   1 + abs(random()) % 9,
+                   datetime(?, '+' || (abs(random()) % (? * 86400)) || ' seconds')
+            FROM n
+        """, (nb_mouvements, premier, dernier, premier, debut, nb_jours))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--produits", type=int, default=100_000)
+    parser.add_argument("--mouvements", type=int, default=10_000_000)
+    parser.add_argument("--jours", type=int, default=365, help="période couverte par les mouvements")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as dossier:
+        database.DB_PATH = Path(dossier) / "bench.db"
+        debut = time.perf_counter()
+        remplir(args.produits, args.mouvements, args.jours)
+        database.rebuild_mouvements_daily()
+        print(f"{args.produits} produits, {args.mouvements} mouvements sur {args.jours} jours "
+              f"(base préparée en {time.perf_counter() - debut:.0f} s)\n")
+
+        for fenetre in (7, 30, 90):
+            resultat = alerte_service.calculer_couverture(fenetre_jours=fenetre)
+            print(f"Fenêtre {fenetre:>3} j : {resultat['duree']:>6.2f} s, "
+                  f"{resultat['en_alerte']} produits sous le point de commande")
+
+        debut = time.perf_counter()
+        alerte_service.get_top_alertes_couverture(5)
+        print(f"\nTop 5 des alertes (lecture) : {(time.perf_counter() - debut) * 1000:.1f} ms")
+        database.close_pool()
+
+if __name__ == "__main__":
+    main()
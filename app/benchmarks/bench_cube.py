@@ -0,0 +1,113 @@
+# app/benchmarks/bench_cube.py - Cube colonnaire des mouvements
+"""
+Mesure la construction du cube de rapport_service, son rechargement depuis les
+fichiers .npy, son rafraîchissement incrémental et des ventilations par masques
+NumPy, comparées à la lecture de get_mouvements suivie d'un groupby pandas.
+
+Usage : python app/benchmarks/bench_cube.py [--mouvements 1000000] [--produits 2000]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models import database  # noqa: E402
+from services import rapport_service  # noqa: E402
+
+FIN = date.today()
+DEBUT = FIN - timedelta(days=365)
+
+def remplir(nb_mouvements, nb_produits, nb_categories=12, nb_fournisseurs=40):
+    """Produits répartis en catégories et fournisseurs, mouvements sur l'année écoulée"""
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO categories (nom) VALUES (?)",
+                         [(f"Bench {i}",) for i in range(nb_categories)])
+        conn.executemany("INSERT INTO fournisseurs (nom) VALUES (?)",
+                         [(f"Fournisseur bench {i}",) for i in range(nb_fournisseurs)])
+        categories = [r[0] for r in conn.execute("SELECT id FROM categories")]
+        fournisseurs = [r[0] for r in conn.execute("SELECT id FROM fournisseurs")]
+        conn.executemany(
+            "INSERT INTO produits (reference, nom, categorie_id, fournisseur_id, quantite, prix_vente) "
+            "VALUES (?, ?, ?, ?, 1000, ?)",
+            [(f"BENCH-{i:06d}", f"Produit {i}", random.choice(categories), random.choice(fournisseurs),
+              round(random.uniform(1, 100), 2)) for i in range(nb_produits)]
+        )
+        ids = [r[0] for r in conn.execute("SELECT id FROM produits")]
+        ajouter_mouvements(conn, ids, nb_mouvements)
+    return ids, categories, fournisseurs
+
+def ajouter_mouvements(conn, ids, nombre):
+    origine = datetime.combine(DEBUT, datetime.min.time())
+    conn.executemany(
+        "INSERT INTO mouvements (produit_id, type, quantite, date_mouvement) VALUES (?, ?, ?, ?)",
+        ((random.choice(ids), random.choice(('entree', 'sortie')), random.randint(1, 9),
+          (origine + timedelta(seconds=random.randint(0, 365 * 86400))).strftime('%Y-%m-%d %H:%M:%S'))
+         for _ in range(nombre))
+    )
+
+def chronometrer(fonction):
+    debut = time.perf_counter()
+    fonction()
+    return (time.perf_counter() - debut) * 1000
+
+def via_pandas(filtres, par):
+    """Ancien chemin : lecture jointe de tout l'historique filtré puis groupby"""
+    filtres = dict(filtres, limit=None)
+    categories = filtres.pop('categorie_id', None)
+    df = pd.DataFrame(database.get_mouvements(filtres))
+    produits = pd.DataFrame(database.get_all_produits())[['id', 'categorie_id', 'fournisseur_id']]
+    df = df.merge(produits, left_on='produit_id', right_on='id', suffixes=('', '_produit'))
+    if categories:
+        df = df[df['categorie_id'].isin(categories)]
+    return df.groupby(list(par))['quantite'].sum() if par else df['quantite'].sum()
+
+def oublier_cube():
+    """Simule un redémarrage : l'état en mémoire est perdu, les fichiers restent"""
+    rapport_service._cube.update(dossier=None, generation=None, persiste=None)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mouvements", type=int, default=1_000_000)
+    parser.add_argument("--produits", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as dossier:
+        database.DB_PATH = Path(dossier) / "bench.db"
+        ids, categories, fournisseurs = remplir(args.mouvements, args.produits)
+        print(f"{args.mouvements} mouvements, {args.produits} produits\n")
+
+        print(f"{'Construction complète':<34} {chronometrer(rapport_service.reconstruire_cube):>10.1f} ms")
+        oublier_cube()
+        print(f"{'Rechargement (.npy en mmap)':<34} {chronometrer(rapport_service.get_cube):>10.1f} ms")
+        with database.transaction() as conn:
+            ajouter_mouvements(conn, ids, 1000)
+        print(f"{'Rafraîchissement (+1000 lignes)':<34} {chronometrer(rapport_service.get_cube):>10.1f} ms")
+        print(f"{'Sans changement':<34} {chronometrer(rapport_service.get_cube):>10.1f} ms\n")
+
+        un_an = {'date_debut': DEBUT, 'date_fin': FIN}
+        scenarios = {
+            "Total un an": (un_an, None, None),
+            "Par catégorie": (un_an, 'categorie', ['categorie_id']),
+            "Sorties par fournisseur": (dict(un_an, type_mouvement='sortie'), 'fournisseur', ['fournisseur_id']),
+            "3 catégories par produit": (dict(un_an, categorie_id=categories[:3]), 'produit', ['produit_id']),
+            "Catégorie x fournisseur x type": (un_an, ('categorie', 'fournisseur', 'type'),
+                                               ['categorie_id', 'fournisseur_id', 'type']),
+        }
+        print(f"{'Ventilation':<34} {'Cube':>10} {'pandas':>10}  (ms)")
+        for nom, (filtres, par, colonnes) in scenarios.items():
+            cube = chronometrer(lambda: rapport_service.somme_cube(filtres, par))
+            pandas = chronometrer(lambda: via_pandas(filtres, colonnes))
+            print(f"{nom:<34} {cube:>10.1f} {pandas:>10.1f}")
+        database.close_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# app/benchmarks/bench_ecritures.py - Débit des écritures de stock concurrentes
+"""
+Compare des sessions concurrentes qui écrivent chacune directement en base
+(database.update_stock) et les mêmes écritures soumises au thread rédacteur
+unique de stock_service (commit groupé).
+
+Usage : python app/benchmarks/bench_ecritures.py [--sessions 16] [--mouvements 200]
+"""
+
+import argparse
+import logging
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models import database  # noqa: E402
+from services import stock_service  # noqa: E402
+
+NB_PRODUITS = 500
+
+def preparer_base():
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO produits (reference, nom, quantite, seuil_min) VALUES (?, ?, 1000000, 5)",
+            [(f"BENCH-{i:05d}", f"Produit {i}") for i in range(NB_PRODUITS)]
+        )
+        return [r[0] for r in conn.execute("SELECT id FROM produits WHERE reference LIKE 'BENCH-%'")]
+
+def session(ecrire, ids, nb_mouvements, compteurs, verrou):
+    for _ in range(nb_mouvements):
+        type_mouvement = random.choice(('entree', 'sortie'))
+        try:
+            ecrire(random.choice(ids), random.randint(1, 5), type_mouvement, "bench")
+            cle = 'ok'
+        except sqlite3.OperationalError:
+            cle = 'verrou'
+        except ValueError:
+            cle = 'rejet'
+        with verrou:
+            compteurs[cle] += 1
+    database.release_connection()
+
+def mesurer(ecrire, ids, nb_sessions, nb_mouvements):
+    compteurs = {'ok': 0, 'verrou': 0, 'rejet': 0}
+    verrou = threading.Lock()
+    threads = [
+        threading.Thread(target=session, args=(ecrire, ids, nb_mouvements, compteurs, verrou))
+        for _ in range(nb_sessions)
+    ]
+    debut = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duree = time.perf_counter() - debut
+    return {'par_seconde': compteurs['ok'] / duree, 'verrou': compteurs['verrou'], 'duree': duree}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16, help="threads d'écriture simultanés")
+    parser.add_argument("--mouvements", type=int, default=200, help="mouvements par session")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as dossier:
+        database.DB_PATH = Path(dossier) / "bench.db"
+        ids = preparer_base()
+
+        print(f"{args.sessions} sessions x {args.mouvements} mouvements ({database.PROFIL_SQLITE})\n")
+        print(f"{'Mode':<22} {'Mouvements/s':>14} {'Verrous':>9} {'Durée (s)':>10}")
+        modes = {
+            "Écriture directe": database.update_stock,
+            "Rédacteur unique": stock_service.enregistrer_mouvement,
+        }
+        for nom, ecrire in modes.items():
+            res = mesurer(ecrire, ids, args.sessions, args.mouvements)
+            print(f"{nom:<22} {res['par_seconde']:>14.0f} {res['verrou']:>9} {res['duree']:>10.2f}")
+
+        stats = stock_service.get_stats_redacteur()
+        print(f"\nRédacteur : {stats['groupes']} commits, {stats['taille_moyenne']:.1f} commandes "
+              f"par groupe en moyenne (max {stats['plus_grand_groupe']})")
+        stock_service.arreter()
+        database.close_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# app/benchmarks/bench_historique.py - Stock à une date passée
+"""
+Mesure historique_service.get_stock_at (instantané le plus proche + mouvements
+depuis) face au rejeu complet du journal des mouvements, sur une base temporaire
+remplie jour par jour avec un instantané en fin de chaque journée. Vérifie au
+passage que les deux méthodes donnent le même stock.
+
+Usage : python app/benchmarks/bench_historique.py [--produits 100000] [--jours 60] [--mouvements-jour 30000]
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models import database  # noqa: E402
+from services import historique_service  # noqa: E402
+
+def remplir(nb_produits, nb_jours, mouvements_jour):
+    """Une journée de mouvements générés par SQLite puis un instantané daté de la fin de journée"""
+    premier_jour = date.today() - timedelta(days=nb_jours)
+    with database.transaction() as conn:
+        conn.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO produits (reference, nom, quantite, seuil_min, prix_vente, date_creation)
+            SELECT printf('BENCH-%07d', i), 'Produit ' || i, 1000, 5, 1 + abs(random()) % 100, ? FROM n
+        """, (nb_produits, (premier_jour - timedelta(days=1)).isoformat()))
+        premier, dernier = conn.execute(
+            "SELECT MIN(id), MAX(id) FROM produits WHERE reference LIKE 'BENCH-%'"
+        ).fetchone()
+
+    for j in range(nb_jours):
+        jour = premier_jour + timedelta(days=j)
+        with database.transaction() as conn:
+            depuis = conn.execute("SELECT COALESCE(MAX(id), 0) FROM mouvements").fetchone()[0]
+            conn.execute("""
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                INSERT INTO mouvements (produit_id, type, quantite, date_mouvement)
+                SELECT ? + abs(random()) % (? - ? + 1),
+                       CASE WHEN abs(random()) % 2 = 0 THEN 'entree' ELSE 'sortie' END,
+                       1 + abs(random()) % 9,
+                       datetime(?, '+' || (abs(random()) % 86400) || ' seconds')
+                FROM n
+            """, (mouvements_jour, premier, dernier, premier, jour.isoformat()))
+            conn.execute(f"""
+                UPDATE produits SET quantite = quantite + d.delta
+                FROM (
+                    SELECT produit_id, SUM({historique_service.DELTA_MOUVEMENT}) as delta
+                    FROM mouvements WHERE id > ? GROUP BY produit_id
+                ) d
+                WHERE produits.id = d.produit_id
+            """, (depuis,))
+        snapshot_id = historique_service.prendre_snapshot()['snapshot_id']
+        with database.transaction() as conn:
+            conn.execute("UPDATE stock_snapshots SET date_snapshot = ? WHERE id = ?",
+                         (f"{jour.isoformat()} 23:59:59", snapshot_id))
+    return premier_jour
+
+def rejeu_complet(jour):
+    """Ancien chemin : stock initial + somme de tout le journal jusqu'à la date"""
+    fin = (jour + timedelta(days=1)).isoformat()
+    lignes = database.fetch_all(f"""
+        SELECT produit_id, SUM({historique_service.DELTA_MOUVEMENT}) as delta
+        FROM mouvements WHERE date_mouvement < ?
+        GROUP BY produit_id
+    """, (fin,))
+    return {ligne['produit_id']: ligne['delta'] for ligne in lignes}
+
+def chronometrer(fonction, *args):
+    debut = time.perf_counter()
+    resultat = fonction(*args)
+    return resultat, (time.perf_counter() - debut) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--produits", type=int, default=100_000)
+    parser.add_argument("--jours", type=int, default=60)
+    parser.add_argument("--mouvements-jour", type=int, default=30_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as dossier:
+        database.DB_PATH = Path(dossier) / "bench.db"
+        debut = time.perf_counter()
+        premier_jour = remplir(args.produits, args.jours, args.mouvements_jour)
+        print(f"{args.produits} produits, {args.jours} jours x {args.mouvements_jour} mouvements, "
+              f"un instantané par jour (base préparée en {time.perf_counter() - debut:.0f} s)\n")
+
+        _, duree = chronometrer(historique_service.prendre_snapshot)
+        print(f"{'Nouvel instantané':<28} {duree:>10.1f} ms\n")
+
+        print(f"{'Date':<12} {'Instantané':>12} {'Rejeu':>10}  (ms)  écarts")
+        for recul in (args.jours - 1, args.jours // 2, 1):
+            jour = date.today() - timedelta(days=recul)
+            database.vider_cache()
+            stock, duree_snapshot = chronometrer(historique_service.get_stock_at, jour)
+            deltas, duree_rejeu = chronometrer(rejeu_complet, jour)
+            ecarts = sum(
+                1 for ligne in stock
+                if ligne['reference'].startswith('BENCH-')
+                and ligne['quantite'] != 1000 + deltas.get(ligne['produit_id'], 0)
+            )
+            print(f"{jour.isoformat():<12} {duree_snapshot:>12.1f} {duree_rejeu:>10.1f}        {ecarts}")
+
+        database.vider_cache()
+        _, duree = chronometrer(historique_service.get_valorisation_at, date.today() - timedelta(days=1), 10)
+        print(f"\n{'Valorisation + top 10 (J-1)':<28} {duree:>10.1f} ms")
+        database.close_pool()
+
+if __name__ == "__main__":
+    main()
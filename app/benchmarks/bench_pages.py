@@ -0,0 +1,79 @@
+# app/benchmarks/bench_pages.py - Coût de démarrage et de rerun des pages
+"""
+Compare le coût de chargement des pages à chaque rerun Streamlit :
+- "reload"   : importlib.reload de la page à chaque rerun (ancien comportement)
+- "registre" : module importé une seule fois puis servi par le registre de main.py
+Mesure aussi le temps d'import à froid de chaque page (processus neuf).
+
+Usage : python app/benchmarks/bench_pages.py [--reruns 50]
+Attention : importer les pages initialise la base configurée dans config.py.
+"""
+
+import argparse
+import importlib
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+PAGES = [
+    "pages.dashboard",
+    "pages._Produits",
+    "pages._Inventaire",
+    "pages._Fournisseurs",
+    "pages._Rapports",
+    "pages._Parameters",
+]
+
+def import_a_froid(module):
+    """Temps d'import d'un module dans un interpréteur neuf (secondes)"""
+    code = (
+        "import time, logging; logging.disable(logging.CRITICAL); t = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - t)"
+    )
+    sortie = subprocess.run(
+        [sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return float(sortie.strip().splitlines()[-1])
+
+def rerun_reload(modules, reruns):
+    debut = time.perf_counter()
+    for _ in range(reruns):
+        for module in modules:
+            importlib.reload(module)
+    return (time.perf_counter() - debut) / (reruns * len(modules))
+
+def rerun_registre(modules, reruns):
+    registre = {m.__name__: m for m in modules}
+    debut = time.perf_counter()
+    for _ in range(reruns):
+        for module in modules:
+            page = registre.get(module.__name__)
+            if page is None:
+                page = importlib.import_module(module.__name__)
+    return (time.perf_counter() - debut) / (reruns * len(modules))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    print("Import à froid (processus neuf) :")
+    for module in PAGES:
+        print(f"  {module:<22} {import_a_froid(module) * 1000:8.1f} ms")
+
+    logging.disable(logging.CRITICAL)
+    modules = [importlib.import_module(m) for m in PAGES]
+    t_reload = rerun_reload(modules, args.reruns)
+    t_registre = rerun_registre(modules, args.reruns)
+
+    print("\nChargement de page par rerun :")
+    print(f"  reload   {t_reload * 1e6:10.1f} µs")
+    print(f"  registre {t_registre * 1e6:10.1f} µs  (x{t_reload / t_registre:,.0f})")
+
+if __name__ == "__main__":
+    main()
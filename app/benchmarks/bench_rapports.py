@@ -0,0 +1,79 @@
+# app/benchmarks/bench_rapports.py - Temps de calcul de la page Rapports
+"""
+Mesure le temps des agrégats de la page Rapports (résumé, série, top produits,
+première page du détail) sur une base temporaire d'un an de mouvements.
+
+Usage : python app/benchmarks/bench_rapports.py [--mouvements 1000000] [--produits 2000]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models import database  # noqa: E402
+from services import rapport_service  # noqa: E402
+
+FIN = date.today()
+DEBUT = FIN - timedelta(days=365)
+
+def remplir(nb_mouvements, nb_produits):
+    """Produits et mouvements répartis aléatoirement sur l'année écoulée"""
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO produits (reference, nom, categorie_id, quantite, prix_vente) VALUES (?, ?, 1, 1000, 9.99)",
+            [(f"BENCH-{i:06d}", f"Produit {i}") for i in range(nb_produits)]
+        )
+        ids = [r[0] for r in conn.execute("SELECT id FROM produits")]
+        origine = datetime.combine(DEBUT, datetime.min.time())
+        conn.executemany(
+            "INSERT INTO mouvements (produit_id, type, quantite, date_mouvement) VALUES (?, ?, ?, ?)",
+            ((random.choice(ids), random.choice(('entree', 'sortie')), random.randint(1, 9),
+              (origine + timedelta(seconds=random.randint(0, 365 * 86400))).strftime('%Y-%m-%d %H:%M:%S'))
+             for _ in range(nb_mouvements))
+        )
+    debut = time.perf_counter()
+    database.rebuild_mouvements_daily()
+    return time.perf_counter() - debut, ids
+
+def chronometrer(fonction):
+    debut = time.perf_counter()
+    fonction()
+    return (time.perf_counter() - debut) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mouvements", type=int, default=1_000_000)
+    parser.add_argument("--produits", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as dossier:
+        database.DB_PATH = Path(dossier) / "bench.db"
+        duree_agregats, ids = remplir(args.mouvements, args.produits)
+        print(f"{args.mouvements} mouvements, agrégats construits en {duree_agregats:.1f} s\n")
+
+        scenarios = {
+            "Un an, tous types": {'date_debut': DEBUT, 'date_fin': FIN},
+            "Un an, sorties": {'date_debut': DEBUT, 'date_fin': FIN, 'type_mouvement': 'sortie'},
+            "Un an, un produit": {'date_debut': DEBUT, 'date_fin': FIN, 'produit_id': ids[0]},
+            "30 jours": {'date_debut': FIN - timedelta(days=30), 'date_fin': FIN},
+        }
+        print(f"{'Scénario':<20} {'Résumé':>8} {'Série':>8} {'Top':>8} {'Détail':>8} {'Total':>8}  (ms)")
+        for nom, filtres in scenarios.items():
+            temps = [
+                chronometrer(lambda: rapport_service.get_resume(filtres)),
+                chronometrer(lambda: rapport_service.get_serie(filtres)),
+                chronometrer(lambda: rapport_service.get_top_produits(filtres)),
+                chronometrer(lambda: rapport_service.get_detail_page(filtres)),
+            ]
+            print(f"{nom:<20} " + " ".join(f"{t:>8.1f}" for t in temps) + f" {sum(temps):>8.1f}")
+        database.close_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# app/benchmarks/bench_wal.py - Débit lecture/écriture concurrent selon le profil SQLite
+"""
+Compare le débit de lectures (tableau de bord) et d'écritures (entrées/sorties)
+concurrentes entre les profils SQLite définis dans config.py.
+
+Usage : python app/benchmarks/bench_wal.py [--duree 5] [--lecteurs 4] [--redacteurs 2]
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import PROFILS_SQLITE  # noqa: E402
+
+NB_PRODUITS = 2000
+
+def preparer_base(chemin):
+    """Crée une base de test avec produits et mouvements"""
+    conn = sqlite3.connect(chemin)
+    conn.executescript("""
+        CREATE TABLE produits (
+            id INTEGER PRIMARY KEY, nom TEXT, quantite INTEGER,
+            seuil_min INTEGER, prix_vente REAL
+        );
+        CREATE TABLE mouvements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, produit_id INTEGER,
+            type TEXT, quantite INTEGER, date_mouvement TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    conn.executemany(
+        "INSERT INTO produits (id, nom, quantite, seuil_min, prix_vente) VALUES (?, ?, ?, ?, ?)",
+        [(i, f"Produit {i}", 100, 5, 9.99) for i in range(1, NB_PRODUITS + 1)]
+    )
+    conn.commit()
+    conn.close()
+
+def ouvrir(chemin, pragmas):
+    conn = sqlite3.connect(chemin, check_same_thread=False)
+    for pragma, valeur in pragmas.items():
+        conn.execute(f"PRAGMA {pragma} = {valeur}")
+    return conn
+
+def lecteur(chemin, pragmas, fin, compteurs):
+    conn = ouvrir(chemin, pragmas)
+    while time.monotonic() < fin:
+        try:
+            conn.execute("SELECT COUNT(*), SUM(quantite * prix_vente) FROM produits").fetchone()
+            conn.execute("SELECT COUNT(*) FROM produits WHERE quantite <= seuil_min").fetchone()
+            compteurs['lectures'] += 1
+        except sqlite3.OperationalError:
+            compteurs['erreurs'] += 1
+    conn.close()
+
+def redacteur(chemin, pragmas, fin, compteurs):
+    conn = ouvrir(chemin, pragmas)
+    while time.monotonic() < fin:
+        produit_id = random.randint(1, NB_PRODUITS)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE produits SET quantite = quantite + 1 WHERE id = ?", (produit_id,))
+            conn.execute(
+                "INSERT INTO mouvements (produit_id, type, quantite) VALUES (?, 'entree', 1)",
+                (produit_id,)
+            )
+            conn.commit()
+            compteurs['ecritures'] += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            compteurs['erreurs'] += 1
+    conn.close()
+
+def mesurer(profil, duree, nb_lecteurs, nb_redacteurs):
+    pragmas = PROFILS_SQLITE[profil]
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = str(Path(dossier) / "bench.db")
+        preparer_base(chemin)
+        ouvrir(chemin, pragmas).close()  # bascule éventuelle en WAL avant la mesure
+
+        compteurs = {'lectures': 0, 'ecritures': 0, 'erreurs': 0}
+        fin = time.monotonic() + duree
+        threads = (
+            [threading.Thread(target=lecteur, args=(chemin, pragmas, fin, compteurs))
+             for _ in range(nb_lecteurs)] +
+            [threading.Thread(target=redacteur, args=(chemin, pragmas, fin, compteurs))
+             for _ in range(nb_redacteurs)]
+        )
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return {cle: valeur / duree for cle, valeur in compteurs.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duree", type=float, default=5.0, help="durée de chaque mesure (s)")
+    parser.add_argument("--lecteurs", type=int, default=4)
+    parser.add_argument("--redacteurs", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'Profil':<12} {'Lectures/s':>12} {'Écritures/s':>12} {'Erreurs/s':>10}")
+    for profil in PROFILS_SQLITE:
+        res = mesurer(profil, args.duree, args.lecteurs, args.redacteurs)
+        print(f"{profil:<12} {res['lectures']:>12.0f} {res['ecritures']:>12.0f} {res['erreurs']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# app/components/selecteur_produit.py - Sélecteur de produit avec recherche
+import streamlit as st
+from models import database
+
+
+def selecteur_produit(cle, libelle="Produit *", en_stock=False, optionnel=False, aide=None):
+    """
+    Champ de recherche (début de référence ou de nom) suivi d'une liste limitée
+    aux meilleures correspondances. Retourne le produit choisi, relu par sa clé
+    primaire, ou None.
+
+    À placer hors d'un st.form : la liste doit se mettre à jour pendant la saisie.
+    Les suggestions et les fiches sont partagées via le cache de lecture de
+    models.database : plusieurs onglets affichés dans le même rerun ne relancent
+    pas la même requête.
+    """
+    recherche = st.text_input(
+        f"🔍 {libelle.rstrip(' *')}",
+        key=f"{cle}_recherche",
+        placeholder="Référence ou début du nom...",
+    )
+    suggestions = database.suggest_produits(recherche, en_stock=en_stock)
+
+    libelles = {p['id']: f"{p['reference']} - {p['nom']} (Stock: {p['quantite']})" for p in suggestions}
+    options = list(libelles)
+    if optionnel:
+        options.insert(0, None)
+    if not options:
+        st.warning("Aucun produit ne correspond à la recherche")
+        return None
+
+    produit_id = st.selectbox(
+        libelle,
+        options=options,
+        format_func=lambda x: libelles[x] if x is not None else "Tous",
+        key=f"{cle}_id",
+        help=aide or f"Les {database.SUGGESTIONS_MAX} meilleures correspondances sont proposées",
+    )
+    if produit_id is None:
+        return None
+    return database.get_produit_by_id(produit_id)
@@ -9,18 +9,74 @@ STATIC_DIR = BASE_DIR / "static"
 
 # Base de données
 DB_PATH = DATA_DIR / "stock.db"
+BACKUP_DIR = DATA_DIR / "backup"
+
+# Exports CSV / Excel écrits sur le serveur
+EXPORT_DIR = Path(os.getenv("STOCK_EXPORT_DIR", DATA_DIR / "exports"))
+
+# Profils de stockage SQLite : PRAGMA appliqués à l'ouverture de chaque connexion.
+# - "defaut"     : comportement SQLite d'origine (journal rollback, les lecteurs
+#                  bloquent les écritures et inversement).
+# - "production" : journal WAL (lecteurs et rédacteur ne se bloquent plus),
+#                  synchronous NORMAL (fsync au checkpoint uniquement, sûr en WAL),
+#                  64 Mo de cache de pages, 256 Mo de mmap, tables temporaires en
+#                  mémoire et 5 s d'attente sur un verrou avant "database is locked".
+PROFILS_SQLITE = {
+    "defaut": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "production": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
+PROFIL_SQLITE = os.getenv("STOCK_PROFIL_SQLITE", "production")
+
+# Durée de vie (secondes) des statistiques de la barre latérale en cache.
+# Toute écriture les invalide immédiatement ; le délai borne seulement l'âge
+# des valeurs affichées.
+CACHE_TTL_STATISTIQUES = float(os.getenv("STOCK_CACHE_TTL_STATS", "30"))
+
+# Écritures de stock (services/stock_service.py) : un thread rédacteur unique
+# écrit en une seule transaction (un seul commit) les commandes accumulées
+# pendant l'écriture du groupe précédent, plus celles reçues dans une fenêtre
+# d'attente supplémentaire, dans la limite de GROUPE_MAX commandes.
+# Les sessions attendent leur résultat : une fenêtre non nulle ajoute de la
+# latence et ne paie que si le commit est coûteux (fsync lent).
+ECRITURE_FENETRE_MS = float(os.getenv("STOCK_ECRITURE_FENETRE_MS", "0"))
+ECRITURE_GROUPE_MAX = int(os.getenv("STOCK_ECRITURE_GROUPE_MAX", "200"))
 
 # Paramètres application
 APP_NAME = "Gestion Stock Pro"
 VERSION = "1.0.0"
 AUTHORS = ["IMANE", "DOHA"]
 
+# Mode développement : recharge les pages à chaque rerun (rechargement à chaud)
+DEV_MODE = os.getenv("STOCK_DEV_MODE", "0") == "1"
+
 # Paramètres stock
 SEUIL_ALERTE_DEFAUT = 5
 DEVISE = "€"
 
-# Créer les dossiers nécessaires
-for dir_path in [DATA_DIR, STATIC_DIR]:
-    dir_path.mkdir(exist_ok=True)
+# Alertes de couverture (services/alerte_service.py) : consommation moyenne des
+# sorties sur une fenêtre glissante, délai de réapprovisionnement attendu et
+# coefficient du stock de sécurité (1.65 : ~95 % des délais couverts).
+COUVERTURE_FENETRE_JOURS = int(os.getenv("STOCK_COUVERTURE_FENETRE", "30"))
+COUVERTURE_DELAI_JOURS = float(os.getenv("STOCK_COUVERTURE_DELAI", "7"))
+COUVERTURE_COEF_SECURITE = float(os.getenv("STOCK_COUVERTURE_COEF_SECURITE", "1.65"))
 
-print(f"✅ Configuration chargée - Base: {DB_PATH}")
\ No newline at end of file
+# Instantanés du stock (services/historique_service.py) : quantité et valeur de
+# chaque produit, pris au plus toutes les SNAPSHOT_INTERVALLE_HEURES et conservés
+# SNAPSHOT_RETENTION_JOURS jours (0 : sans limite). Le stock à une date passée
+# part de l'instantané le plus proche et n'applique que les mouvements suivants.
+SNAPSHOT_INTERVALLE_HEURES = float(os.getenv("STOCK_SNAPSHOT_INTERVALLE_HEURES", "24"))
+SNAPSHOT_RETENTION_JOURS = int(os.getenv("STOCK_SNAPSHOT_RETENTION_JOURS", "90"))
@@ -3,12 +3,11 @@ from .config import DB_PATH, DATA_DIR, BACKUP_DIR
 import sqlite3
 import os
 
-print("=" * 50)
-print("🚀 INITIALISATION DU SYSTÈME DE GESTION DE STOCK")
-print("=" * 50)
-
 def initialiser_application():
     """Initialise toute l'application"""
+    print("=" * 50)
+    print("🚀 INITIALISATION DU SYSTÈME DE GESTION DE STOCK")
+    print("=" * 50)
     
     # 1. Vérifier la structure
     print("📁 Vérification de la structure des dossiers...")
@@ -19,8 +18,8 @@ def initialiser_application():
     
     # 2. Initialiser la base de données
     print("\n🗃️  Initialisation de la base de données...")
-    from .models.database import init_database, create_demo_data
-    init_database()
+    from .models.database import assurer_schema
+    assurer_schema()
     
     # 3. Vérifier les données de démo
     print("\n📊 Vérification des données...")
@@ -56,8 +55,6 @@ def initialiser_application():
     print("=" * 50)
 
 # Exécuter l'initialisation si ce fichier est exécuté directement
+# (python -m app.init) ; l'import seul n'a plus d'effet de bord
 if __name__ == "__main__":
-    initialiser_application()
-else:
-    # Exécuter automatiquement quand importé
     initialiser_application()
\ No newline at end of file
@@ -62,29 +62,39 @@ def show_sidebar():
         
         return page
 import importlib
+from config import DEV_MODE
 
-def load_page(page_name):
-    """Charge dynamiquement une page"""
-    try:
-        if page_name == "🏠 Tableau de Bord":
-            import pages.dashboard as page
-        elif page_name == "📦 Gestion Produits":
-            import pages._Produits as page
-        elif page_name == "📊 Inventaire & Stock":
-            import pages._Inventaire as page
-        elif page_name == "👥 Fournisseurs":
-            import pages._Fournisseurs as page
-        elif page_name == "📈 Rapports":
-            import pages._Rapports as page
-        elif page_name == "⚙️ Paramètres":
-            import pages._Parameters as page
-        else:
-            st.error("Page non trouvée")
-            return None
+# Registre des pages : libellé du menu -> module
+PAGES = {
+    "🏠 Tableau de Bord": "pages.dashboard",
+    "📦 Gestion Produits": "pages._Produits",
+    "📊 Inventaire & Stock": "pages._Inventaire",
+    "👥 Fournisseurs": "pages._Fournisseurs",
+    "📈 Rapports": "pages._Rapports",
+    "⚙️ Paramètres": "pages._Parameters",
+}
 
-        # Forcer le rechargement si le module a déjà été importé
-        importlib.reload(page)
+@st.cache_resource
+def registre_pages():
+    """Modules de pages déjà importés, partagés entre les reruns et les sessions"""
+    return {}
 
+def load_page(page_name):
+    """Charge une page : import unique, rechargement à chaque rerun en mode dev seulement"""
+    module_name = PAGES.get(page_name)
+    if module_name is None:
+        st.error("Page non trouvée")
+        return None
+
+    registre = registre_pages()
+    try:
+        page = registre.get(module_name)
+        if page is None:
+            page = importlib.import_module(module_name)
+        elif DEV_MODE:
+            # Rechargement à chaud pour le développement (STOCK_DEV_MODE=1)
+            page = importlib.reload(page)
+        registre[module_name] = page
         return page
     except ImportError as e:
         st.error(f"Erreur de chargement de la page: {e}")
@@ -5,11 +5,25 @@ Version fonctionnelle (sans POO complexe)
 """
 
 import sqlite3
-import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from collections import OrderedDict
+from contextlib import contextmanager
+import atexit
+import base64
+import functools
+import itertools
+import json
 import logging
 import os
+import re
+import threading
+import time
+
+try:
+    from config import PROFILS_SQLITE, PROFIL_SQLITE, CACHE_TTL_STATISTIQUES
+except ImportError:  # import via le paquet app (app/init.py)
+    from ..config import PROFILS_SQLITE, PROFIL_SQLITE, CACHE_TTL_STATISTIQUES
 
 # ============================================================================
 # CONFIGURATION
@@ -20,9 +34,8 @@ BASE_DIR = Path(__file__).parent.parent
 DB_PATH = BASE_DIR / "data" / "stock.db"
 BACKUP_DIR = BASE_DIR / "data" / "backup"
 
-# Créer les dossiers si nécessaire
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+# Version du schéma attendue (PRAGMA user_version) : à incrémenter à chaque évolution du DDL
+SCHEMA_VERSION = 11
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -33,64 +46,810 @@ logger = logging.getLogger(__name__)
 # ============================================================================
 
 def get_connection():
-    """Retourne une connexion à la base de données SQLite"""
+    """Retourne une connexion dédiée (non poolée) à la base de données SQLite"""
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row  # Retourne des dictionnaires
     return conn
 
+# ============================================================================
+# POOL DE CONNEXIONS
+# ============================================================================
+
+# Nombre maximal de connexions persistantes (une par thread)
+POOL_TAILLE_MAX = 16
+# Temps d'attente maximal (secondes) quand le pool est saturé
+POOL_DELAI_ATTENTE = 5.0
+
+# PRAGMA appliqués une seule fois, à la création de chaque connexion (voir config.py)
+if PROFIL_SQLITE not in PROFILS_SQLITE:
+    logger.warning(f"Profil SQLite inconnu '{PROFIL_SQLITE}', utilisation du profil 'defaut'")
+PRAGMAS_CONNEXION = PROFILS_SQLITE.get(PROFIL_SQLITE, PROFILS_SQLITE["defaut"])
+
+_pool_condition = threading.Condition()
+_pool = {}  # ident du thread -> (thread, connexion)
+
+def _creer_connexion():
+    """Ouvre une connexion destinée au pool et la configure"""
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for pragma, valeur in PRAGMAS_CONNEXION.items():
+        conn.execute(f"PRAGMA {pragma} = {valeur}")
+    return conn
+
+def _connexion_saine(conn):
+    """Vérifie qu'une connexion répond et n'a pas de transaction en suspens"""
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("SELECT 1").fetchone()
+        return True
+    except sqlite3.Error:
+        return False
+
+def _recuperer_connexion_orpheline():
+    """Reprend la connexion d'un thread terminé (le cache de pages reste chaud)"""
+    for ident, (thread, conn) in list(_pool.items()):
+        if thread.is_alive():
+            continue
+        del _pool[ident]
+        if _connexion_saine(conn):
+            return conn
+        conn.close()
+    return None
+
+def get_pooled_connection():
+    """
+    Retourne la connexion persistante du thread courant.
+    La connexion ne doit pas être fermée par l'appelant.
+    Le schéma est vérifié (et créé si besoin) à la première utilisation du processus.
+    """
+    conn = _connexion_du_thread()
+    if not _bootstrap['pret']:
+        _assurer_schema(conn)
+    return conn
+
+def _connexion_du_thread():
+    """Connexion du pool attribuée au thread courant (créée ou reprise si besoin)"""
+    thread = threading.current_thread()
+    limite = time.monotonic() + POOL_DELAI_ATTENTE
+
+    with _pool_condition:
+        entree = _pool.get(thread.ident)
+        if entree and entree[0] is thread:
+            return entree[1]
+
+        while True:
+            conn = _recuperer_connexion_orpheline()
+            if conn is None and len(_pool) < POOL_TAILLE_MAX:
+                conn = _creer_connexion()
+            if conn is not None:
+                _pool[thread.ident] = (thread, conn)
+                return conn
+
+            restant = limite - time.monotonic()
+            if restant <= 0:
+                raise sqlite3.OperationalError(
+                    f"Pool de connexions saturé ({POOL_TAILLE_MAX} connexions actives)"
+                )
+            # Les threads qui se terminent ne notifient pas : on re-vérifie régulièrement
+            _pool_condition.wait(min(restant, 0.05))
+
+def release_connection():
+    """Rend au pool la connexion du thread courant (fin de session, worker...)"""
+    thread = threading.current_thread()
+    with _pool_condition:
+        entree = _pool.pop(thread.ident, None)
+        if entree:
+            entree[1].close()
+            _pool_condition.notify_all()
+
+def pool_health_check():
+    """
+    Contrôle l'état du pool : ferme les connexions défaillantes ou orphelines
+    et retourne un résumé.
+    """
+    with _pool_condition:
+        orphelines = 0
+        for ident, (thread, conn) in list(_pool.items()):
+            if not thread.is_alive():
+                orphelines += 1
+                del _pool[ident]
+                conn.close()
+
+        entree = _pool.get(threading.get_ident())
+        courante_saine = None
+        if entree:
+            courante_saine = _connexion_saine(entree[1])
+            if not courante_saine:
+                del _pool[threading.get_ident()]
+                entree[1].close()
+
+        _pool_condition.notify_all()
+        return {
+            'connexions': len(_pool),
+            'taille_max': POOL_TAILLE_MAX,
+            'orphelines_fermees': orphelines,
+            'connexion_courante_saine': courante_saine,
+        }
+
+def close_pool():
+    """Ferme proprement toutes les connexions du pool"""
+    with _pool_condition:
+        for thread, conn in _pool.values():
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Fermeture connexion impossible: {e}")
+        _pool.clear()
+        _pool_condition.notify_all()
+
+atexit.register(close_pool)
+
+# ============================================================================
+# CACHE DE LECTURE
+# ============================================================================
+
+# Nombre maximal de résultats conservés (LRU)
+CACHE_TAILLE_MAX = 256
+# Nombre maximal de lignes conservées, tous résultats confondus : quelques listes
+# de la taille du catalogue évincent les entrées les plus anciennes, et un
+# résultat plus grand que ce budget n'est pas mis en cache
+CACHE_LIGNES_MAX = 50_000
+# Intervalle (secondes) entre deux contrôles des écritures faites par d'autres processus
+CACHE_CONTROLE_EXTERNE = 1.0
+
+_cache_lock = threading.RLock()
+_cache = OrderedDict()  # (fonction, args) -> (génération, instant, résultat, lignes)
+_cache_occupation = {'lignes': 0}
+_cache_compteurs = {'hits': 0, 'misses': 0}
+_cache_compteurs_fonctions = {}  # nom de fonction -> {'hits', 'misses'}
+_generation = 0
+_controle_externe = {'data_version': None, 'instant': 0.0, 'connexion': None}
+
+def bump_generation():
+    """Invalide le cache de lecture : à appeler après chaque écriture validée"""
+    global _generation
+    with _cache_lock:
+        _generation += 1
+
+def _generation_courante():
+    """
+    Génération des données. Les écritures du processus l'incrémentent directement ;
+    PRAGMA data_version, lu périodiquement sur une connexion dédiée, détecte
+    celles des autres processus.
+    """
+    global _generation
+    maintenant = time.monotonic()
+    with _cache_lock:
+        if maintenant - _controle_externe['instant'] >= CACHE_CONTROLE_EXTERNE:
+            _controle_externe['instant'] = maintenant
+            if _controle_externe['connexion'] is None:
+                _controle_externe['connexion'] = sqlite3.connect(DB_PATH, check_same_thread=False)
+            version = _controle_externe['connexion'].execute("PRAGMA data_version").fetchone()[0]
+            if _controle_externe['data_version'] not in (None, version):
+                _generation += 1
+            _controle_externe['data_version'] = version
+        return _generation
+
+def _copie_resultat(valeur):
+    """Copie superficielle pour que l'appelant ne modifie pas l'entrée du cache"""
+    if isinstance(valeur, list):
+        return [dict(v) if isinstance(v, dict) else v for v in valeur]
+    if isinstance(valeur, dict):
+        return dict(valeur)
+    return valeur
+
+def _cle_hachable(valeur):
+    """
+    Forme hachable d'un argument : listes en tuples, ensembles en frozensets,
+    dictionnaires en tuples de paires triées. TypeError si l'argument reste
+    non hachable (l'appel n'est alors pas mis en cache).
+    """
+    if isinstance(valeur, (list, tuple)):
+        return tuple(_cle_hachable(v) for v in valeur)
+    if isinstance(valeur, (set, frozenset)):
+        return frozenset(_cle_hachable(v) for v in valeur)
+    if isinstance(valeur, dict):
+        return tuple(sorted((k, _cle_hachable(v)) for k, v in valeur.items()))
+    hash(valeur)
+    return valeur
+
+def _taille_resultat(valeur):
+    """Nombre de lignes estimé d'un résultat (listes, y compris dans un dictionnaire)"""
+    if isinstance(valeur, (list, tuple)):
+        return len(valeur)
+    if isinstance(valeur, dict):
+        return 1 + sum(len(v) for v in valeur.values() if isinstance(v, (list, tuple)))
+    return 1
+
+def _retirer_entree(cle):
+    entree = _cache.pop(cle, None)
+    if entree:
+        _cache_occupation['lignes'] -= entree[3]
+
+def lecture_en_cache(fonction=None, *, ttl=None):
+    """
+    Décorateur : mémorise le résultat jusqu'à la prochaine écriture.
+    Avec ttl (secondes), l'entrée expire aussi passé ce délai :
+    @lecture_en_cache(ttl=30)
+    """
+    if fonction is None:
+        return functools.partial(lecture_en_cache, ttl=ttl)
+    
+    nom = fonction.__name__
+    
+    @functools.wraps(fonction)
+    def wrapper(*args, **kwargs):
+        try:
+            cle = (nom, _cle_hachable(args), _cle_hachable(kwargs))
+        except TypeError:
+            return fonction(*args, **kwargs)
+        generation = _generation_courante()
+        maintenant = time.monotonic()
+        
+        with _cache_lock:
+            compteurs = _cache_compteurs_fonctions.setdefault(nom, {'hits': 0, 'misses': 0})
+            entree = _cache.get(cle)
+            if entree and entree[0] == generation and (ttl is None or maintenant - entree[1] < ttl):
+                _cache.move_to_end(cle)
+                _cache_compteurs['hits'] += 1
+                compteurs['hits'] += 1
+                return _copie_resultat(entree[2])
+            _cache_compteurs['misses'] += 1
+            compteurs['misses'] += 1
+        
+        valeur = fonction(*args, **kwargs)
+        lignes = _taille_resultat(valeur)
+        
+        with _cache_lock:
+            _retirer_entree(cle)
+            if lignes <= CACHE_LIGNES_MAX:
+                _cache[cle] = (generation, maintenant, valeur, lignes)
+                _cache_occupation['lignes'] += lignes
+            while _cache and (len(_cache) > CACHE_TAILLE_MAX
+                              or _cache_occupation['lignes'] > CACHE_LIGNES_MAX):
+                _retirer_entree(next(iter(_cache)))
+        return _copie_resultat(valeur)
+    return wrapper
+
+def _fermer_connexion_controle():
+    with _cache_lock:
+        if _controle_externe['connexion'] is not None:
+            _controle_externe['connexion'].close()
+            _controle_externe['connexion'] = None
+
+atexit.register(_fermer_connexion_controle)
+
+def _taux_succes(compteurs):
+    total = compteurs['hits'] + compteurs['misses']
+    return compteurs['hits'] / total if total else 0.0
+
+def get_cache_stats():
+    """Retourne les compteurs du cache de lecture (globaux et par fonction)"""
+    with _cache_lock:
+        return {
+            'hits': _cache_compteurs['hits'],
+            'misses': _cache_compteurs['misses'],
+            'taux_succes': _taux_succes(_cache_compteurs),
+            'taille': len(_cache),
+            'taille_max': CACHE_TAILLE_MAX,
+            'lignes': _cache_occupation['lignes'],
+            'lignes_max': CACHE_LIGNES_MAX,
+            'generation': _generation,
+            'fonctions': {
+                nom: dict(compteurs, taux_succes=_taux_succes(compteurs))
+                for nom, compteurs in _cache_compteurs_fonctions.items()
+            },
+        }
+
+def vider_cache():
+    """Vide le cache de lecture et remet ses compteurs à zéro"""
+    with _cache_lock:
+        _cache.clear()
+        _cache_occupation['lignes'] = 0
+        _cache_compteurs.update(hits=0, misses=0)
+        _cache_compteurs_fonctions.clear()
+
+# ============================================================================
+# FONCTIONS D'EXÉCUTION
+# ============================================================================
+
 def execute_query(query, params=()):
     """Exécute une requête SQL (INSERT, UPDATE, DELETE)"""
-    conn = get_connection()
+    conn = get_pooled_connection()
     cursor = conn.cursor()
     try:
         cursor.execute(query, params)
         conn.commit()
+        bump_generation()
         return cursor
     except Exception as e:
         conn.rollback()
         logger.error(f"Erreur SQL: {e}")
         raise
-    finally:
-        conn.close()
 
 def fetch_all(query, params=()):
     """Récupère tous les résultats d'une requête SELECT"""
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-    finally:
-        conn.close()
+    cursor = get_pooled_connection().execute(query, params)
+    return [dict(row) for row in cursor.fetchall()]
 
 def fetch_one(query, params=()):
     """Récupère un seul résultat d'une requête SELECT"""
-    conn = get_connection()
+    row = get_pooled_connection().execute(query, params).fetchone()
+    return dict(row) if row else None
+
+def to_dataframe(query, params=()):
+    """Convertit le résultat SQL en DataFrame pandas"""
+    import pandas as pd  # import différé : coûteux et inutile aux autres fonctions
+    return pd.read_sql_query(query, get_pooled_connection(), params=params)
+
+def to_array(query, params=(), dtype='float64'):
+    """
+    Convertit le résultat SQL en tableau NumPy (lignes x colonnes) de type homogène.
+    Les lignes sont lues en tuples (sans objets Row) et converties d'un bloc ;
+    les colonnes ne doivent pas contenir de NULL.
+    """
+    import numpy as np  # import différé, comme pandas
+    cursor = get_pooled_connection().cursor()
+    cursor.row_factory = None
     try:
-        cursor = conn.cursor()
         cursor.execute(query, params)
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        valeurs = np.fromiter(itertools.chain.from_iterable(cursor), dtype=dtype)
+        return valeurs.reshape(-1, len(cursor.description))
     finally:
-        conn.close()
+        cursor.close()
 
-def to_dataframe(query, params=()):
-    """Convertit le résultat SQL en DataFrame pandas"""
-    conn = get_connection()
+def iter_rows(query, params=(), chunk_size=1000):
+    """
+    Parcourt les résultats d'une requête SELECT ligne par ligne (dictionnaires),
+    en ne gardant en mémoire qu'un paquet de chunk_size lignes à la fois
+    """
+    cursor = get_pooled_connection().execute(query, params)
     try:
-        df = pd.read_sql_query(query, conn, params=params)
-        return df
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
     finally:
-        conn.close()
+        cursor.close()
+
+def iter_dataframes(query, params=(), chunksize=10000):
+    """Parcourt les résultats d'une requête SELECT par DataFrames de chunksize lignes"""
+    import pandas as pd
+    yield from pd.read_sql_query(query, get_pooled_connection(), params=params, chunksize=chunksize)
+
+@contextmanager
+def transaction():
+    """
+    Ouvre une transaction d'écriture (BEGIN IMMEDIATE) sur la connexion du thread.
+    Commit en sortie normale, rollback si une exception est levée.
+    """
+    conn = get_pooled_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+        bump_generation()
 
 # ============================================================================
 # INITIALISATION DE LA BASE
 # ============================================================================
 
+_bootstrap_lock = threading.RLock()
+_bootstrap = {'pret': False, 'en_cours': False}
+
+def _assurer_schema(conn):
+    """
+    Amorçage unique par processus : compare PRAGMA user_version à SCHEMA_VERSION
+    et n'exécute le DDL (init_database) que s'ils diffèrent.
+    """
+    with _bootstrap_lock:
+        # 'en_cours' n'est visible que du thread qui amorce : les autres attendent le verrou
+        if _bootstrap['pret'] or _bootstrap['en_cours']:
+            return
+        _bootstrap['en_cours'] = True
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                _migrer_contrainte_mouvements(conn)
+                init_database()
+            elif version > SCHEMA_VERSION:
+                logger.warning(f"Schéma de base plus récent ({version}) que l'application ({SCHEMA_VERSION})")
+            _bootstrap['pret'] = True
+        finally:
+            _bootstrap['en_cours'] = False
+
+def assurer_schema():
+    """Force l'amorçage du schéma (scripts d'initialisation)"""
+    get_pooled_connection()
+
+# Contribution d'une ligne produit aux indicateurs de la table stats
+# (mêmes règles que les agrégats : les valeurs NULL ne comptent pas)
+def _contribution_produit(ligne, signe):
+    return f"""
+        total_produits = total_produits {signe} 1,
+        valeur_totale = valeur_totale {signe} COALESCE({ligne}.quantite * {ligne}.prix_vente, 0),
+        alertes = alertes {signe} COALESCE({ligne}.quantite - {ligne}.seuil_min <= 0, 0),
+        epuises = epuises {signe} COALESCE({ligne}.quantite = 0, 0)
+    """
+
+TRIGGERS_STATS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_produits_insert AFTER INSERT ON produits
+    BEGIN
+        UPDATE stats SET {_contribution_produit('NEW', '+')} WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_produits_delete AFTER DELETE ON produits
+    BEGIN
+        UPDATE stats SET {_contribution_produit('OLD', '-')} WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_produits_update
+    AFTER UPDATE OF quantite, seuil_min, prix_vente ON produits
+    BEGIN
+        UPDATE stats SET {_contribution_produit('OLD', '-')} WHERE id = 1;
+        UPDATE stats SET {_contribution_produit('NEW', '+')} WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_fournisseurs_insert AFTER INSERT ON fournisseurs
+    BEGIN
+        UPDATE stats SET total_fournisseurs = total_fournisseurs + 1 WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_fournisseurs_delete AFTER DELETE ON fournisseurs
+    BEGIN
+        UPDATE stats SET total_fournisseurs = total_fournisseurs - 1 WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_categories_insert AFTER INSERT ON categories
+    BEGIN
+        UPDATE stats SET total_categories = total_categories + 1 WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_categories_delete AFTER DELETE ON categories
+    BEGIN
+        UPDATE stats SET total_categories = total_categories - 1 WHERE id = 1;
+    END
+    """,
+]
+
+# Nombre de produits par catégorie (categorie_id 0 : produits sans catégorie)
+TRIGGERS_STATS_CATEGORIES = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_categories_produits_insert AFTER INSERT ON produits
+    BEGIN
+        INSERT INTO stats_categories (categorie_id, nb_produits)
+        VALUES (COALESCE(NEW.categorie_id, 0), 1)
+        ON CONFLICT (categorie_id) DO UPDATE SET nb_produits = nb_produits + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_categories_produits_delete AFTER DELETE ON produits
+    BEGIN
+        UPDATE stats_categories SET nb_produits = nb_produits - 1
+        WHERE categorie_id = COALESCE(OLD.categorie_id, 0);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_categories_produits_update
+    AFTER UPDATE OF categorie_id ON produits
+    WHEN COALESCE(OLD.categorie_id, 0) != COALESCE(NEW.categorie_id, 0)
+    BEGIN
+        UPDATE stats_categories SET nb_produits = nb_produits - 1
+        WHERE categorie_id = COALESCE(OLD.categorie_id, 0);
+        INSERT INTO stats_categories (categorie_id, nb_produits)
+        VALUES (COALESCE(NEW.categorie_id, 0), 1)
+        ON CONFLICT (categorie_id) DO UPDATE SET nb_produits = nb_produits + 1;
+    END
+    """,
+]
+
+REQUETES_RECALCUL_STATS_CATEGORIES = [
+    "DELETE FROM stats_categories",
+    """
+    INSERT INTO stats_categories (categorie_id, nb_produits)
+    SELECT COALESCE(categorie_id, 0), COUNT(*)
+    FROM produits
+    GROUP BY COALESCE(categorie_id, 0)
+    """,
+]
+
+# Agrégats dérivés de mouvements_daily, tenus à jour par triggers sur celle-ci :
+# - mouvements_daily_totaux (jour, type) : séries et totaux sans filtre produit
+# - mouvements_monthly (produit, mois, type) : classements produits sur de longues périodes
+def _report_mouvements_daily(ligne, quantite, nb):
+    """Reporte un écart (quantite, nb) de la ligne journalière sur les agrégats dérivés"""
+    return f"""
+        INSERT INTO mouvements_daily_totaux (jour, type, quantite_totale, nb_mouvements)
+        VALUES ({ligne}.jour, {ligne}.type, {quantite}, {nb})
+        ON CONFLICT (jour, type) DO UPDATE SET
+            quantite_totale = quantite_totale + excluded.quantite_totale,
+            nb_mouvements = nb_mouvements + excluded.nb_mouvements;
+        INSERT INTO mouvements_monthly (produit_id, mois, type, quantite_totale, nb_mouvements)
+        VALUES ({ligne}.produit_id, substr({ligne}.jour, 1, 7), {ligne}.type, {quantite}, {nb})
+        ON CONFLICT (produit_id, mois, type) DO UPDATE SET
+            quantite_totale = quantite_totale + excluded.quantite_totale,
+            nb_mouvements = nb_mouvements + excluded.nb_mouvements;
+    """
+
+TRIGGERS_MOUVEMENTS_DAILY_DERIVES = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mouvements_daily_derives_insert AFTER INSERT ON mouvements_daily
+    BEGIN
+        {_report_mouvements_daily('NEW', 'NEW.quantite_totale', 'NEW.nb_mouvements')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mouvements_daily_derives_update
+    AFTER UPDATE OF quantite_totale, nb_mouvements ON mouvements_daily
+    BEGIN
+        {_report_mouvements_daily('NEW', 'NEW.quantite_totale - OLD.quantite_totale',
+                                  'NEW.nb_mouvements - OLD.nb_mouvements')}
+        DELETE FROM mouvements_daily_totaux WHERE jour = OLD.jour AND type = OLD.type AND nb_mouvements <= 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mouvements_daily_derives_delete AFTER DELETE ON mouvements_daily
+    BEGIN
+        {_report_mouvements_daily('OLD', '-OLD.quantite_totale', '-OLD.nb_mouvements')}
+        DELETE FROM mouvements_daily_totaux WHERE jour = OLD.jour AND type = OLD.type AND nb_mouvements <= 0;
+        DELETE FROM mouvements_monthly
+        WHERE produit_id = OLD.produit_id AND mois = substr(OLD.jour, 1, 7) AND type = OLD.type
+          AND nb_mouvements <= 0;
+    END
+    """,
+]
+
+REQUETES_RECALCUL_MOUVEMENTS_DAILY_DERIVES = [
+    "DELETE FROM mouvements_daily_totaux",
+    "DELETE FROM mouvements_monthly",
+    """
+    INSERT INTO mouvements_daily_totaux (jour, type, quantite_totale, nb_mouvements)
+    SELECT jour, type, SUM(quantite_totale), SUM(nb_mouvements)
+    FROM mouvements_daily
+    GROUP BY jour, type
+    """,
+    """
+    INSERT INTO mouvements_monthly (produit_id, mois, type, quantite_totale, nb_mouvements)
+    SELECT produit_id, substr(jour, 1, 7), type, SUM(quantite_totale), SUM(nb_mouvements)
+    FROM mouvements_daily
+    GROUP BY produit_id, substr(jour, 1, 7), type
+    """,
+]
+
+# Alertes de stock : ouvertes au franchissement du seuil (quantite - seuil_min <= 0),
+# mises à jour tant qu'elles sont actives, résolues quand le stock remonte.
+# Exécutés dans la transaction d'écriture du stock.
+STATUTS_ALERTE_ACTIFS = "('ouverte', 'acquittee')"
+
+def _ouverture_alerte(ligne):
+    return f"""
+        UPDATE alertes SET quantite = {ligne}.quantite, seuil_min = {ligne}.seuil_min
+        WHERE produit_id = {ligne}.id AND statut IN {STATUTS_ALERTE_ACTIFS};
+        INSERT INTO alertes (produit_id, quantite, seuil_min)
+        SELECT {ligne}.id, {ligne}.quantite, {ligne}.seuil_min
+        WHERE NOT EXISTS (
+            SELECT 1 FROM alertes WHERE produit_id = {ligne}.id AND statut IN {STATUTS_ALERTE_ACTIFS}
+        );
+    """
+
+def _resolution_alerte(ligne):
+    return f"""
+        UPDATE alertes
+        SET statut = 'resolue', quantite = {ligne}.quantite, date_resolution = CURRENT_TIMESTAMP
+        WHERE produit_id = {ligne}.id AND statut IN {STATUTS_ALERTE_ACTIFS};
+    """
+
+TRIGGERS_ALERTES = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_alertes_produits_insert AFTER INSERT ON produits
+    WHEN NEW.quantite - NEW.seuil_min <= 0
+    BEGIN
+        {_ouverture_alerte('NEW')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_alertes_produits_update_bas
+    AFTER UPDATE OF quantite, seuil_min ON produits
+    WHEN NEW.quantite - NEW.seuil_min <= 0
+    BEGIN
+        {_ouverture_alerte('NEW')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_alertes_produits_update_retour
+    AFTER UPDATE OF quantite, seuil_min ON produits
+    WHEN OLD.quantite - OLD.seuil_min <= 0 AND NOT (NEW.quantite - NEW.seuil_min <= 0)
+    BEGIN
+        {_resolution_alerte('NEW')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_alertes_produits_delete AFTER DELETE ON produits
+    BEGIN
+        {_resolution_alerte('OLD')}
+    END
+    """,
+]
+
+# Un mouvement supprimé déjà agrégé est retiré de mouvements_daily
+TRIGGER_MOUVEMENTS_DAILY_DELETE = """
+    CREATE TRIGGER IF NOT EXISTS trg_mouvements_daily_delete AFTER DELETE ON mouvements
+    WHEN OLD.id <= COALESCE(
+        (SELECT CAST(valeur AS INTEGER) FROM meta WHERE cle = 'mouvements_daily_watermark'), 0
+    )
+    BEGIN
+        UPDATE mouvements_daily
+        SET quantite_totale = quantite_totale - OLD.quantite,
+            nb_mouvements = nb_mouvements - 1
+        WHERE produit_id = OLD.produit_id
+          AND jour = DATE(OLD.date_mouvement)
+          AND type = OLD.type;
+        DELETE FROM mouvements_daily
+        WHERE produit_id = OLD.produit_id
+          AND jour = DATE(OLD.date_mouvement)
+          AND type = OLD.type
+          AND nb_mouvements <= 0;
+    END
+"""
+
+# Compteurs de modifications tenus dans meta, pour les lecteurs incrémentaux
+# (cube de rapport_service) : un mouvement déjà lu qui change ou disparaît, et un
+# produit ajouté, supprimé ou reclassé, se détectent sans parcourir les tables.
+CLE_COMPTEUR_MOUVEMENTS = 'mouvements_modifications'
+CLE_COMPTEUR_PRODUITS = 'produits_dimensions_modifications'
+
+def _incrementer_compteur(cle):
+    return f"""
+        INSERT INTO meta (cle, valeur) VALUES ('{cle}', 1)
+        ON CONFLICT(cle) DO UPDATE SET valeur = CAST(valeur AS INTEGER) + 1;
+    """
+
+TRIGGERS_COMPTEURS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compteur_mouvements_delete AFTER DELETE ON mouvements
+    BEGIN
+        {_incrementer_compteur(CLE_COMPTEUR_MOUVEMENTS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compteur_mouvements_update
+    AFTER UPDATE OF produit_id, type, quantite, date_mouvement ON mouvements
+    BEGIN
+        {_incrementer_compteur(CLE_COMPTEUR_MOUVEMENTS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compteur_produits_insert AFTER INSERT ON produits
+    BEGIN
+        {_incrementer_compteur(CLE_COMPTEUR_PRODUITS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compteur_produits_delete AFTER DELETE ON produits
+    BEGIN
+        {_incrementer_compteur(CLE_COMPTEUR_PRODUITS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_compteur_produits_update
+    AFTER UPDATE OF categorie_id, fournisseur_id ON produits
+    BEGIN
+        {_incrementer_compteur(CLE_COMPTEUR_PRODUITS)}
+    END
+    """,
+]
+
+TRIGGERS_PRODUITS_FTS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_produits_fts_insert AFTER INSERT ON produits
+    BEGIN
+        INSERT INTO produits_fts (rowid, reference, nom, description)
+        VALUES (NEW.id, NEW.reference, NEW.nom, NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_produits_fts_delete AFTER DELETE ON produits
+    BEGIN
+        INSERT INTO produits_fts (produits_fts, rowid, reference, nom, description)
+        VALUES ('delete', OLD.id, OLD.reference, OLD.nom, OLD.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_produits_fts_update
+    AFTER UPDATE OF reference, nom, description ON produits
+    BEGIN
+        INSERT INTO produits_fts (produits_fts, rowid, reference, nom, description)
+        VALUES ('delete', OLD.id, OLD.reference, OLD.nom, OLD.description);
+        INSERT INTO produits_fts (rowid, reference, nom, description)
+        VALUES (NEW.id, NEW.reference, NEW.nom, NEW.description);
+    END
+    """,
+]
+
+REQUETE_RECALCUL_STATS = """
+    INSERT OR REPLACE INTO stats
+    (id, total_produits, valeur_totale, alertes, epuises, total_fournisseurs, total_categories)
+    SELECT
+        1,
+        (SELECT COUNT(*) FROM produits),
+        (SELECT COALESCE(SUM(quantite * prix_vente), 0) FROM produits),
+        (SELECT COUNT(*) FROM produits WHERE quantite - seuil_min <= 0),
+        (SELECT COUNT(*) FROM produits WHERE quantite = 0),
+        (SELECT COUNT(*) FROM fournisseurs),
+        (SELECT COUNT(*) FROM categories)
+"""
+
+# Table mouvements (nom paramétré pour la reconstruction de _migrer_contrainte_mouvements)
+TABLE_MOUVEMENTS = '''
+    CREATE TABLE IF NOT EXISTS {nom} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        produit_id INTEGER NOT NULL,
+        type TEXT CHECK(type IN ('entree', 'sortie', 'ajustement', 'inventaire')),
+        quantite INTEGER NOT NULL,
+        quantite_avant INTEGER,
+        quantite_apres INTEGER,
+        motif TEXT,
+        utilisateur TEXT DEFAULT 'system',
+        document_ref TEXT,
+        date_mouvement TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (produit_id) REFERENCES produits(id)
+    )
+'''
+
+def _migrer_contrainte_mouvements(conn):
+    """
+    Bases créées avec CHECK(type IN ('entree', 'sortie')) : SQLite ne modifie pas
+    une contrainte existante, la table est reconstruite (nouvelle table, copie des
+    lignes, suppression, renommage). Ses index et triggers, supprimés avec l'ancienne
+    table, sont recréés par init_database qui suit.
+    """
+    ligne = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'mouvements'"
+    ).fetchone()
+    if ligne is None or "'ajustement'" in ligne[0]:
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DROP TABLE IF EXISTS mouvements_migration")
+        conn.execute(TABLE_MOUVEMENTS.format(nom='mouvements_migration'))
+        anciennes = {col[1] for col in conn.execute("PRAGMA table_info(mouvements)")}
+        colonnes = ", ".join(
+            col[1] for col in conn.execute("PRAGMA table_info(mouvements_migration)") if col[1] in anciennes
+        )
+        conn.execute(f"INSERT INTO mouvements_migration ({colonnes}) SELECT {colonnes} FROM mouvements")
+        # Conserve le compteur AUTOINCREMENT : les identifiants supprimés ne sont pas réattribués
+        sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'mouvements'").fetchone()
+        conn.execute("DROP TABLE mouvements")
+        conn.execute("ALTER TABLE mouvements_migration RENAME TO mouvements")
+        if sequence:
+            conn.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'mouvements'", (sequence[0],)
+            )
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    logger.info("Table mouvements reconstruite (types ajustement / inventaire autorisés)")
+
 def init_database():
     """Initialise la base de données avec toutes les tables"""
-    conn = get_connection()
+    conn = get_pooled_connection()
     cursor = conn.cursor()
     
     # Table catégories
@@ -134,38 +893,253 @@ def init_database():
     ''')
     
     # Table mouvements
+    cursor.execute(TABLE_MOUVEMENTS.format(nom='mouvements'))
+    
+    # Bases créées avant l'ajout des colonnes du journal
+    colonnes = [col[1] for col in cursor.execute("PRAGMA table_info(mouvements)").fetchall()]
+    for colonne, definition in [
+        ('quantite_avant', 'INTEGER'),
+        ('quantite_apres', 'INTEGER'),
+        ('utilisateur', "TEXT DEFAULT 'system'"),
+        ('document_ref', 'TEXT'),
+    ]:
+        if colonne not in colonnes:
+            cursor.execute(f"ALTER TABLE mouvements ADD COLUMN {colonne} {definition}")
+    
+    # Index secondaires : historique par produit / date / type, et alertes de stock
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mouvements_produit_date ON mouvements(produit_id, date_mouvement)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mouvements_date ON mouvements(date_mouvement)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mouvements_type_date ON mouvements(type, date_mouvement)")
+    # Index d'expression : utilisable par les requêtes qui filtrent sur "quantite - seuil_min <= 0"
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produits_alerte ON produits(quantite - seuil_min)")
+    # Tris de la grille produits (pagination côté SQL)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produits_nom ON produits(nom, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produits_quantite ON produits(quantite, id)")
+    # Agrégats du tableau de bord (répartition par catégorie, top valeur de stock)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produits_categorie ON produits(categorie_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produits_valeur ON produits(quantite * prix_vente)")
+    
+    # Table stats : indicateurs matérialisés (une seule ligne), tenus à jour par triggers
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_produits INTEGER NOT NULL DEFAULT 0,
+        valeur_totale REAL NOT NULL DEFAULT 0,
+        alertes INTEGER NOT NULL DEFAULT 0,
+        epuises INTEGER NOT NULL DEFAULT 0,
+        total_fournisseurs INTEGER NOT NULL DEFAULT 0,
+        total_categories INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    
+    for trigger in TRIGGERS_STATS:
+        cursor.execute(trigger)
+    
+    if cursor.execute("SELECT 1 FROM stats WHERE id = 1").fetchone() is None:
+        cursor.execute(REQUETE_RECALCUL_STATS)
+    
+    # Répartition des produits par catégorie, matérialisée comme stats
+    existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_categories'"
+    ).fetchone()
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stats_categories (
+        categorie_id INTEGER PRIMARY KEY,
+        nb_produits INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    for trigger in TRIGGERS_STATS_CATEGORIES:
+        cursor.execute(trigger)
+    if not existe:
+        for requete in REQUETES_RECALCUL_STATS_CATEGORIES:
+            cursor.execute(requete)
+    
+    # Table meta : paires clé/valeur internes (watermarks...)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS meta (
+        cle TEXT PRIMARY KEY,
+        valeur TEXT
+    )
+    ''')
+    for trigger in TRIGGERS_COMPTEURS:
+        cursor.execute(trigger)
+    
+    # Agrégats journaliers des mouvements, alimentés depuis un watermark (dernier id traité)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS mouvements_daily (
+        produit_id INTEGER NOT NULL,
+        jour TEXT NOT NULL,
+        type TEXT NOT NULL,
+        quantite_totale INTEGER NOT NULL DEFAULT 0,
+        nb_mouvements INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (produit_id, jour, type)
+    ) WITHOUT ROWID
+    ''')
+    # Index couvrant : les agrégats par période se lisent sans revenir à la table
+    cursor.execute("DROP INDEX IF EXISTS idx_mouvements_daily_jour")
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_mouvements_daily_jour_couvrant
+    ON mouvements_daily(jour, type, quantite_totale, nb_mouvements)
+    ''')
+    cursor.execute(TRIGGER_MOUVEMENTS_DAILY_DELETE)
+    
+    # Agrégats dérivés (totaux journaliers tous produits, cumuls mensuels par produit)
+    existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mouvements_monthly'"
+    ).fetchone()
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS mouvements_daily_totaux (
+        jour TEXT NOT NULL,
+        type TEXT NOT NULL,
+        quantite_totale INTEGER NOT NULL DEFAULT 0,
+        nb_mouvements INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (jour, type)
+    ) WITHOUT ROWID
+    ''')
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS mouvements (
+    CREATE TABLE IF NOT EXISTS mouvements_monthly (
+        produit_id INTEGER NOT NULL,
+        mois TEXT NOT NULL,
+        type TEXT NOT NULL,
+        quantite_totale INTEGER NOT NULL DEFAULT 0,
+        nb_mouvements INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (produit_id, mois, type)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mouvements_monthly_mois ON mouvements_monthly(mois, type)")
+    for trigger in TRIGGERS_MOUVEMENTS_DAILY_DERIVES:
+        cursor.execute(trigger)
+    if not existe:
+        for requete in REQUETES_RECALCUL_MOUVEMENTS_DAILY_DERIVES:
+            cursor.execute(requete)
+    
+    # Alertes de stock (cycle ouverte -> acquittee -> resolue)
+    existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alertes'"
+    ).fetchone()
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS alertes (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         produit_id INTEGER NOT NULL,
-        type TEXT CHECK(type IN ('entree', 'sortie')),
-        quantite INTEGER NOT NULL,
-        motif TEXT,
-        date_mouvement TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        statut TEXT NOT NULL DEFAULT 'ouverte' CHECK(statut IN ('ouverte', 'acquittee', 'resolue')),
+        quantite INTEGER,
+        seuil_min INTEGER,
+        date_ouverture TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        date_acquittement TIMESTAMP,
+        acquittee_par TEXT,
+        date_resolution TIMESTAMP,
+        FOREIGN KEY (produit_id) REFERENCES produits(id)
+    )
+    ''')
+    # Au plus une alerte active par produit ; alertes actives triées par criticité
+    cursor.execute(f'''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_alertes_produit_active
+    ON alertes(produit_id) WHERE statut IN {STATUTS_ALERTE_ACTIFS}
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alertes_statut ON alertes(statut, quantite - seuil_min, id)")
+    for trigger in TRIGGERS_ALERTES:
+        cursor.execute(trigger)
+    if not existe:
+        cursor.execute("""
+            INSERT INTO alertes (produit_id, quantite, seuil_min)
+            SELECT id, quantite, seuil_min FROM produits WHERE quantite - seuil_min <= 0
+        """)
+    
+    # Couverture de stock : consommation moyenne et point de commande par produit,
+    # recalculés en lot (alerte_service.calculer_couverture)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS couverture_stock (
+        produit_id INTEGER PRIMARY KEY,
+        consommation_jour REAL NOT NULL DEFAULT 0,
+        ecart_type_jour REAL NOT NULL DEFAULT 0,
+        point_commande INTEGER NOT NULL DEFAULT 0,
+        date_calcul TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (produit_id) REFERENCES produits(id)
     )
     ''')
     
+    # Classification ABC (part de la valeur consommée) / XYZ (régularité de la demande),
+    # recalculée en lot (rapport_service.calculer_classification)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS classification_stock (
+        produit_id INTEGER PRIMARY KEY,
+        classe_abc TEXT NOT NULL CHECK(classe_abc IN ('A', 'B', 'C')),
+        classe_xyz TEXT NOT NULL CHECK(classe_xyz IN ('X', 'Y', 'Z')),
+        valeur_consommation REAL NOT NULL DEFAULT 0,
+        part_cumulee REAL NOT NULL DEFAULT 0,
+        coefficient_variation REAL,
+        valeur_stock_achat REAL NOT NULL DEFAULT 0,
+        valeur_stock_vente REAL NOT NULL DEFAULT 0,
+        date_calcul TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (produit_id) REFERENCES produits(id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_classification_classes
+    ON classification_stock(classe_abc, classe_xyz, valeur_consommation)
+    ''')
+    
+    # Instantanés du stock : en-tête (horodatage, dernier mouvement inclus) et
+    # quantité / valeur de chaque produit, écrits par historique_service.prendre_snapshot
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date_snapshot TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        dernier_mouvement_id INTEGER NOT NULL DEFAULT 0,
+        nb_produits INTEGER NOT NULL DEFAULT 0,
+        valeur_totale REAL NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_snapshots_date ON stock_snapshots(date_snapshot)")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_snapshots_lignes (
+        snapshot_id INTEGER NOT NULL,
+        produit_id INTEGER NOT NULL,
+        quantite INTEGER NOT NULL DEFAULT 0,
+        prix_vente REAL NOT NULL DEFAULT 0,
+        valeur_stock REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (snapshot_id, produit_id),
+        FOREIGN KEY (snapshot_id) REFERENCES stock_snapshots(id)
+    ) WITHOUT ROWID
+    ''')
+    
+    # Recherche plein texte des produits (FTS5 à contenu externe, synchronisé par triggers)
+    if fts5_disponible():
+        existe = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'produits_fts'"
+        ).fetchone()
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS produits_fts USING fts5(
+            reference, nom, description,
+            content='produits', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''')
+        for trigger in TRIGGERS_PRODUITS_FTS:
+            cursor.execute(trigger)
+        if not existe:
+            cursor.execute("INSERT INTO produits_fts(produits_fts) VALUES ('rebuild')")
+    
+    conn.commit()
+    _rafraichir_mouvements_daily(conn)
     conn.commit()
-    conn.close()
+    bump_generation()
     logger.info("✅ Base de données initialisée")
     
     # Créer des données de démo si base vide
     if is_database_empty():
         create_demo_data()
+    
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 def is_database_empty():
     """Vérifie si la base de données est vide"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM produits")
-    count = cursor.fetchone()[0]
-    conn.close()
+    count = get_pooled_connection().execute("SELECT COUNT(*) FROM produits").fetchone()[0]
     return count == 0
 
 def create_demo_data():
     """Crée des données de démo"""
-    conn = get_connection()
+    conn = get_pooled_connection()
     cursor = conn.cursor()
     
     # Catégories
@@ -208,13 +1182,14 @@ def create_demo_data():
         ''', (ref, nom, desc, cat_id, four_id, qte, seuil, prix_a, prix_v))
     
     conn.commit()
-    conn.close()
+    bump_generation()
     logger.info("✅ Données de démo créées")
 
 # ============================================================================
 # FONCTIONS CATÉGORIES
 # ============================================================================
 
+@lecture_en_cache
 def get_all_categories():
     """Récupère toutes les catégories"""
     return fetch_all("SELECT * FROM categories ORDER BY nom")
@@ -232,6 +1207,7 @@ def add_categorie(nom, couleur="#3B82F6"):
 # FONCTIONS PRODUITS
 # ============================================================================
 
+@lecture_en_cache
 def get_all_produits():
     """Récupère tous les produits avec leurs catégories et fournisseurs"""
     return fetch_all("""
@@ -246,6 +1222,158 @@ def get_all_produits():
         ORDER BY p.nom
     """)
 
+_fts5 = {'disponible': None}
+
+def fts5_disponible():
+    """Indique si le SQLite embarqué par Python est compilé avec FTS5"""
+    if _fts5['disponible'] is None:
+        conn = sqlite3.connect(":memory:")
+        try:
+            _fts5['disponible'] = bool(
+                conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]
+            )
+        finally:
+            conn.close()
+    return _fts5['disponible']
+
+def _expression_fts(mots, colonnes=None):
+    """Requête FTS5 : chaque mot en préfixe (ET implicite), éventuellement limitée à des colonnes"""
+    expression = " ".join(f'"{mot}"*' for mot in mots)
+    if colonnes:
+        return f"{{{' '.join(colonnes)}}} : ({expression})"
+    return expression
+
+def search_produits(query, limit=50, offset=0):
+    """
+    Recherche des produits par référence, nom ou description.
+    Chaque mot est cherché en préfixe ("cla méca" trouve "Clavier Mécanique"),
+    résultats classés par pertinence (bm25, la référence et le nom pèsent plus).
+    Sans FTS5, repli sur une recherche LIKE.
+    """
+    mots = re.findall(r"\w+", query or "")
+    if not mots:
+        return []
+    
+    colonnes = """
+            p.*,
+            c.nom as categorie_nom,
+            c.couleur as categorie_couleur,
+            f.nom as fournisseur_nom
+    """
+    
+    if fts5_disponible():
+        return fetch_all(f"""
+            SELECT {colonnes}
+            FROM produits_fts
+            JOIN produits p ON p.id = produits_fts.rowid
+            LEFT JOIN categories c ON p.categorie_id = c.id
+            LEFT JOIN fournisseurs f ON p.fournisseur_id = f.id
+            WHERE produits_fts MATCH ?
+            ORDER BY bm25(produits_fts, 10.0, 5.0, 1.0)
+            LIMIT ? OFFSET ?
+        """, (_expression_fts(mots), limit, offset))
+    
+    conditions = " AND ".join(
+        "(p.reference LIKE ? OR p.nom LIKE ? OR p.description LIKE ?)" for _ in mots
+    )
+    params = [f"%{mot}%" for mot in mots for _ in range(3)]
+    return fetch_all(f"""
+        SELECT {colonnes}
+        FROM produits p
+        LEFT JOIN categories c ON p.categorie_id = c.id
+        LEFT JOIN fournisseurs f ON p.fournisseur_id = f.id
+        WHERE {conditions}
+        ORDER BY p.nom
+        LIMIT ? OFFSET ?
+    """, params + [limit, offset])
+
+# Nombre de suggestions affichées par le sélecteur de produit
+SUGGESTIONS_MAX = 20
+
+@lecture_en_cache
+def suggest_produits(prefixe="", limit=SUGGESTIONS_MAX, en_stock=False):
+    """
+    Suggestions du sélecteur de produit : début de référence ou de nom
+    (recherche indexée), colonnes réduites, au plus `limit` lignes.
+    Sans saisie, les premiers produits dans l'ordre alphabétique.
+    """
+    filtre_stock = "AND p.quantite > 0" if en_stock else ""
+    mots = re.findall(r"\w+", prefixe or "")
+    
+    if not mots:
+        return fetch_all(f"""
+            SELECT p.id, p.reference, p.nom, p.quantite
+            FROM produits p
+            WHERE 1 = 1 {filtre_stock}
+            ORDER BY p.nom, p.id
+            LIMIT ?
+        """, (limit,))
+    
+    if fts5_disponible():
+        return fetch_all(f"""
+            SELECT p.id, p.reference, p.nom, p.quantite
+            FROM produits_fts
+            JOIN produits p ON p.id = produits_fts.rowid
+            WHERE produits_fts MATCH ? {filtre_stock}
+            ORDER BY bm25(produits_fts, 10.0, 5.0, 1.0)
+            LIMIT ?
+        """, (_expression_fts(mots, colonnes=('reference', 'nom')), limit))
+    
+    debut = f"{prefixe.strip()}%"
+    return fetch_all(f"""
+        SELECT p.id, p.reference, p.nom, p.quantite
+        FROM produits p
+        WHERE (p.reference LIKE ? OR p.nom LIKE ?) {filtre_stock}
+        ORDER BY p.nom, p.id
+        LIMIT ?
+    """, (debut, debut, limit))
+
+# Colonnes de tri autorisées pour la grille produits (jamais de SQL venant de l'interface)
+TRIS_PRODUITS = {
+    'nom': 'p.nom',
+    'quantite': 'p.quantite',
+    'valeur': 'p.quantite * p.prix_vente',
+}
+
+@lecture_en_cache
+def get_produits_page(page=1, taille_page=30, tri='nom', descendant=False, recherche=None):
+    """
+    Une page de produits, triée et découpée en SQL (LIMIT/OFFSET).
+    Retourne {'lignes', 'page', 'a_suivante', 'total'} ; 'total' vaut None en
+    recherche (classement par pertinence, seul le tri par défaut s'applique).
+    """
+    if tri not in TRIS_PRODUITS:
+        raise ValueError(f"Tri invalide : {tri}. Attendu : {', '.join(TRIS_PRODUITS)}")
+    page = max(1, int(page))
+    offset = (page - 1) * taille_page
+    
+    # Une ligne de plus que la page pour savoir s'il en existe une suivante
+    if recherche:
+        lignes = search_produits(recherche, limit=taille_page + 1, offset=offset)
+        total = None
+    else:
+        sens = "DESC" if descendant else "ASC"
+        lignes = fetch_all(f"""
+            SELECT 
+                p.*,
+                c.nom as categorie_nom,
+                c.couleur as categorie_couleur,
+                f.nom as fournisseur_nom
+            FROM produits p
+            LEFT JOIN categories c ON p.categorie_id = c.id
+            LEFT JOIN fournisseurs f ON p.fournisseur_id = f.id
+            ORDER BY {TRIS_PRODUITS[tri]} {sens}, p.id {sens}
+            LIMIT ? OFFSET ?
+        """, (taille_page + 1, offset))
+        total = get_statistiques()['total_produits']
+    
+    return {
+        'lignes': lignes[:taille_page],
+        'page': page,
+        'a_suivante': len(lignes) > taille_page,
+        'total': total,
+    }
+
 def get_produits_dataframe():
     """Récupère les produits en DataFrame"""
     return to_dataframe("""
@@ -260,10 +1388,20 @@ def get_produits_dataframe():
         ORDER BY p.nom
     """)
 
+@lecture_en_cache
 def get_produit_by_id(produit_id):
     """Récupère un produit par son ID"""
     return fetch_one("SELECT * FROM produits WHERE id = ?", (produit_id,))
 
+def get_produits_by_references(references):
+    """Résout des références produit en une requête (index unique) : {reference: produit}"""
+    references = list(dict.fromkeys(r for r in references if r))
+    if not references:
+        return {}
+    marqueurs = ", ".join("?" for _ in references)
+    lignes = fetch_all(f"SELECT * FROM produits WHERE reference IN ({marqueurs})", references)
+    return {ligne['reference']: ligne for ligne in lignes}
+
 def add_produit(produit_data):
     """
     Ajoute un nouveau produit avec validation améliorée
@@ -311,64 +1449,195 @@ def add_produit(produit_data):
     
     return cursor.lastrowid
 
-def update_stock(produit_id, quantite, type_mouvement="ajustement", motif="", utilisateur="admin", document_ref=""):
+TYPES_MOUVEMENT = ('entree', 'sortie', 'ajustement', 'inventaire')
+
+def _appliquer_mouvement(conn, produit_id, quantite, type_mouvement, motif, utilisateur, document_ref):
     """
-    Met à jour le stock d'un produit et enregistre le mouvement
-    Version corrigée sans date_modification
+    Applique un mouvement sur une connexion déjà en transaction.
+    Le contrôle de stock d'une sortie est fait dans l'UPDATE lui-même
+    (décrément conditionnel), la nouvelle quantité est relue via RETURNING.
+    Retourne (quantite_avant, quantite_apres).
     """
-    # Récupérer le produit
-    produit = get_produit_by_id(produit_id)
-    if not produit:
-        raise ValueError(f"Produit {produit_id} non trouvé")
-    
-    quantite_avant = produit['quantite']
-    quantite_apres = quantite_avant
-    
-    # Calculer la nouvelle quantité selon le type
-    if type_mouvement == 'entree':
-        quantite_apres = quantite_avant + quantite
-    elif type_mouvement == 'sortie':
-        if quantite_avant < quantite:
+    if type_mouvement not in TYPES_MOUVEMENT:
+        raise ValueError(f"Type de mouvement invalide: {type_mouvement}")
+
+    if type_mouvement in ('entree', 'sortie'):
+        if quantite <= 0:
+            raise ValueError("La quantité doit être strictement positive")
+
+        if type_mouvement == 'entree':
+            rows = conn.execute(
+                "UPDATE produits SET quantite = quantite + ? WHERE id = ? RETURNING quantite",
+                (quantite, produit_id)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "UPDATE produits SET quantite = quantite - ? "
+                "WHERE id = ? AND quantite >= ? RETURNING quantite",
+                (quantite, produit_id, quantite)
+            ).fetchall()
+
+        if not rows:
+            produit = conn.execute(
+                "SELECT nom, quantite FROM produits WHERE id = ?", (produit_id,)
+            ).fetchone()
+            if not produit:
+                raise ValueError(f"Produit {produit_id} non trouvé")
             raise ValueError(
                 f"Stock insuffisant pour '{produit['nom']}'. "
-                f"Disponible: {quantite_avant}, Demandé: {quantite}"
+                f"Disponible: {produit['quantite']}, Demandé: {quantite}"
             )
-        quantite_apres = quantite_avant - quantite
-    elif type_mouvement in ['ajustement', 'inventaire']:
+
+        quantite_apres = rows[0][0]
+        quantite_avant = quantite_apres - quantite if type_mouvement == 'entree' else quantite_apres + quantite
+
+    else:
         if quantite < 0:
             raise ValueError("La quantité ne peut pas être négative")
+        # Lecture sûre : la transaction IMMEDIATE détient déjà le verrou d'écriture
+        produit = conn.execute("SELECT quantite FROM produits WHERE id = ?", (produit_id,)).fetchone()
+        if not produit:
+            raise ValueError(f"Produit {produit_id} non trouvé")
+        quantite_avant = produit['quantite']
         quantite_apres = quantite
-    else:
-        raise ValueError(f"Type de mouvement invalide: {type_mouvement}")
-    
-    # Mettre à jour le produit (SANS date_modification)
-    cursor = execute_query(
-        "UPDATE produits SET quantite = ? WHERE id = ?",
-        (quantite_apres, produit_id)
-    )
-    
-    # Enregistrer le mouvement (adapté à votre structure actuelle)
-    if cursor.rowcount > 0:
-        # Votre table mouvements actuelle n'a pas 'quantite_avant', 'quantite_apres', 'utilisateur'
-        # Utilisez la structure actuelle
-        execute_query("""
+        conn.execute("UPDATE produits SET quantite = ? WHERE id = ?", (quantite_apres, produit_id))
+
+    conn.execute("""
+        INSERT INTO mouvements 
+        (produit_id, type, quantite, quantite_avant, quantite_apres, motif, utilisateur, document_ref)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        produit_id, type_mouvement, quantite,
+        quantite_avant, quantite_apres,
+        motif, utilisateur, document_ref
+    ))
+    return quantite_avant, quantite_apres
+
+def update_stock(produit_id, quantite, type_mouvement="ajustement", motif="", utilisateur="admin", document_ref=""):
+    """
+    Met à jour le stock d'un produit et enregistre le mouvement,
+    en une seule transaction atomique.
+    Retourne un dict {'quantite_avant', 'quantite_apres'}.
+    """
+    with transaction() as conn:
+        quantite_avant, quantite_apres = _appliquer_mouvement(
+            conn, produit_id, quantite, type_mouvement, motif, utilisateur, document_ref
+        )
+        _rafraichir_mouvements_daily(conn)
+
+    logger.info(f"Mouvement enregistré: {type_mouvement} {quantite} unités de produit {produit_id}")
+    return {'quantite_avant': quantite_avant, 'quantite_apres': quantite_apres}
+
+MODES_LOT = ('tout_ou_rien', 'meilleur_effort')
+
+def _appliquer_lot(conn, lignes, mode, utilisateur, document_ref):
+    """
+    Applique un lot de mouvements sur une connexion déjà en transaction
+    (voir update_stock_batch pour le contrat).
+    """
+    if mode not in MODES_LOT:
+        raise ValueError(f"Mode invalide: {mode}")
+
+    lignes = list(lignes)
+    resultats = []
+
+    # Instantané des stocks concernés (par paquets pour rester sous la limite de paramètres)
+    ids = list({ligne[0] for ligne in lignes})
+    stocks = {}
+    for i in range(0, len(ids), 500):
+        paquet = ids[i:i + 500]
+        for row in conn.execute(
+            f"SELECT id, nom, quantite FROM produits WHERE id IN ({','.join('?' * len(paquet))})",
+            paquet
+        ):
+            stocks[row['id']] = {'nom': row['nom'], 'quantite': row['quantite']}
+
+    # Validation séquentielle sur l'instantané (plusieurs lignes peuvent viser le même produit)
+    mouvements = []
+    for numero, (produit_id, type_mouvement, quantite, motif) in enumerate(lignes, start=1):
+        resultat = {
+            'ligne': numero, 'produit_id': produit_id, 'type': type_mouvement,
+            'quantite': quantite, 'statut': 'ok', 'message': '',
+            'quantite_avant': None, 'quantite_apres': None
+        }
+        produit = stocks.get(produit_id)
+        if type_mouvement not in TYPES_MOUVEMENT:
+            resultat['message'] = f"Type de mouvement invalide: {type_mouvement}"
+        elif not produit:
+            resultat['message'] = f"Produit {produit_id} non trouvé"
+        elif type_mouvement in ('entree', 'sortie') and quantite <= 0:
+            resultat['message'] = "La quantité doit être strictement positive"
+        elif quantite < 0:
+            resultat['message'] = "La quantité ne peut pas être négative"
+        elif type_mouvement == 'sortie' and produit['quantite'] < quantite:
+            resultat['message'] = (
+                f"Stock insuffisant pour '{produit['nom']}'. "
+                f"Disponible: {produit['quantite']}, Demandé: {quantite}"
+            )
+
+        if resultat['message']:
+            resultat['statut'] = 'rejetee'
+        else:
+            avant = produit['quantite']
+            if type_mouvement == 'entree':
+                apres = avant + quantite
+            elif type_mouvement == 'sortie':
+                apres = avant - quantite
+            else:
+                apres = quantite
+            produit['quantite'] = apres
+            resultat['quantite_avant'], resultat['quantite_apres'] = avant, apres
+            mouvements.append((
+                produit_id, type_mouvement, quantite, avant, apres,
+                motif, utilisateur, document_ref
+            ))
+        resultats.append(resultat)
+
+    rejetees = sum(1 for r in resultats if r['statut'] == 'rejetee')
+    if mode == 'tout_ou_rien' and rejetees:
+        for r in resultats:
+            if r['statut'] == 'ok':
+                r['statut'] = 'non_appliquee'
+        mouvements = []
+    elif mouvements:
+        produits_modifies = {m[0] for m in mouvements}
+        conn.executemany(
+            "UPDATE produits SET quantite = ? WHERE id = ?",
+            [(stocks[pid]['quantite'], pid) for pid in produits_modifies]
+        )
+        conn.executemany("""
             INSERT INTO mouvements 
-            (produit_id, type, quantite, motif)
-            VALUES (?, ?, ?, ?)
-        """, (
-            produit_id, 
-            type_mouvement, 
-            quantite, 
-            motif
-        ))
-        
-        logger.info(f"Mouvement enregistré: {type_mouvement} {quantite} unités de produit {produit_id}")
-        return True
-    
-    return False
+            (produit_id, type, quantite, quantite_avant, quantite_apres, motif, utilisateur, document_ref)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, mouvements)
+
+    return {'appliquees': len(mouvements), 'rejetees': rejetees, 'lignes': resultats}
+
+def update_stock_batch(lignes, mode="tout_ou_rien", utilisateur="admin", document_ref=""):
+    """
+    Applique un lot de mouvements [(produit_id, type, quantite, motif), ...]
+    en une seule transaction.
+    Toutes les lignes sont validées contre un même instantané des stocks, puis
+    écrites avec executemany.
+    - mode 'tout_ou_rien'   : aucune ligne n'est appliquée si une ligne est invalide
+    - mode 'meilleur_effort': les lignes valides sont appliquées, les autres rejetées
+    Retourne {'appliquees': n, 'rejetees': n, 'lignes': [résultat par ligne]}
+    """
+    with transaction() as conn:
+        resultat = _appliquer_lot(conn, lignes, mode, utilisateur, document_ref)
+        if resultat['appliquees']:
+            _rafraichir_mouvements_daily(conn)
+
+    logger.info(f"Lot de mouvements: {resultat['appliquees']} appliqués, {resultat['rejetees']} rejetés ({mode})")
+    return resultat
 
 def get_produits_en_alerte():
-    """Récupère les produits dont le stock est faible"""
+    """
+    Récupère les produits dont le stock est faible.
+    Le + du tri écarte idx_produits_quantite (parcours complet dans l'ordre du tri) :
+    la recherche passe par l'index d'expression idx_produits_alerte, puis trie les
+    quelques produits trouvés.
+    """
     return fetch_all("""
         SELECT 
             p.*,
@@ -377,52 +1646,75 @@ def get_produits_en_alerte():
         FROM produits p
         LEFT JOIN categories c ON p.categorie_id = c.id
         LEFT JOIN fournisseurs f ON p.fournisseur_id = f.id
-        WHERE p.quantite <= p.seuil_min
-        ORDER BY p.quantite ASC
+        WHERE p.quantite - p.seuil_min <= 0
+        ORDER BY +p.quantite ASC
     """)
 
 # ============================================================================
 # FONCTIONS STATISTIQUES
 # ============================================================================
 
+@lecture_en_cache(ttl=CACHE_TTL_STATISTIQUES)
 def get_statistiques():
-    """Récupère les statistiques principales"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    stats = {}
-    
-    # Total produits
-    cursor.execute("SELECT COUNT(*) FROM produits")
-    stats['total_produits'] = cursor.fetchone()[0]
-    
-    # Valeur totale
-    cursor.execute("SELECT SUM(quantite * prix_vente) FROM produits")
-    stats['valeur_totale'] = cursor.fetchone()[0] or 0
-    
-    # Alertes
-    cursor.execute("SELECT COUNT(*) FROM produits WHERE quantite <= seuil_min")
-    stats['alertes'] = cursor.fetchone()[0]
-    
-    # Épuisés
-    cursor.execute("SELECT COUNT(*) FROM produits WHERE quantite = 0")
-    stats['epuises'] = cursor.fetchone()[0]
-    
-    # Fournisseurs
-    cursor.execute("SELECT COUNT(*) FROM fournisseurs")
-    stats['total_fournisseurs'] = cursor.fetchone()[0]
-    
-    # Catégories
-    cursor.execute("SELECT COUNT(*) FROM categories")
-    stats['total_categories'] = cursor.fetchone()[0]
-    
-    conn.close()
+    """
+    Récupère les statistiques principales (lecture de la table stats matérialisée).
+    Partagées entre sessions : relues après une écriture ou passé CACHE_TTL_STATISTIQUES.
+    """
+    stats = fetch_one("""
+        SELECT total_produits, valeur_totale, alertes, epuises, total_fournisseurs, total_categories
+        FROM stats WHERE id = 1
+    """)
+    if stats is None:
+        return recompute_statistiques()
     return stats
 
+def recompute_statistiques():
+    """Recalcule entièrement les tables stats et stats_categories (réparation en cas de dérive des compteurs)"""
+    with transaction() as conn:
+        conn.execute(REQUETE_RECALCUL_STATS)
+        for requete in REQUETES_RECALCUL_STATS_CATEGORIES:
+            conn.execute(requete)
+    logger.info("Statistiques recalculées")
+    return get_statistiques()
+
+@lecture_en_cache
+def count_produits_par_categorie():
+    """
+    Nombre de produits par catégorie, lu dans stats_categories (tenue à jour par
+    triggers) : le coût dépend du nombre de catégories, pas du catalogue.
+    """
+    return fetch_all("""
+        SELECT 
+            c.nom as categorie_nom,
+            c.couleur as categorie_couleur,
+            s.nb_produits
+        FROM stats_categories s
+        LEFT JOIN categories c ON s.categorie_id = c.id
+        WHERE s.nb_produits > 0
+        ORDER BY s.nb_produits DESC
+    """)
+
+@lecture_en_cache
+def top_produits_par_valeur(n=10):
+    """Les n produits de plus forte valeur de stock (parcours de l'index quantite * prix_vente)"""
+    return fetch_all("""
+        SELECT 
+            p.id,
+            p.reference,
+            p.nom,
+            p.quantite,
+            p.prix_vente,
+            p.quantite * p.prix_vente as valeur_stock
+        FROM produits p
+        ORDER BY p.quantite * p.prix_vente DESC
+        LIMIT ?
+    """, (n,))
+
 # ============================================================================
 # FONCTIONS FOURNISSEURS
 # ============================================================================
 
+@lecture_en_cache
 def get_all_fournisseurs():
     """Récupère tous les fournisseurs"""
     return fetch_all("SELECT * FROM fournisseurs ORDER BY nom")
@@ -458,23 +1750,19 @@ def delete_fournisseur(fournisseur_id):
 def backup_database():
     """Crée une sauvegarde de la base"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
     backup_path = BACKUP_DIR / f"backup_{timestamp}.db"
     
-    import shutil
-    shutil.copy2(DB_PATH, backup_path)
+    # API de sauvegarde SQLite : copie cohérente, y compris les pages encore dans le WAL
+    destination = sqlite3.connect(backup_path)
+    try:
+        get_pooled_connection().backup(destination)
+    finally:
+        destination.close()
     
     logger.info(f"✅ Backup créé: {backup_path}")
     return str(backup_path)
 
-def export_to_csv(table_name):
-    """Exporte une table en CSV"""
-    df = to_dataframe(f"SELECT * FROM {table_name}")
-    csv_path = f"export_{table_name}_{datetime.now().strftime('%Y%m%d')}.csv"
-    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-    return csv_path
-
-# Initialiser la base au chargement du module
-init_database()
 
 
 # ============================================
@@ -485,71 +1773,413 @@ init_database()
 # FONCTIONS MOUVEMENTS DE STOCK (HISTORIQUE)
 # ============================================
 
-def get_mouvements(filtres=None):
-    """
-    Récupère l'historique des mouvements de stock avec filtres
-    Version adaptée à votre structure actuelle
+def _date_iso(valeur):
+    """Normalise une date (date, datetime ou chaîne 'YYYY-MM-DD...') en objet date"""
+    if isinstance(valeur, datetime):
+        return valeur.date()
+    if isinstance(valeur, date):
+        return valeur
+    return date.fromisoformat(str(valeur)[:10])
+
+REQUETE_MOUVEMENTS = """
+    SELECT 
+        m.*,
+        p.reference as produit_reference,
+        p.nom as produit_nom,
+        c.nom as categorie_nom
+    FROM mouvements m
+    LEFT JOIN produits p ON m.produit_id = p.id
+    LEFT JOIN categories c ON p.categorie_id = c.id
+    WHERE 1=1
+"""
+
+def _filtres_mouvements(filtres):
     """
-    # Requête adaptée à votre table mouvements actuelle
-    query = """
-        SELECT 
-            m.*,
-            p.reference as produit_reference,
-            p.nom as produit_nom,
-            c.nom as categorie_nom
-        FROM mouvements m
-        LEFT JOIN produits p ON m.produit_id = p.id
-        LEFT JOIN categories c ON p.categorie_id = c.id
-        WHERE 1=1
+    Construit les conditions SQL (et leurs paramètres) des filtres de mouvements.
+    Les dates sont comparées en intervalle semi-ouvert sur la colonne brute
+    (date_mouvement >= début ET < lendemain de la fin) pour utiliser les index.
     """
-    
+    conditions = ""
     params = []
     
-    # Application des filtres (simplifiée)
     if filtres:
         if 'date_debut' in filtres and filtres['date_debut']:
-            query += " AND DATE(m.date_mouvement) >= DATE(?)"
-            params.append(filtres['date_debut'])
+            conditions += " AND m.date_mouvement >= ?"
+            params.append(_date_iso(filtres['date_debut']).isoformat())
         
         if 'date_fin' in filtres and filtres['date_fin']:
-            query += " AND DATE(m.date_mouvement) <= DATE(?)"
-            params.append(filtres['date_fin'])
+            conditions += " AND m.date_mouvement < ?"
+            params.append((_date_iso(filtres['date_fin']) + timedelta(days=1)).isoformat())
         
         if 'type_mouvement' in filtres and filtres['type_mouvement']:
             if filtres['type_mouvement'].lower() != 'tous':
-                query += " AND m.type = ?"
+                conditions += " AND m.type = ?"
                 params.append(filtres['type_mouvement'].lower())
         
         if 'produit_id' in filtres and filtres['produit_id']:
-            query += " AND m.produit_id = ?"
+            conditions += " AND m.produit_id = ?"
             params.append(filtres['produit_id'])
     
-    query += " ORDER BY m.date_mouvement DESC"
+    return conditions, params
+
+def requete_mouvements(filtres=None):
+    """Requête SQL de l'historique filtré (plus récents d'abord) et ses paramètres"""
+    conditions, params = _filtres_mouvements(filtres)
+    return REQUETE_MOUVEMENTS + conditions + " ORDER BY m.date_mouvement DESC, m.id DESC", params
+
+def get_mouvements(filtres=None):
+    """
+    Récupère l'historique des mouvements de stock avec filtres
+    Version adaptée à votre structure actuelle
+    """
+    query, params = requete_mouvements(filtres)
     
-    if 'limit' in filtres and filtres['limit']:
+    if filtres and filtres.get('limit'):
         query += " LIMIT ?"
         params.append(filtres['limit'])
     
     return fetch_all(query, params)
+
+def iter_mouvements(filtres=None, chunksize=10000):
+    """Parcourt l'historique filtré par DataFrames successifs"""
+    query, params = requete_mouvements(filtres)
+    return iter_dataframes(query, params, chunksize)
+
+def _encoder_curseur(sens, ligne):
+    """Curseur opaque : position (date_mouvement, id) et sens de lecture"""
+    brut = json.dumps([sens, ligne['date_mouvement'], ligne['id']])
+    return base64.urlsafe_b64encode(brut.encode('utf-8')).decode('ascii')
+
+def _decoder_curseur(curseur):
+    try:
+        sens, date_cle, id_cle = json.loads(base64.urlsafe_b64decode(curseur.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Curseur de pagination invalide: {curseur}") from e
+    if sens not in ('suivant', 'precedent'):
+        raise ValueError(f"Curseur de pagination invalide: {curseur}")
+    return sens, date_cle, id_cle
+
+def get_mouvements_page(filtres=None, curseur=None, taille_page=50):
+    """
+    Récupère une page de l'historique des mouvements par pagination par clé
+    (seek sur (date_mouvement, id)) : le coût d'une page ne dépend pas de sa position.
+    Retourne {'lignes': [...], 'suivant': curseur ou None, 'precedent': curseur ou None}
+    """
+    conditions, params = _filtres_mouvements(filtres)
+    query = REQUETE_MOUVEMENTS + conditions
+    
+    sens = 'suivant'
+    if curseur:
+        sens, date_cle, id_cle = _decoder_curseur(curseur)
+        comparaison = "<" if sens == 'suivant' else ">"
+        query += f" AND (m.date_mouvement, m.id) {comparaison} (?, ?)"
+        params += [date_cle, id_cle]
+    
+    ordre = "DESC" if sens == 'suivant' else "ASC"
+    query += f" ORDER BY m.date_mouvement {ordre}, m.id {ordre} LIMIT ?"
+    params.append(taille_page + 1)  # une ligne de plus pour savoir s'il reste une page
+    
+    lignes = fetch_all(query, params)
+    encore = len(lignes) > taille_page
+    lignes = lignes[:taille_page]
+    if sens == 'precedent':
+        lignes.reverse()
+    
+    suivant = precedent = None
+    if lignes:
+        if sens == 'suivant':
+            suivant = _encoder_curseur('suivant', lignes[-1]) if encore else None
+            precedent = _encoder_curseur('precedent', lignes[0]) if curseur else None
+        else:
+            suivant = _encoder_curseur('suivant', lignes[-1])
+            precedent = _encoder_curseur('precedent', lignes[0]) if encore else None
+    
+    return {'lignes': lignes, 'suivant': suivant, 'precedent': precedent}
+
+# ============================================
+# AGRÉGATS JOURNALIERS DES MOUVEMENTS
+# ============================================
+
+CLE_WATERMARK_DAILY = 'mouvements_daily_watermark'
+
+def _watermark_mouvements_daily(conn):
+    row = conn.execute("SELECT valeur FROM meta WHERE cle = ?", (CLE_WATERMARK_DAILY,)).fetchone()
+    return int(row[0]) if row else 0
+
+def _rafraichir_mouvements_daily(conn):
+    """
+    Agrège dans mouvements_daily les mouvements postérieurs au watermark,
+    puis avance le watermark. À appeler dans la transaction d'écriture.
+    Retourne le nombre de mouvements intégrés.
+    """
+    watermark = _watermark_mouvements_daily(conn)
+    dernier_id = conn.execute("SELECT MAX(id) FROM mouvements").fetchone()[0]
+    if dernier_id is None or dernier_id <= watermark:
+        return 0
+    
+    cursor = conn.execute("""
+        INSERT INTO mouvements_daily (produit_id, jour, type, quantite_totale, nb_mouvements)
+        SELECT produit_id, DATE(date_mouvement), type, SUM(quantite), COUNT(*)
+        FROM mouvements
+        WHERE id > ? AND id <= ?
+        GROUP BY produit_id, DATE(date_mouvement), type
+        ON CONFLICT(produit_id, jour, type) DO UPDATE SET
+            quantite_totale = quantite_totale + excluded.quantite_totale,
+            nb_mouvements = nb_mouvements + excluded.nb_mouvements
+    """, (watermark, dernier_id))
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (cle, valeur) VALUES (?, ?)",
+        (CLE_WATERMARK_DAILY, str(dernier_id))
+    )
+    return dernier_id - watermark
+
+def _compteurs_modifications(conn):
+    """(mouvements, produits) : compteurs de modifications tenus par TRIGGERS_COMPTEURS"""
+    valeurs = dict(conn.execute(
+        "SELECT cle, CAST(valeur AS INTEGER) FROM meta WHERE cle IN (?, ?)",
+        (CLE_COMPTEUR_MOUVEMENTS, CLE_COMPTEUR_PRODUITS)
+    ).fetchall())
+    return valeurs.get(CLE_COMPTEUR_MOUVEMENTS, 0), valeurs.get(CLE_COMPTEUR_PRODUITS, 0)
+
+def _assurer_mouvements_daily():
+    """Rattrape le watermark si des mouvements ont été écrits hors de update_stock"""
+    conn = get_pooled_connection()
+    dernier_id = conn.execute("SELECT MAX(id) FROM mouvements").fetchone()[0]
+    if dernier_id is not None and dernier_id > _watermark_mouvements_daily(conn):
+        with transaction() as conn:
+            _rafraichir_mouvements_daily(conn)
+
+def rebuild_mouvements_daily(depuis_id=0):
+    """
+    Reconstruit mouvements_daily à partir du mouvement depuis_id (exclu).
+    Avec depuis_id=0 la table est entièrement reconstruite depuis le journal.
+    """
+    with transaction() as conn:
+        watermark = _watermark_mouvements_daily(conn)
+        if depuis_id <= 0:
+            conn.execute("DELETE FROM mouvements_daily")
+        elif depuis_id < watermark:
+            # Retirer la contribution des mouvements à ré-agréger
+            conn.execute("""
+                INSERT INTO mouvements_daily (produit_id, jour, type, quantite_totale, nb_mouvements)
+                SELECT produit_id, DATE(date_mouvement), type, -SUM(quantite), -COUNT(*)
+                FROM mouvements
+                WHERE id > ? AND id <= ?
+                GROUP BY produit_id, DATE(date_mouvement), type
+                ON CONFLICT(produit_id, jour, type) DO UPDATE SET
+                    quantite_totale = quantite_totale + excluded.quantite_totale,
+                    nb_mouvements = nb_mouvements + excluded.nb_mouvements
+            """, (depuis_id, watermark))
+        conn.execute("DELETE FROM mouvements_daily WHERE nb_mouvements <= 0")
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (cle, valeur) VALUES (?, ?)",
+            (CLE_WATERMARK_DAILY, str(min(max(depuis_id, 0), watermark)))
+        )
+        nb = _rafraichir_mouvements_daily(conn)
+    logger.info(f"mouvements_daily reconstruit ({nb} mouvements agrégés)")
+    return nb
+
+def _filtres_mouvements_daily(filtres):
+    """Conditions SQL des filtres de mouvements, appliquées aux agrégats journaliers"""
+    conditions = ""
+    params = []
+    
+    if filtres:
+        if filtres.get('date_debut'):
+            conditions += " AND d.jour >= ?"
+            params.append(_date_iso(filtres['date_debut']).isoformat())
+        
+        if filtres.get('date_fin'):
+            conditions += " AND d.jour <= ?"
+            params.append(_date_iso(filtres['date_fin']).isoformat())
+        
+        if filtres.get('type_mouvement') and filtres['type_mouvement'].lower() != 'tous':
+            conditions += " AND d.type = ?"
+            params.append(filtres['type_mouvement'].lower())
+        
+        if filtres.get('produit_id'):
+            conditions += " AND d.produit_id = ?"
+            params.append(filtres['produit_id'])
+    
+    return conditions, params
+
+def _source_mouvements_daily(filtres):
+    """Table d'agrégats journaliers à lire : sans filtre produit, les totaux tous produits suffisent"""
+    if filtres and filtres.get('produit_id'):
+        return "mouvements_daily"
+    return "mouvements_daily_totaux"
+
+def get_evolution_mouvements(filtres=None):
+    """
+    Récupère les volumes journaliers par type de mouvement (depuis mouvements_daily)
+    Retourne une liste de {'jour', 'type', 'quantite', 'nb_mouvements'}
+    """
+    _assurer_mouvements_daily()
+    conditions, params = _filtres_mouvements_daily(filtres)
+    return fetch_all(f"""
+        SELECT d.jour, d.type,
+               SUM(d.quantite_totale) as quantite,
+               SUM(d.nb_mouvements) as nb_mouvements
+        FROM {_source_mouvements_daily(filtres)} d
+        WHERE 1=1 {conditions}
+        GROUP BY d.jour, d.type
+        ORDER BY d.jour
+    """, params)
+
+# Regroupement des jours par période (début de période au format 'YYYY-MM-DD')
+PERIODES_MOUVEMENTS_DAILY = {
+    'jour': "d.jour",
+    'semaine': "date(d.jour, '-6 days', 'weekday 1')",
+    'mois': "substr(d.jour, 1, 7) || '-01'",
+}
+
+def get_serie_mouvements(filtres=None, granularite='jour'):
+    """
+    Volumes par période (jour, semaine ou mois) et par type de mouvement,
+    agrégés en SQL depuis mouvements_daily.
+    Retourne une liste de {'periode', 'type', 'quantite', 'nb_mouvements'}
+    """
+    if granularite not in PERIODES_MOUVEMENTS_DAILY:
+        raise ValueError(f"Granularité invalide : {granularite}. Attendu : {', '.join(PERIODES_MOUVEMENTS_DAILY)}")
+    _assurer_mouvements_daily()
+    conditions, params = _filtres_mouvements_daily(filtres)
+    return fetch_all(f"""
+        SELECT {PERIODES_MOUVEMENTS_DAILY[granularite]} as periode, d.type,
+               SUM(d.quantite_totale) as quantite,
+               SUM(d.nb_mouvements) as nb_mouvements
+        FROM {_source_mouvements_daily(filtres)} d
+        WHERE 1=1 {conditions}
+        GROUP BY periode, d.type
+        ORDER BY periode
+    """, params)
+
+def get_totaux_mouvements(filtres=None):
+    """Nombre de mouvements et quantités par type sur la période filtrée"""
+    _assurer_mouvements_daily()
+    conditions, params = _filtres_mouvements_daily(filtres)
+    return fetch_all(f"""
+        SELECT d.type,
+               SUM(d.quantite_totale) as quantite,
+               SUM(d.nb_mouvements) as nb_mouvements
+        FROM {_source_mouvements_daily(filtres)} d
+        WHERE 1=1 {conditions}
+        GROUP BY d.type
+    """, params)
+
+def get_bornes_mouvements(filtres=None):
+    """Premier et dernier jour ayant des mouvements : {'debut', 'fin'} (None si aucun)"""
+    _assurer_mouvements_daily()
+    conditions, params = _filtres_mouvements_daily(filtres)
+    return fetch_one(f"""
+        SELECT MIN(d.jour) as debut, MAX(d.jour) as fin
+        FROM {_source_mouvements_daily(filtres)} d
+        WHERE 1=1 {conditions}
+    """, params)
+
+def _premier_du_mois(jour, decalage=0):
+    mois = jour.month - 1 + decalage
+    return date(jour.year + mois // 12, mois % 12 + 1, 1)
+
+def _morceaux_volumes(filtres):
+    """
+    Découpe la période filtrée en mois complets, lus dans mouvements_monthly, et en
+    jours de bord, lus dans mouvements_daily. Retourne une liste de (requête, params)
+    donnant produit_id, quantite_totale, nb_mouvements.
+    """
+    filtres = filtres or {}
+    debut = _date_iso(filtres['date_debut']) if filtres.get('date_debut') else None
+    fin = _date_iso(filtres['date_fin']) if filtres.get('date_fin') else None
+    
+    type_sql, type_params = "", []
+    if filtres.get('type_mouvement') and filtres['type_mouvement'].lower() != 'tous':
+        type_sql, type_params = " AND type = ?", [filtres['type_mouvement'].lower()]
+    
+    def jours(de, a):
+        return ("SELECT produit_id, quantite_totale, nb_mouvements FROM mouvements_daily "
+                f"WHERE jour >= ? AND jour <= ?{type_sql}", [de.isoformat(), a.isoformat()] + type_params)
+    
+    # Mois complets : [premier_mois, fin_mois[
+    premier_mois = None if debut is None else (debut if debut.day == 1 else _premier_du_mois(debut, 1))
+    fin_mois = None if fin is None else _premier_du_mois(fin, 1 if (fin + timedelta(days=1)).day == 1 else 0)
+    if premier_mois and fin_mois and premier_mois >= fin_mois:
+        return [jours(debut, fin)]
+    
+    conditions, params = "", []
+    if premier_mois:
+        conditions += " AND mois >= ?"
+        params.append(premier_mois.strftime('%Y-%m'))
+    if fin_mois:
+        conditions += " AND mois < ?"
+        params.append(fin_mois.strftime('%Y-%m'))
+    morceaux = [(
+        "SELECT produit_id, quantite_totale, nb_mouvements FROM mouvements_monthly "
+        f"WHERE 1=1{conditions}{type_sql}", params + type_params
+    )]
+    if debut and debut < premier_mois:
+        morceaux.append(jours(debut, premier_mois - timedelta(days=1)))
+    if fin and fin >= fin_mois:
+        morceaux.append(jours(fin_mois, fin))
+    return morceaux
+
+def get_volumes_produits(filtres=None, limit=10):
+    """
+    Récupère les produits au plus fort volume de mouvements sur la période filtrée.
+    Sans filtre produit, les mois complets sont lus dans mouvements_monthly et seuls
+    les jours de bord dans mouvements_daily.
+    """
+    _assurer_mouvements_daily()
+    if not (filtres and filtres.get('produit_id')):
+        morceaux = _morceaux_volumes(filtres)
+        union = " UNION ALL ".join(requete for requete, _ in morceaux)
+        params = [p for _, morceau_params in morceaux for p in morceau_params]
+        return fetch_all(f"""
+            SELECT p.id, p.reference, p.nom as produit_nom, v.quantite, v.nb_mouvements
+            FROM (
+                SELECT produit_id,
+                       SUM(quantite_totale) as quantite,
+                       SUM(nb_mouvements) as nb_mouvements
+                FROM ({union})
+                GROUP BY produit_id
+                ORDER BY quantite DESC
+                LIMIT ?
+            ) v
+            JOIN produits p ON p.id = v.produit_id
+            ORDER BY v.quantite DESC
+        """, params + [limit])
+    
+    conditions, params = _filtres_mouvements_daily(filtres)
+    return fetch_all(f"""
+        SELECT p.id, p.reference, p.nom as produit_nom,
+               SUM(d.quantite_totale) as quantite,
+               SUM(d.nb_mouvements) as nb_mouvements
+        FROM mouvements_daily d
+        JOIN produits p ON p.id = d.produit_id
+        WHERE 1=1 {conditions}
+        GROUP BY p.id, p.reference, p.nom
+        ORDER BY quantite DESC
+        LIMIT ?
+    """, params + [limit])
+
 def get_top_produits_mouvements(limit=10, periode_jours=30):
     """
-    Récupère les produits avec le plus de mouvements
+    Récupère les produits avec le plus de mouvements (depuis mouvements_daily)
     """
+    _assurer_mouvements_daily()
     query = """
         SELECT 
             p.id,
             p.reference,
             p.nom,
             c.nom as categorie_nom,
-            COUNT(m.id) as nombre_mouvements,
-            SUM(CASE WHEN m.type = 'entree' THEN m.quantite ELSE 0 END) as total_entrees,
-            SUM(CASE WHEN m.type = 'sortie' THEN m.quantite ELSE 0 END) as total_sorties,
-            (SUM(CASE WHEN m.type = 'entree' THEN m.quantite ELSE 0 END) - 
-             SUM(CASE WHEN m.type = 'sortie' THEN m.quantite ELSE 0 END)) as solde
-        FROM produits p
-        LEFT JOIN mouvements m ON p.id = m.produit_id
+            SUM(d.nb_mouvements) as nombre_mouvements,
+            SUM(CASE WHEN d.type = 'entree' THEN d.quantite_totale ELSE 0 END) as total_entrees,
+            SUM(CASE WHEN d.type = 'sortie' THEN d.quantite_totale ELSE 0 END) as total_sorties,
+            (SUM(CASE WHEN d.type = 'entree' THEN d.quantite_totale ELSE 0 END) - 
+             SUM(CASE WHEN d.type = 'sortie' THEN d.quantite_totale ELSE 0 END)) as solde
+        FROM mouvements_daily d
+        JOIN produits p ON p.id = d.produit_id
         LEFT JOIN categories c ON p.categorie_id = c.id
-        WHERE m.date_mouvement >= DATE('now', ?)
+        WHERE d.jour >= DATE('now', ?)
         GROUP BY p.id, p.reference, p.nom, c.nom
         ORDER BY nombre_mouvements DESC
         LIMIT ?
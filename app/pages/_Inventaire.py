@@ -3,6 +3,8 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 from models import database
+from services import export_service, stock_service
+from components.selecteur_produit import selecteur_produit
 
 def show():
     st.title("📊 Gestion des Stocks et Inventaire")
@@ -22,28 +24,15 @@ def show():
         st.header("📥 Entrées de Stock")
         st.markdown("Enregistrez les nouvelles arrivées de marchandises")
         
+        # Sélection du produit (hors formulaire : les suggestions suivent la saisie)
+        produit_info = selecteur_produit("entree_produit", aide="Sélectionnez le produit à réapprovisionner")
+        produit_id = produit_info['id'] if produit_info else None
+        
         # Formulaire d'entrée
         with st.form("form_entree_stock", clear_on_submit=True):
             col1, col2 = st.columns(2)
             
             with col1:
-                # Sélection du produit
-                produits = database.get_all_produits()
-                if produits:
-                    produits_dict = {p['id']: f"{p['reference']} - {p['nom']} (Stock: {p['quantite']})" 
-                                   for p in produits}
-                    
-                    produit_id = st.selectbox(
-                        "Produit *",
-                        options=list(produits_dict.keys()),
-                        format_func=lambda x: produits_dict[x],
-                        help="Sélectionnez le produit à réapprovisionner"
-                    )
-                else:
-                    st.warning("Aucun produit disponible. Créez d'abord des produits.")
-                    produit_id = None
-            
-            with col2:
                 quantite = st.number_input(
                     "Quantité *",
                     min_value=1,
@@ -51,16 +40,15 @@ def show():
                     step=1,
                     help="Nombre d'unités à ajouter au stock"
                 )
-                
-                # Récupérer le produit sélectionné pour info
-                if produit_id:
-                    produit_info = next((p for p in produits if p['id'] == produit_id), None)
-                    if produit_info:
-                        st.metric(
-                            "Stock actuel",
-                            f"{produit_info['quantite']} unités",
-                            f"+{quantite}"
-                        )
+            
+            with col2:
+                # Produit sélectionné pour info
+                if produit_info:
+                    st.metric(
+                        "Stock actuel",
+                        f"{produit_info['quantite']} unités",
+                        f"+{quantite}"
+                    )
             
             # Champs supplémentaires
             motif = st.selectbox(
@@ -96,12 +84,8 @@ def show():
             
             if submitted and produit_id:
                 try:
-                    # Récupérer le stock avant
-                    produit_avant = database.get_produit_by_id(produit_id)
-                    stock_avant = produit_avant['quantite']
-                    
-                    # Mettre à jour le stock
-                    success = database.update_stock(
+                    # Mettre à jour le stock (retourne le stock avant/après)
+                    resultat = stock_service.enregistrer_mouvement(
                         produit_id=produit_id,
                         quantite=quantite,
                         type_mouvement="entree",
@@ -110,16 +94,15 @@ def show():
                         document_ref=reference_doc
                     )
                     
-                    if success:
-                        # Récupérer le stock après
-                        produit_apres = database.get_produit_by_id(produit_id)
-                        stock_apres = produit_apres['quantite']
+                    if resultat:
+                        stock_avant = resultat['quantite_avant']
+                        stock_apres = resultat['quantite_apres']
                         
                         st.success(f"""
                         ✅ Entrée de stock enregistrée avec succès !
                         
                         **Détails :**
-                        - Produit: {produits_dict[produit_id]}
+                        - Produit: {produit_info['reference']} - {produit_info['nom']}
                         - Quantité ajoutée: **{quantite} unités**
                         - Stock avant: **{stock_avant}** → Stock après: **{stock_apres}**
                         - Motif: {motif}
@@ -132,6 +115,88 @@ def show():
                     st.error(f"❌ Erreur: {str(e)}")
             elif submitted:
                 st.error("❌ Veuillez sélectionner un produit")
+        
+        # Réception multi-lignes (bon de livraison complet)
+        st.markdown("---")
+        st.subheader("📦 Réception multi-lignes")
+        st.caption("Saisissez toutes les lignes d'un bon de livraison : elles sont enregistrées en une seule transaction.")
+        
+        lignes_df = st.data_editor(
+            pd.DataFrame({
+                'reference': pd.Series(dtype='str'),
+                'quantite': pd.Series(dtype='int'),
+                'motif': pd.Series(dtype='str')
+            }),
+            num_rows="dynamic",
+            column_config={
+                # Saisie de la référence (résolue en une requête à l'enregistrement)
+                'reference': st.column_config.TextColumn("Référence produit *", required=True),
+                'quantite': st.column_config.NumberColumn("Quantité *", min_value=1, step=1, required=True),
+                'motif': st.column_config.TextColumn("Motif")
+            },
+            use_container_width=True,
+            key="reception_lignes"
+        )
+        
+        col_rec1, col_rec2 = st.columns([2, 1])
+        with col_rec1:
+            reference_bl = st.text_input(
+                "Référence bon de livraison",
+                placeholder="Ex: BL-1234...",
+                key="reception_ref"
+            )
+        with col_rec2:
+            tout_ou_rien = st.checkbox(
+                "Tout ou rien",
+                value=True,
+                help="Si coché, aucune ligne n'est enregistrée lorsqu'une ligne est invalide",
+                key="reception_mode"
+            )
+        
+        if st.button("✅ Enregistrer la réception", type="primary", key="reception_valider"):
+            saisies = [
+                row for row in lignes_df.to_dict('records')
+                if isinstance(row.get('reference'), str) and row['reference'].strip()
+                and pd.notna(row.get('quantite'))
+            ]
+            connus = database.get_produits_by_references(row['reference'].strip() for row in saisies)
+            inconnues = [row['reference'] for row in saisies if row['reference'].strip() not in connus]
+            lignes = [
+                (connus[row['reference'].strip()]['id'], 'entree', int(row['quantite']),
+                 row['motif'] if isinstance(row['motif'], str) and row['motif'] else "Réception fournisseur")
+                for row in saisies
+                if row['reference'].strip() in connus
+            ]
+            
+            if inconnues:
+                st.error(f"❌ Référence(s) inconnue(s) : {', '.join(inconnues)}")
+            elif not lignes:
+                st.error("❌ Ajoutez au moins une ligne complète (produit et quantité)")
+            else:
+                try:
+                    resultat = stock_service.enregistrer_lot(
+                        lignes,
+                        mode="tout_ou_rien" if tout_ou_rien else "meilleur_effort",
+                        document_ref=reference_bl
+                    )
+                    
+                    if resultat['rejetees']:
+                        st.warning(
+                            f"⚠️ {resultat['appliquees']} ligne(s) enregistrée(s), "
+                            f"{resultat['rejetees']} rejetée(s)"
+                        )
+                    else:
+                        st.success(f"✅ Réception enregistrée : {resultat['appliquees']} ligne(s)")
+                    
+                    st.dataframe(
+                        pd.DataFrame(resultat['lignes'])[
+                            ['ligne', 'produit_id', 'quantite', 'statut', 'quantite_avant', 'quantite_apres', 'message']
+                        ],
+                        hide_index=True,
+                        use_container_width=True
+                    )
+                except Exception as e:
+                    st.error(f"❌ Erreur: {str(e)}")
     
     # ============================================
     # TAB 2 : SORTIES DE STOCK
@@ -140,35 +205,14 @@ def show():
         st.header("📤 Sorties de Stock")
         st.markdown("Enregistrez les sorties de marchandises (ventes, pertes, etc.)")
         
+        # Sélection du produit parmi ceux en stock (hors formulaire)
+        produit_info = selecteur_produit("sortie_produit", en_stock=True, aide="Sélectionnez le produit à sortir")
+        produit_id = produit_info['id'] if produit_info else None
+        
         with st.form("form_sortie_stock", clear_on_submit=True):
             col1, col2 = st.columns(2)
             
             with col1:
-                # Sélection du produit
-                produits = database.get_all_produits()
-                if produits:
-                    # Filtrer les produits avec stock > 0
-                    produits_dispo = [p for p in produits if p['quantite'] > 0]
-                    
-                    if produits_dispo:
-                        produits_dict = {p['id']: f"{p['reference']} - {p['nom']} (Stock: {p['quantite']})" 
-                                       for p in produits_dispo}
-                        
-                        produit_id = st.selectbox(
-                            "Produit *",
-                            options=list(produits_dict.keys()),
-                            format_func=lambda x: produits_dict[x],
-                            key="sortie_produit",
-                            help="Sélectionnez le produit à sortir"
-                        )
-                    else:
-                        st.warning("⚠️ Aucun produit en stock disponible")
-                        produit_id = None
-                else:
-                    st.warning("Aucun produit disponible")
-                    produit_id = None
-            
-            with col2:
                 quantite = st.number_input(
                     "Quantité *",
                     min_value=1,
@@ -177,22 +221,21 @@ def show():
                     key="sortie_quantite",
                     help="Nombre d'unités à retirer du stock"
                 )
-                
+            
+            with col2:
                 # Vérification du stock disponible
-                if produit_id:
-                    produit_info = next((p for p in produits if p['id'] == produit_id), None)
-                    if produit_info:
-                        stock_dispo = produit_info['quantite']
-                        
-                        if quantite > stock_dispo:
-                            st.error(f"❌ Stock insuffisant! Disponible: {stock_dispo}")
-                        else:
-                            st.metric(
-                                "Stock après sortie",
-                                f"{stock_dispo - quantite} unités",
-                                f"-{quantite}",
-                                delta_color="inverse"
-                            )
+                if produit_info:
+                    stock_dispo = produit_info['quantite']
+                    
+                    if quantite > stock_dispo:
+                        st.error(f"❌ Stock insuffisant! Disponible: {stock_dispo}")
+                    else:
+                        st.metric(
+                            "Stock après sortie",
+                            f"{stock_dispo - quantite} unités",
+                            f"-{quantite}",
+                            delta_color="inverse"
+                        )
             
             # Champs supplémentaires
             motif = st.selectbox(
@@ -233,14 +276,11 @@ def show():
             if submitted and produit_id:
                 try:
                     # Vérifier le stock disponible
-                    produit_info = next((p for p in produits if p['id'] == produit_id), None)
-                    if produit_info and quantite <= produit_info['quantite']:
-                        
-                        # Récupérer le stock avant
-                        stock_avant = produit_info['quantite']
+                    if quantite <= produit_info['quantite']:
                         
-                        # Mettre à jour le stock
-                        success = database.update_stock(
+                        # Mettre à jour le stock : le contrôle définitif est fait
+                        # dans la transaction (décrément conditionnel)
+                        resultat = stock_service.enregistrer_mouvement(
                             produit_id=produit_id,
                             quantite=quantite,
                             type_mouvement="sortie",
@@ -248,16 +288,15 @@ def show():
                             utilisateur="admin"
                         )
                         
-                        if success:
-                            # Récupérer le stock après
-                            produit_apres = database.get_produit_by_id(produit_id)
-                            stock_apres = produit_apres['quantite']
+                        if resultat:
+                            stock_avant = resultat['quantite_avant']
+                            stock_apres = resultat['quantite_apres']
                             
                             st.success(f"""
                             ✅ Sortie de stock enregistrée avec succès !
                             
                             **Détails :**
-                            - Produit: {produits_dict[produit_id]}
+                            - Produit: {produit_info['reference']} - {produit_info['nom']}
                             - Quantité retirée: **{quantite} unités**
                             - Stock avant: **{stock_avant}** → Stock après: **{stock_apres}**
                             - Motif: {motif}
@@ -320,22 +359,14 @@ def show():
             
             with col3:
                 # Produit
-                produits = database.get_all_produits()
-                produits_liste = ["Tous"] + [f"{p['id']} - {p['nom']}" for p in produits]
-                produit_filtre = st.selectbox(
-                    "Produit", 
-                    produits_liste,
-                    key="hist_produit"
-                )
+                produit_filtre = selecteur_produit("hist_produit", libelle="Produit", optionnel=True)
                 
-                # Limite de résultats
-                limite = st.number_input(
-                    "Nombre max de résultats",
-                    min_value=10,
-                    max_value=1000,
-                    value=100,
-                    step=10,
-                    key="hist_limit"
+                # Taille de page
+                taille_page = st.selectbox(
+                    "Mouvements par page",
+                    [25, 50, 100, 250],
+                    index=1,
+                    key="hist_taille_page"
                 )
         
         # Boutons d'action
@@ -355,7 +386,7 @@ def show():
         st.markdown("---")
         
         # Préparation des filtres pour la base de données
-        filtres = {'limit': limite}
+        filtres = {}
         
         # Gestion de la période
         from datetime import datetime, timedelta
@@ -375,16 +406,26 @@ def show():
         if type_mouvement != "Tous":
             filtres['type_mouvement'] = type_mouvement
         
-        if produit_filtre != "Tous":
-            produit_id = int(produit_filtre.split(" - ")[0])
-            filtres['produit_id'] = produit_id
+        if produit_filtre:
+            filtres['produit_id'] = produit_filtre['id']
         
         if utilisateur:
             filtres['utilisateur'] = utilisateur
         
+        # Pagination par curseur : retour à la première page si les filtres changent
+        signature = repr(sorted(filtres.items())) + str(taille_page)
+        if st.session_state.get('hist_signature') != signature:
+            st.session_state['hist_signature'] = signature
+            st.session_state['hist_curseur'] = None
+        
         # Récupération des mouvements
         try:
-            mouvements = database.get_mouvements(filtres)
+            page = database.get_mouvements_page(
+                filtres,
+                curseur=st.session_state['hist_curseur'],
+                taille_page=taille_page
+            )
+            mouvements = page['lignes']
             
             if mouvements:
                 # Conversion en DataFrame pour l'affichage
@@ -413,10 +454,10 @@ def show():
                 total_sorties = df_mouvements[df_mouvements['type'] == 'sortie']['quantite'].sum()
                 solde_net = total_entrees - total_sorties
                 
-                # Affichage des statistiques
+                # Affichage des statistiques (page courante)
                 col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
                 with col_stat1:
-                    st.metric("Mouvements", len(df_mouvements))
+                    st.metric("Mouvements (page)", len(df_mouvements))
                 with col_stat2:
                     st.metric("Entrées", f"{total_entrees} unités")
                 with col_stat3:
@@ -454,47 +495,55 @@ def show():
                     height=400
                 )
                 
+                # Navigation entre les pages
+                col_prec, col_suiv = st.columns(2)
+                with col_prec:
+                    if st.button("◀ Page précédente", disabled=page['precedent'] is None,
+                                 use_container_width=True, key="hist_precedent"):
+                        st.session_state['hist_curseur'] = page['precedent']
+                        st.rerun()
+                with col_suiv:
+                    if st.button("Page suivante ▶", disabled=page['suivant'] is None,
+                                 use_container_width=True, key="hist_suivant"):
+                        st.session_state['hist_curseur'] = page['suivant']
+                        st.rerun()
+                
                 # Options d'export
                 with st.expander("💾 Options d'export"):
                     col_exp1, col_exp2 = st.columns(2)
                     with col_exp1:
                         if st.button("📊 Exporter en CSV", use_container_width=True):
-                            csv = df_mouvements.to_csv(index=False, encoding='utf-8-sig')
+                            # Tout l'historique filtré, lu et écrit par paquets
                             st.download_button(
                                 label="Télécharger CSV",
-                                data=csv,
-                                file_name=f"historique_mouvements_{datetime.now().strftime('%Y%m%d')}.csv",
-                                mime="text/csv"
+                                data=export_service.exporter_mouvements(filtres, format="csv"),
+                                file_name=export_service.nom_fichier("historique_mouvements", "csv"),
+                                mime=export_service.type_mime("csv")
                             )
                     
                     with col_exp2:
                         if st.button("📈 Exporter en Excel", use_container_width=True):
-                            excel_path = f"historique_mouvements_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-                            df_mouvements.to_excel(excel_path, index=False)
-                            st.success(f"Exporté vers: {excel_path}")
+                            st.download_button(
+                                label="Télécharger Excel",
+                                data=export_service.exporter_mouvements(filtres, format="xlsx"),
+                                file_name=export_service.nom_fichier("historique_mouvements", "xlsx"),
+                                mime=export_service.type_mime("xlsx")
+                            )
                 
                 # Graphique d'évolution
                 st.markdown("---")
                 st.subheader("📈 Évolution des mouvements")
                 
-                if 'date_mouvement' in df_mouvements.columns:
-                    # Préparation des données pour le graphique
-                    df_graph = df_mouvements.copy()
-                    df_graph['date'] = df_graph['date_mouvement'].dt.date
-                    
-                    # Agrégation par date et type
-                    df_agg = df_graph.groupby(['date', 'type']).agg({
-                        'quantite': 'sum'
-                    }).reset_index()
+                # Agrégats journaliers pré-calculés sur toute la période filtrée
+                evolution = database.get_evolution_mouvements(filtres)
+                if evolution:
+                    df_agg = pd.DataFrame(evolution)
                     
                     # Pivot pour avoir les types en colonnes
-                    df_pivot = df_agg.pivot(index='date', columns='type', values='quantite').fillna(0)
-                    
-                    # Affichage du graphique
-                    if not df_pivot.empty:
-                        st.line_chart(df_pivot)
-                    else:
-                        st.info("Données insuffisantes pour générer le graphique")
+                    df_pivot = df_agg.pivot(index='jour', columns='type', values='quantite').fillna(0)
+                    st.line_chart(df_pivot)
+                else:
+                    st.info("Données insuffisantes pour générer le graphique")
                 
             else:
                 st.info("📭 Aucun mouvement trouvé pour les critères sélectionnés")
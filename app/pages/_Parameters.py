@@ -1,8 +1,8 @@
 # app/pages/_Parameters.py
 import streamlit as st
 import pandas as pd
-import os
 from models import database
+from services import export_service
 
 # =======================
 # CSS personnalisé
@@ -110,39 +110,65 @@ def show():
 
         # Section Export
         with col_export:
-            st.subheader("Export CSV")
-            st.markdown("Téléchargez les données au format CSV.")
+            st.subheader("Export")
+            st.markdown("Téléchargez les données (lues et écrites par paquets).")
+            
+            formats = {"CSV": "csv", "CSV compressé (gzip)": "csv.gz", "Excel": "xlsx"}
+            format_export = formats[st.selectbox("Format", list(formats), key="export_format")]
             
             # Export Produits
             if st.button("📥 Exporter les Produits"):
                 try:
-                    csv_file = database.export_to_csv("produits")
-                    with open(csv_file, "rb") as f:
-                        st.download_button(
-                            label="Télécharger CSV Produits",
-                            data=f,
-                            file_name=csv_file,
-                            mime="text/csv"
-                        )
-                    # Nettoyage (optionnel, ou garder sur le serveur)
-                    # os.remove(csv_file) 
+                    st.download_button(
+                        label="Télécharger les Produits",
+                        data=export_service.exporter_produits(format=format_export),
+                        file_name=export_service.nom_fichier("produits", format_export),
+                        mime=export_service.type_mime(format_export)
+                    )
                 except Exception as e:
                     st.error(f"Erreur export produits: {e}")
 
             # Export Mouvements
             if st.button("📥 Exporter les Mouvements"):
                 try:
-                    csv_file = database.export_to_csv("mouvements")
-                    with open(csv_file, "rb") as f:
-                        st.download_button(
-                            label="Télécharger CSV Mouvements",
-                            data=f,
-                            file_name=csv_file,
-                            mime="text/csv"
-                        )
+                    st.download_button(
+                        label="Télécharger les Mouvements",
+                        data=export_service.exporter_mouvements(format=format_export),
+                        file_name=export_service.nom_fichier("mouvements", format_export),
+                        mime=export_service.type_mime(format_export)
+                    )
                 except Exception as e:
                     st.error(f"Erreur export mouvements: {e}")
 
+        # Section Cache
+        st.markdown("---")
+        st.subheader("⚡ Cache de lecture")
+
+        stats_cache = database.get_cache_stats()
+        stats_barre = stats_cache['fonctions'].get(
+            'get_statistiques', {'hits': 0, 'misses': 0, 'taux_succes': 0.0}
+        )
+
+        col_c1, col_c2, col_c3 = st.columns(3)
+        with col_c1:
+            st.metric("Taux de succès global", f"{stats_cache['taux_succes']:.0%}",
+                      help=f"{stats_cache['hits']} lectures servies par le cache, {stats_cache['misses']} en base")
+        with col_c2:
+            st.metric("Taux de succès statistiques", f"{stats_barre['taux_succes']:.0%}",
+                      help=f"{stats_barre['hits']} lectures servies par le cache, {stats_barre['misses']} en base")
+        with col_c3:
+            st.metric("Entrées en cache", f"{stats_cache['taille']} / {stats_cache['taille_max']}",
+                      help=f"{stats_cache['lignes']} lignes conservées sur {stats_cache['lignes_max']} au plus")
+
+        st.caption(
+            f"Les statistiques de la barre latérale sont partagées entre utilisateurs : "
+            f"relues au plus toutes les {database.CACHE_TTL_STATISTIQUES:g} s, "
+            f"et immédiatement après chaque écriture."
+        )
+        if st.button("🧹 Vider le cache"):
+            database.vider_cache()
+            st.rerun()
+
     # =======================
     # TAB 3: À PROPOS
     # =======================
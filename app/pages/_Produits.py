@@ -51,18 +51,52 @@ def show():
  def afficher_produits():
     search_term = st.text_input("🔍 Rechercher un produit par nom ou référence:")
 
+    col_vue, col_tri, col_ordre, col_taille = st.columns(4)
+    with col_vue:
+        vue = st.radio("Affichage", ["Cartes", "Tableau compact"], horizontal=True, key="produits_vue")
+    with col_tri:
+        tris = {"Nom": "nom", "Stock": "quantite", "Valeur": "valeur"}
+        tri = st.selectbox("Trier par", list(tris), key="produits_tri", disabled=bool(search_term))
+    with col_ordre:
+        ordre = st.selectbox("Ordre", ["Croissant", "Décroissant"], key="produits_ordre",
+                             disabled=bool(search_term))
+    with col_taille:
+        taille_page = st.selectbox("Produits par page", [12, 30, 60, 120], index=1, key="produits_taille_page")
+
+    # Retour à la première page quand la recherche, le tri ou la taille changent
+    signature = (search_term, tri, ordre, taille_page)
+    if st.session_state.get('produits_signature') != signature:
+        st.session_state['produits_signature'] = signature
+        st.session_state['produits_page'] = 1
+
     try:
-        produits = database.get_all_produits()
-        if search_term:
-            term = search_term.lower()
-            produits = [
-                p for p in produits
-                if term in p['nom'].lower() or term in p['reference'].lower()
-            ]
+        # Seule la page visible est lue (tri et découpage en SQL)
+        resultat = database.get_produits_page(
+            page=st.session_state['produits_page'],
+            taille_page=taille_page,
+            tri=tris[tri],
+            descendant=(ordre == "Décroissant"),
+            recherche=search_term or None,
+        )
+        produits = resultat['lignes']
         
         st.markdown("<div class='produit-header'>Liste des produits existants</div>", unsafe_allow_html=True)
 
-        if produits:
+        if produits and vue == "Tableau compact":
+            st.dataframe(
+                [{
+                    "Référence": p['reference'],
+                    "Nom": p['nom'],
+                    "Catégorie": p['categorie_nom'] or '—',
+                    "Fournisseur": p['fournisseur_nom'] or '—',
+                    "Quantité": p['quantite'],
+                    "Prix Vente (€)": p['prix_vente'],
+                    "Valeur (€)": (p['quantite'] or 0) * (p['prix_vente'] or 0),
+                } for p in produits],
+                use_container_width=True,
+                hide_index=True,
+            )
+        elif produits:
             cols_per_row = 3
             for i in range(0, len(produits), cols_per_row):
                 cols = st.columns(cols_per_row)
@@ -90,6 +124,26 @@ def show():
                                 st.error("Erreur lors de la suppression")
         else:
             st.info("Aucun produit correspondant à la recherche.")
+
+        # Navigation entre les pages
+        if resultat['page'] > 1 or resultat['a_suivante']:
+            col_prec, col_info, col_suiv = st.columns([1, 2, 1])
+            with col_prec:
+                if st.button("◀ Précédente", disabled=resultat['page'] <= 1,
+                             use_container_width=True, key="produits_precedente"):
+                    st.session_state['produits_page'] -= 1
+                    st.rerun()
+            with col_info:
+                if resultat['total'] is not None:
+                    nb_pages = max(1, -(-resultat['total'] // taille_page))
+                    st.caption(f"Page {resultat['page']} / {nb_pages} — {resultat['total']} produits")
+                else:
+                    st.caption(f"Page {resultat['page']}")
+            with col_suiv:
+                if st.button("Suivante ▶", disabled=not resultat['a_suivante'],
+                             use_container_width=True, key="produits_suivante"):
+                    st.session_state['produits_page'] += 1
+                    st.rerun()
     except Exception as e:
         st.error(f"Erreur lors du chargement des produits: {e}")
 
@@ -1,14 +1,17 @@
 # app/pages/_Rapports.py
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from datetime import datetime, timedelta
 from models import database
+from services import rapport_service, export_service
+from components.selecteur_produit import selecteur_produit
 
 # =======================
 # CSS personnalisé
 # =======================
 def show():
+    import plotly.express as px  # import différé : seules les pages avec graphiques le chargent
+    
     st.markdown("""
     <style>
     .rapport-header {
@@ -41,45 +44,43 @@ def show():
         # Filtre Type
         type_mvt = st.selectbox("Type de mouvement", ["Tous", "Entrée", "Sortie"])
         
-        # Filtre Produit
-        all_products = database.get_all_produits()
-        produit_options = ["Tous"] + [f"{p['nom']} ({p['reference']})" for p in all_products]
-        selected_prod_label = st.selectbox("Produit", produit_options)
-        
-        selected_prod_id = None
-        if selected_prod_label != "Tous":
-            # Extraire l'ID du produit sélectionné (un peu hacky via le nom, mais ça marche pour la démo)
-            # Idéalement on map le label -> ID
-            # Ici on va chercher l'objet correspondant dans la liste
-            for p in all_products:
-                if f"{p['nom']} ({p['reference']})" == selected_prod_label:
-                    selected_prod_id = p['id']
-                    break
+        # Filtre Produit (recherche indexée, seules les meilleures correspondances sont listées)
+        selected_prod = selecteur_produit("rapport_produit", libelle="Produit", optionnel=True)
+        selected_prod_id = selected_prod['id'] if selected_prod else None
 
     # Préparer les filtres pour la requête
     filters = {
         'date_debut': date_debut,
         'date_fin': date_fin,
-        'type_mouvement': type_mvt if type_mvt != "Tous" else None,
+        'type_mouvement': {"Entrée": "entree", "Sortie": "sortie"}.get(type_mvt),
         'produit_id': selected_prod_id
     }
 
-    # Récupérer les données
-    mouvements = database.get_mouvements(filtres=filters)
-    df_mvt = pd.DataFrame(mouvements)
+    # Agrégats calculés en SQL par le service de rapports
+    resume = rapport_service.get_resume(filters)
+    nb_mouvements = resume['nb_mouvements']
 
     # Onglets
-    tab1, tab2 = st.tabs(["📝 Historique Détaillé", "📊 Analyse Graphique"])
+    tab1, tab2, tab3 = st.tabs(["📝 Historique Détaillé", "📊 Analyse Graphique", "🧮 Classification ABC/XYZ"])
 
     # =======================
     # TAB 1: HISTORIQUE
     # =======================
     with tab1:
-        st.markdown(f"<div class='rapport-header'>Historique des Mouvements ({len(df_mvt)})</div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='rapport-header'>Historique des Mouvements ({nb_mouvements})</div>", unsafe_allow_html=True)
+        
+        # Pagination par curseur : retour à la première page si les filtres changent
+        signature = repr(sorted((k, str(v)) for k, v in filters.items()))
+        if st.session_state.get('rapport_signature') != signature:
+            st.session_state['rapport_signature'] = signature
+            st.session_state['rapport_curseur'] = None
         
-        if not df_mvt.empty:
+        page = rapport_service.get_detail_page(filters, curseur=st.session_state['rapport_curseur'], taille_page=50)
+        df_page = pd.DataFrame(page['lignes'])
+        
+        if not df_page.empty:
             # Nettoyage et formatage pour l'affichage
-            df_display = df_mvt[['date_mouvement', 'produit_nom', 'type', 'quantite', 'motif', 'categorie_nom']].copy()
+            df_display = df_page[['date_mouvement', 'produit_nom', 'type', 'quantite', 'motif', 'categorie_nom']].copy()
             df_display.columns = ['Date', 'Produit', 'Type', 'Quantité', 'Motif', 'Catégorie']
             
             # Formattage conditionnel (Streamlit le fait nativement un peu, mais on peut personnaliser)
@@ -91,14 +92,26 @@ def show():
                 }
             )
             
-            # Export CSV
-            csv = df_display.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                "📥 Télécharger l'historique (CSV)",
-                data=csv,
-                file_name=f"rapport_stock_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv",
-            )
+            col_prec, col_suiv = st.columns(2)
+            with col_prec:
+                if st.button("◀ Page précédente", disabled=page['precedent'] is None,
+                             use_container_width=True, key="rapport_precedent"):
+                    st.session_state['rapport_curseur'] = page['precedent']
+                    st.rerun()
+            with col_suiv:
+                if st.button("Page suivante ▶", disabled=page['suivant'] is None,
+                             use_container_width=True, key="rapport_suivant"):
+                    st.session_state['rapport_curseur'] = page['suivant']
+                    st.rerun()
+            
+            # Export CSV (toutes les lignes filtrées, écrites par paquets à la demande)
+            if st.button("📊 Exporter l'historique (CSV)", key="rapport_export"):
+                st.download_button(
+                    "📥 Télécharger l'historique (CSV)",
+                    data=export_service.exporter_mouvements(filters, format="csv"),
+                    file_name=export_service.nom_fichier("rapport_stock", "csv"),
+                    mime=export_service.type_mime("csv"),
+                )
         else:
             st.info("Aucun mouvement trouvé pour ces filtres.")
 
@@ -108,24 +121,24 @@ def show():
     with tab2:
         st.markdown("<div class='rapport-header'>Analyse des Flux</div>", unsafe_allow_html=True)
         
-        if not df_mvt.empty:
+        if nb_mouvements:
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("Entrées vs Sorties")
-                # Group by Type
-                type_counts = df_mvt['type'].value_counts()
+                types = list(resume['par_type'])
                 fig_pie = px.pie(
-                    values=type_counts.values,
-                    names=type_counts.index,
+                    values=[resume['par_type'][t]['nb_mouvements'] for t in types],
+                    names=types,
                     color_discrete_map={'entree':'#10B981', 'sortie':'#EF4444'}
                 )
                 st.plotly_chart(fig_pie, use_container_width=True)
             
             with col2:
                 st.subheader("Top Produits (Volume)")
-                # Group by Product
-                prod_gb = df_mvt.groupby('produit_nom')['quantite'].sum().nlargest(10).sort_values()
+                # Top 10 calculé en SQL
+                df_top = pd.DataFrame(rapport_service.get_top_produits(filters, limit=10))
+                prod_gb = df_top.set_index('produit_nom')['quantite'].sort_values()
                 fig_bar = px.bar(
                     x=prod_gb.values,
                     y=prod_gb.index,
@@ -135,19 +148,152 @@ def show():
                 st.plotly_chart(fig_bar, use_container_width=True)
 
             st.subheader("Évolution Temporelle")
-            # Convertir date en datetime si ce n'est pas le cas
-            df_mvt['date_mouvement'] = pd.to_datetime(df_mvt['date_mouvement'])
-            # Resample par jour
-            daily_mvt = df_mvt.set_index('date_mouvement').resample('D')['quantite'].sum().reset_index()
+            # Granularité choisie selon la période (jour, semaine ou mois), points bornés
+            serie = rapport_service.get_serie(filters)
+            df_serie = pd.DataFrame(serie['lignes'])
+            evolution = df_serie.groupby('periode', as_index=False)['quantite'].sum()
+            evolution['periode'] = pd.to_datetime(evolution['periode'])
             
+            titres = {'jour': "journalier", 'semaine': "hebdomadaire", 'mois': "mensuel"}
             fig_line = px.line(
-                daily_mvt, 
-                x='date_mouvement', 
+                evolution, 
+                x='periode', 
                 y='quantite',
                 markers=True,
-                title="Volume total journalier"
+                labels={'periode': 'Période', 'quantite': 'Quantité'},
+                title=f"Volume total {titres[serie['granularite']]}"
             )
             st.plotly_chart(fig_line, use_container_width=True)
             
+            st.subheader("Ventilation")
+            # Cube colonnaire en mémoire : chaque combinaison de filtres est un simple masque
+            axes = {"Catégorie": "categorie", "Fournisseur": "fournisseur", "Produit": "produit", "Type": "type"}
+            col_v1, col_v2, col_v3 = st.columns(3)
+            with col_v1:
+                axe = st.selectbox("Ventiler par", list(axes), key="rapport_ventilation")
+            with col_v2:
+                categories = {c['nom']: c['id'] for c in database.get_all_categories()}
+                choix_categories = st.multiselect("Catégories", list(categories), key="rapport_categories")
+            with col_v3:
+                fournisseurs = {f['nom']: f['id'] for f in database.get_all_fournisseurs()}
+                choix_fournisseurs = st.multiselect("Fournisseurs", list(fournisseurs), key="rapport_fournisseurs")
+            
+            tranche = dict(filters)
+            if choix_categories:
+                tranche['categorie_id'] = [categories[nom] for nom in choix_categories]
+            if choix_fournisseurs:
+                tranche['fournisseur_id'] = [fournisseurs[nom] for nom in choix_fournisseurs]
+            
+            ventilation = rapport_service.somme_cube(tranche, par=axes[axe])
+            if ventilation:
+                df_ventilation = pd.DataFrame(ventilation)
+                df_ventilation[f"{axes[axe]}_libelle"] = df_ventilation[f"{axes[axe]}_libelle"].fillna("Non renseigné")
+                st.dataframe(
+                    df_ventilation[[f"{axes[axe]}_libelle", 'quantite', 'valeur', 'nb_mouvements']].rename(columns={
+                        f"{axes[axe]}_libelle": axe, 'quantite': "Quantité",
+                        'valeur': "Valeur (prix de vente)", 'nb_mouvements': "Mouvements"
+                    }),
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.info("Aucun mouvement pour cette sélection.")
+            
         else:
             st.info("Données insuffisantes pour l'analyse.")
+
+    # =======================
+    # TAB 3: CLASSIFICATION ABC / XYZ
+    # =======================
+    with tab3:
+        st.markdown("<div class='rapport-header'>Classification ABC / XYZ du catalogue</div>", unsafe_allow_html=True)
+        
+        # Calculée en lot pour tout le catalogue (indépendante des filtres de la barre latérale)
+        calcul = rapport_service.get_calcul_classification()
+        if calcul['date_calcul'] is None:
+            with st.spinner("Classification du catalogue..."):
+                rapport_service.calculer_classification()
+            calcul = rapport_service.get_calcul_classification()
+        
+        col_info, col_bouton = st.columns([4, 1])
+        with col_info:
+            st.caption(
+                f"ABC : part de la valeur consommée (sorties x prix de vente) sur "
+                f"{rapport_service.CLASSIFICATION_MOIS} mois — XYZ : régularité de la demande mensuelle. "
+                f"{calcul['nb_produits']} produits, calculé le {calcul['date_calcul']}."
+            )
+        with col_bouton:
+            if st.button("🔄 Recalculer", use_container_width=True, key="classification_recalcul"):
+                rapport_service.calculer_classification()
+                st.rerun()
+        
+        # Matrice : nombre de produits et valeur du stock par couple de classes
+        df_matrice = pd.DataFrame(rapport_service.get_matrice_abc_xyz())
+        if not df_matrice.empty:
+            col_m1, col_m2 = st.columns(2)
+            with col_m1:
+                st.subheader("Nombre de produits")
+                st.dataframe(
+                    df_matrice.pivot(index='classe_abc', columns='classe_xyz', values='nb_produits')
+                    .reindex(index=list(rapport_service.CLASSES_ABC), columns=list(rapport_service.CLASSES_XYZ))
+                    .fillna(0).astype(int),
+                    use_container_width=True
+                )
+            with col_m2:
+                st.subheader("Valeur du stock (prix d'achat)")
+                st.dataframe(
+                    df_matrice.pivot(index='classe_abc', columns='classe_xyz', values='valeur_stock_achat')
+                    .reindex(index=list(rapport_service.CLASSES_ABC), columns=list(rapport_service.CLASSES_XYZ))
+                    .fillna(0).round(2),
+                    use_container_width=True
+                )
+        
+        # Tableau filtrable, paginé en base
+        st.subheader("Détail par produit")
+        col_f1, col_f2 = st.columns(2)
+        with col_f1:
+            classes_abc = st.multiselect("Classes ABC", list(rapport_service.CLASSES_ABC),
+                                         default=list(rapport_service.CLASSES_ABC), key="classification_abc")
+        with col_f2:
+            classes_xyz = st.multiselect("Classes XYZ", list(rapport_service.CLASSES_XYZ),
+                                         default=list(rapport_service.CLASSES_XYZ), key="classification_xyz")
+        
+        signature = (tuple(classes_abc), tuple(classes_xyz))
+        if st.session_state.get('classification_signature') != signature:
+            st.session_state['classification_signature'] = signature
+            st.session_state['classification_page'] = 1
+        
+        page = rapport_service.get_classification_page(
+            tuple(classes_abc), tuple(classes_xyz), page=st.session_state['classification_page']
+        )
+        if page['lignes']:
+            df_classes = pd.DataFrame(page['lignes'])
+            st.dataframe(
+                df_classes[[
+                    'produit_reference', 'produit_nom', 'classe_abc', 'classe_xyz', 'quantite',
+                    'valeur_consommation', 'coefficient_variation', 'valeur_stock_achat', 'valeur_stock_vente'
+                ]].rename(columns={
+                    'produit_reference': "Référence", 'produit_nom': "Produit",
+                    'classe_abc': "ABC", 'classe_xyz': "XYZ", 'quantite': "Stock",
+                    'valeur_consommation': "Valeur consommée", 'coefficient_variation': "Coef. variation",
+                    'valeur_stock_achat': "Valeur stock (achat)", 'valeur_stock_vente': "Valeur stock (vente)"
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+            
+            col_prec, col_page, col_suiv = st.columns([1, 2, 1])
+            with col_prec:
+                if st.button("◀ Précédent", disabled=page['page'] == 1,
+                             use_container_width=True, key="classification_precedent"):
+                    st.session_state['classification_page'] -= 1
+                    st.rerun()
+            with col_page:
+                st.caption(f"Page {page['page']} — {page['total']} produit(s)")
+            with col_suiv:
+                if st.button("Suivant ▶", disabled=not page['a_suivante'],
+                             use_container_width=True, key="classification_suivant"):
+                    st.session_state['classification_page'] += 1
+                    st.rerun()
+        else:
+            st.info("Aucun produit dans ces classes.")
@@ -1,22 +1,46 @@
 # app/pages/_dashboard.py - Page Tableau de Bord
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+from datetime import date
 from models import database
+from services import alerte_service, historique_service
 
 def show():
+    import plotly.express as px  # import différé : seules les pages avec graphiques le chargent
+    
     st.title("🏠 Tableau de Bord")
     
+    # Instantané périodique du stock (au plus un par SNAPSHOT_INTERVALLE_HEURES),
+    # écrit en arrière-plan par le thread rédacteur : le rendu ne l'attend pas
+    historique_service.snapshot_si_du()
+    
     # Statistiques
     stats = database.get_statistiques()
     
+    # Valorisation à une date passée : instantané le plus proche + mouvements depuis
+    aujourd_hui = date.today()
+    jour_valorisation = st.date_input(
+        "📅 Valorisation au", value=aujourd_hui, max_value=aujourd_hui,
+        format="DD/MM/YYYY", key="dashboard_date_valorisation"
+    )
+    historique = jour_valorisation < aujourd_hui
+    if historique:
+        valorisation = historique_service.get_valorisation_at(jour_valorisation, 10)
+        valeur_totale, top_valeur = valorisation['valeur_totale'], valorisation['top']
+    else:
+        valeur_totale, top_valeur = stats['valeur_totale'], database.top_produits_par_valeur(10)
+    
     # Métriques
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.metric("📦 Produits", stats['total_produits'])
     with col2:
-        st.metric("💰 Valeur", f"{stats['valeur_totale']:,.0f} €")
+        st.metric(
+            f"💰 Valeur au {jour_valorisation:%d/%m/%Y}" if historique else "💰 Valeur",
+            f"{valeur_totale:,.0f} €",
+            delta=f"{stats['valeur_totale'] - valeur_totale:+,.0f} € depuis" if historique else None
+        )
     with col3:
         st.metric("⚠️ Alertes", stats['alertes'])
     with col4:
@@ -29,14 +53,15 @@ def show():
     
     with col_chart1:
         st.subheader("📊 Nombre de Produits par Catégorie")
-        produits = database.get_produits_dataframe()
+        # Agrégats calculés en SQL : seules quelques lignes remontent
+        categories = pd.DataFrame(database.count_produits_par_categorie())
         
-        if not produits.empty and 'categorie_nom' in produits.columns:
-            categories = produits['categorie_nom'].value_counts()
+        if not categories.empty:
+            categories['categorie_nom'] = categories['categorie_nom'].fillna("Sans catégorie")
             
             fig = px.pie(
-                values=categories.values,
-                names=categories.index,
+                values=categories['nb_produits'],
+                names=categories['categorie_nom'],
                 hole=0.4,
                 color_discrete_sequence=px.colors.qualitative.Pastel
             )
@@ -46,12 +71,10 @@ def show():
             st.info("Aucun produit enregistré")
             
     with col_chart2:
-        st.subheader("💎 Top 10 Valeur Stock")
-        if not produits.empty:
-            # Calculer la valeur du stock
-            produits['valeur_stock'] = produits['quantite'] * produits['prix_vente']
-            top_products = produits.nlargest(10, 'valeur_stock')
-            
+        st.subheader(f"💎 Top 10 Valeur Stock au {jour_valorisation:%d/%m/%Y}" if historique
+                     else "💎 Top 10 Valeur Stock")
+        top_products = pd.DataFrame(top_valeur)
+        if not top_products.empty:
             fig_bar = px.bar(
                 top_products,
                 x='valeur_stock',
@@ -97,11 +120,46 @@ def show():
     with col_alerts:
         st.subheader("⚠️ Alertes Stock")
         
-        produits_alerte = database.get_produits_en_alerte()
+        modes = {"Seuil fixe": 'seuil', "Couverture": 'couverture'}
+        mode = modes[st.radio("Mode", list(modes), horizontal=True, key="dashboard_mode_alerte",
+                              label_visibility="collapsed")]
+        
+        if mode == 'seuil':
+            # Alertes tenues à jour à chaque écriture : seules les plus critiques sont lues
+            nb_alertes = alerte_service.count_alertes()
+            
+            if nb_alertes:
+                for alerte in alerte_service.get_top_alertes(5):
+                    statut = " — prise en charge" if alerte['statut'] == 'acquittee' else ""
+                    st.warning(f"**{alerte['produit_nom']}** (Qte: {alerte['quantite']} / seuil {alerte['seuil_min']}){statut}")
+        else:
+            # Points de commande calculés en lot depuis la consommation récente
+            calcul = alerte_service.get_calcul_couverture()
+            if calcul['date_calcul'] is None:
+                with st.spinner("Calcul de la couverture du catalogue..."):
+                    alerte_service.calculer_couverture()
+                calcul = alerte_service.get_calcul_couverture()
+            nb_alertes = alerte_service.count_alertes_couverture()
+            
+            if nb_alertes:
+                for alerte in alerte_service.get_top_alertes_couverture(5):
+                    st.warning(
+                        f"**{alerte['produit_nom']}** ({alerte['jours_couverture']:.1f} j de stock, "
+                        f"Qte: {alerte['quantite']} / point de commande {alerte['point_commande']})"
+                    )
+            col_calcul, col_bouton = st.columns([3, 1])
+            with col_calcul:
+                st.caption(f"Consommation sur {alerte_service.COUVERTURE_FENETRE_JOURS} j, "
+                           f"calculée le {calcul['date_calcul']}")
+            with col_bouton:
+                if st.button("🔄", help="Recalculer la couverture", key="dashboard_recalcul_couverture"):
+                    alerte_service.calculer_couverture()
+                    st.rerun()
         
-        if produits_alerte:
-            for produit in produits_alerte:
-                st.warning(f"**{produit['nom']}** (Qte: {produit['quantite']})")
+        if nb_alertes > 5:
+            st.caption(f"… et {nb_alertes - 5} autre(s) alerte(s), {nb_alertes} au total")
+        elif nb_alertes:
+            st.caption(f"{nb_alertes} alerte(s) active(s)")
         else:
             st.success("✅ Stock sain")
     
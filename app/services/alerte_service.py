@@ -0,0 +1,244 @@
+# app/services/alerte_service.py - Alertes de stock
+"""
+Service d'alertes, en deux modes :
+- 'seuil' : lecture et suivi de la table alertes. Les alertes sont ouvertes,
+  mises à jour et résolues par les triggers de models.database, dans la
+  transaction qui modifie le stock : aucune requête ne parcourt le catalogue
+  pour les détecter.
+- 'couverture' : point de commande dynamique, calculé en lot pour tout le
+  catalogue depuis la consommation récente (table couverture_stock).
+"""
+
+import math
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+try:
+    from config import COUVERTURE_FENETRE_JOURS, COUVERTURE_DELAI_JOURS, COUVERTURE_COEF_SECURITE
+except ImportError:  # import via le paquet app
+    from ..config import COUVERTURE_FENETRE_JOURS, COUVERTURE_DELAI_JOURS, COUVERTURE_COEF_SECURITE
+
+from models import database
+
+MODES_ALERTE = ('seuil', 'couverture')
+
+STATUTS = ('ouverte', 'acquittee', 'resolue')
+STATUTS_ACTIFS = ('ouverte', 'acquittee')
+
+REQUETE_ALERTES = """
+    SELECT
+        a.*,
+        a.quantite - a.seuil_min as ecart,
+        p.reference as produit_reference,
+        p.nom as produit_nom
+    FROM alertes a
+    JOIN produits p ON p.id = a.produit_id
+"""
+
+
+def _verifier_statuts(statuts):
+    statuts = tuple(statuts)
+    inconnus = set(statuts) - set(STATUTS)
+    if not statuts or inconnus:
+        raise ValueError(f"Statuts invalides : {', '.join(sorted(inconnus)) or 'aucun'}. Attendu : {', '.join(STATUTS)}")
+    return statuts, ", ".join("?" for _ in statuts)
+
+
+@database.lecture_en_cache
+def count_alertes(statuts=STATUTS_ACTIFS):
+    """Nombre d'alertes dans les statuts donnés (parcours de l'index idx_alertes_statut)"""
+    statuts, marqueurs = _verifier_statuts(statuts)
+    return database.fetch_one(
+        f"SELECT COUNT(*) as nb FROM alertes WHERE statut IN ({marqueurs})", statuts
+    )['nb']
+
+
+@database.lecture_en_cache
+def get_top_alertes(n=5, statuts=STATUTS_ACTIFS):
+    """Les n alertes les plus critiques (plus grand déficit sous le seuil)"""
+    statuts, marqueurs = _verifier_statuts(statuts)
+    return database.fetch_all(f"""
+        {REQUETE_ALERTES}
+        WHERE a.statut IN ({marqueurs})
+        ORDER BY a.quantite - a.seuil_min, a.id
+        LIMIT ?
+    """, statuts + (n,))
+
+
+@database.lecture_en_cache
+def get_alertes_page(statuts=STATUTS_ACTIFS, page=1, taille_page=50):
+    """
+    Une page d'alertes : actives par criticité, résolues seules par date de résolution.
+    Retourne {'lignes', 'page', 'a_suivante', 'total'}
+    """
+    statuts, marqueurs = _verifier_statuts(statuts)
+    page = max(1, int(page))
+    ordre = "a.date_resolution DESC, a.id DESC" if statuts == ('resolue',) else "a.quantite - a.seuil_min, a.id"
+    lignes = database.fetch_all(f"""
+        {REQUETE_ALERTES}
+        WHERE a.statut IN ({marqueurs})
+        ORDER BY {ordre}
+        LIMIT ? OFFSET ?
+    """, statuts + (taille_page + 1, (page - 1) * taille_page))
+    return {
+        'lignes': lignes[:taille_page],
+        'page': page,
+        'a_suivante': len(lignes) > taille_page,
+        'total': count_alertes(statuts),
+    }
+
+
+def acquitter_alerte(alerte_id, utilisateur="admin"):
+    """Marque une alerte ouverte comme prise en charge. Retourne True si elle l'était."""
+    cursor = database.execute_query("""
+        UPDATE alertes
+        SET statut = 'acquittee', date_acquittement = CURRENT_TIMESTAMP, acquittee_par = ?
+        WHERE id = ? AND statut = 'ouverte'
+    """, (utilisateur, alerte_id))
+    return cursor.rowcount == 1
+
+
+def resynchroniser_alertes():
+    """
+    Réparation : ouvre les alertes manquantes et résout celles dont le produit
+    n'est plus sous son seuil (données modifiées sans passer par les triggers).
+    Retourne {'ouvertes', 'resolues'}.
+    """
+    with database.transaction() as conn:
+        resolues = conn.execute("""
+            UPDATE alertes
+            SET statut = 'resolue', date_resolution = CURRENT_TIMESTAMP
+            WHERE statut IN ('ouverte', 'acquittee')
+              AND NOT EXISTS (
+                  SELECT 1 FROM produits p
+                  WHERE p.id = alertes.produit_id AND p.quantite - p.seuil_min <= 0
+              )
+        """).rowcount
+        ouvertes = conn.execute("""
+            INSERT INTO alertes (produit_id, quantite, seuil_min)
+            SELECT p.id, p.quantite, p.seuil_min
+            FROM produits p
+            WHERE p.quantite - p.seuil_min <= 0
+              AND NOT EXISTS (
+                  SELECT 1 FROM alertes a
+                  WHERE a.produit_id = p.id AND a.statut IN ('ouverte', 'acquittee')
+              )
+        """).rowcount
+    return {'ouvertes': ouvertes, 'resolues': resolues}
+
+
+# ============================================================================
+# MODE COUVERTURE : POINT DE COMMANDE DYNAMIQUE
+# ============================================================================
+
+REQUETE_COUVERTURE = """
+    SELECT
+        c.*,
+        p.reference as produit_reference,
+        p.nom as produit_nom,
+        p.quantite,
+        p.quantite / c.consommation_jour as jours_couverture
+    FROM couverture_stock c
+    JOIN produits p ON p.id = c.produit_id
+"""
+
+# Produit consommé dont le stock ne couvre plus le délai de réapprovisionnement
+CONDITION_ALERTE_COUVERTURE = "c.consommation_jour > 0 AND p.quantite <= c.point_commande"
+
+
+def calculer_couverture(fenetre_jours=COUVERTURE_FENETRE_JOURS, delai_jours=COUVERTURE_DELAI_JOURS,
+                        coef_securite=COUVERTURE_COEF_SECURITE, date_fin=None):
+    """
+    Recalcule la couverture de tout le catalogue en une passe vectorisée :
+    sorties journalières des fenetre_jours derniers jours (mouvements_daily) en
+    matrice produits x jours, puis par produit
+      consommation_jour = moyenne des sorties journalières
+      point_commande    = consommation_jour x délai + coef x écart-type x racine(délai)
+    Les jours de couverture (stock / consommation) sont calculés à la lecture,
+    sur le stock courant.
+    Retourne {'produits', 'en_alerte', 'duree'}.
+    """
+    if fenetre_jours < 1:
+        raise ValueError("La fenêtre de consommation doit compter au moins un jour")
+    debut_calcul = time.perf_counter()
+    fin = database._date_iso(date_fin or date.today())
+    debut = fin - timedelta(days=fenetre_jours - 1)
+
+    database._assurer_mouvements_daily()
+    # to_array n'accepte pas de NULL : quantités absentes (anciennes lignes) comptées à 0
+    produits = database.to_array(
+        "SELECT id, COALESCE(quantite, 0) FROM produits ORDER BY id", dtype=np.int64
+    )
+    sorties = database.to_array("""
+        SELECT produit_id, CAST(julianday(jour) - julianday(?) AS INTEGER), COALESCE(quantite_totale, 0)
+        FROM mouvements_daily
+        WHERE jour BETWEEN ? AND ? AND type = 'sortie'
+    """, (debut.isoformat(), debut.isoformat(), fin.isoformat()), dtype=np.int64)
+
+    ids, quantites = produits[:, 0], produits[:, 1]
+    nb_produits = len(ids)
+
+    # Ligne de chaque sortie dans la matrice (produits supprimés écartés)
+    lignes = np.searchsorted(ids, sorties[:, 0])
+    connues = lignes < nb_produits
+    connues[connues] = ids[lignes[connues]] == sorties[connues, 0]
+    matrice = np.bincount(
+        lignes[connues] * fenetre_jours + sorties[connues, 1],
+        weights=sorties[connues, 2],
+        minlength=nb_produits * fenetre_jours,
+    ).reshape(nb_produits, fenetre_jours)
+
+    consommation = matrice.mean(axis=1)
+    ecart_type = matrice.std(axis=1)
+    point_commande = np.ceil(
+        consommation * delai_jours + coef_securite * ecart_type * math.sqrt(delai_jours)
+    ).astype(np.int64)
+    en_alerte = int(((consommation > 0) & (quantites <= point_commande)).sum())
+
+    horodatage = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM couverture_stock")
+        conn.executemany("""
+            INSERT INTO couverture_stock
+            (produit_id, consommation_jour, ecart_type_jour, point_commande, date_calcul)
+            VALUES (?, ?, ?, ?, ?)
+        """, zip(ids.tolist(), consommation.tolist(), ecart_type.tolist(), point_commande.tolist(),
+                 [horodatage] * nb_produits))
+
+    duree = time.perf_counter() - debut_calcul
+    database.logger.info(
+        f"Couverture recalculée: {nb_produits} produits, {en_alerte} sous le point de commande ({duree:.1f} s)"
+    )
+    return {'produits': nb_produits, 'en_alerte': en_alerte, 'duree': duree}
+
+
+@database.lecture_en_cache
+def get_calcul_couverture():
+    """Date du dernier calcul de couverture (None s'il n'a jamais été fait) et nombre de produits"""
+    return database.fetch_one(
+        "SELECT MAX(date_calcul) as date_calcul, COUNT(*) as nb_produits FROM couverture_stock"
+    )
+
+
+@database.lecture_en_cache
+def count_alertes_couverture():
+    """Nombre de produits sous leur point de commande"""
+    return database.fetch_one(f"""
+        SELECT COUNT(*) as nb
+        FROM couverture_stock c
+        JOIN produits p ON p.id = c.produit_id
+        WHERE {CONDITION_ALERTE_COUVERTURE}
+    """)['nb']
+
+
+@database.lecture_en_cache
+def get_top_alertes_couverture(n=5):
+    """Les n produits sous leur point de commande ayant le moins de jours de couverture"""
+    return database.fetch_all(f"""
+        {REQUETE_COUVERTURE}
+        WHERE {CONDITION_ALERTE_COUVERTURE}
+        ORDER BY jours_couverture, p.id
+        LIMIT ?
+    """, (n,))
@@ -0,0 +1,147 @@
+# app/services/export_service.py - Exports CSV et Excel
+"""
+Service d'export : les lignes sont lues par paquets et écrites au fur et à
+mesure (CSV, CSV gzip, XLSX en mode write-only d'openpyxl), la mémoire reste
+constante quelle que soit la taille de la table.
+Destination : un fichier du dossier EXPORT_DIR, ou un tampon mémoire à passer
+à st.download_button.
+"""
+
+import csv
+import gzip
+import io
+from datetime import datetime
+
+try:
+    from config import EXPORT_DIR
+except ImportError:  # import via le paquet app
+    from ..config import EXPORT_DIR
+
+from models import database
+
+# Nombre de lignes lues en base à chaque paquet
+TAILLE_PAQUET = 5000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'csv.gz': 'application/gzip',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+REQUETE_PRODUITS = """
+    SELECT
+        p.id, p.reference, p.nom, p.description,
+        c.nom as categorie, f.nom as fournisseur,
+        p.quantite, p.seuil_min, p.prix_achat, p.prix_vente, p.date_creation
+    FROM produits p
+    LEFT JOIN categories c ON p.categorie_id = c.id
+    LEFT JOIN fournisseurs f ON p.fournisseur_id = f.id
+    ORDER BY p.id
+"""
+
+
+def nom_fichier(nom, format='csv'):
+    """Nom horodaté de l'export, ex. produits_20240131_142500.csv"""
+    return f"{nom}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+
+
+def type_mime(format):
+    return FORMATS[format]
+
+
+def _parcourir(requete, params, taille_paquet):
+    """Noms des colonnes, puis générateur de paquets de lignes (tuples)"""
+    cursor = database.get_pooled_connection().execute(requete, params)
+    colonnes = [description[0] for description in cursor.description]
+
+    def paquets():
+        try:
+            while True:
+                lignes = cursor.fetchmany(taille_paquet)
+                if not lignes:
+                    break
+                yield [tuple(ligne) for ligne in lignes]
+        finally:
+            cursor.close()
+
+    return colonnes, paquets()
+
+
+def _ecrire_csv(sortie, colonnes, paquets, compresser):
+    flux = gzip.GzipFile(fileobj=sortie, mode='wb') if compresser else sortie
+    texte = io.TextIOWrapper(flux, encoding='utf-8-sig', newline='')
+    try:
+        writer = csv.writer(texte)
+        writer.writerow(colonnes)
+        for paquet in paquets:
+            writer.writerows(paquet)
+    finally:
+        texte.flush()
+        texte.detach()  # ne pas fermer la sortie (tampon rendu à l'appelant)
+        if compresser:
+            flux.close()
+
+
+def _ecrire_xlsx(sortie, colonnes, paquets, feuille):
+    from openpyxl import Workbook  # dépendance chargée seulement pour les exports Excel
+
+    classeur = Workbook(write_only=True)
+    onglet = classeur.create_sheet(title=feuille[:31])
+    onglet.append(colonnes)
+    for paquet in paquets:
+        for ligne in paquet:
+            onglet.append(ligne)
+    classeur.save(sortie)
+
+
+def exporter_requete(requete, params=(), format='csv', nom='export', fichier=False,
+                     taille_paquet=TAILLE_PAQUET):
+    """
+    Exporte le résultat d'une requête SELECT.
+    format : 'csv', 'csv.gz' ou 'xlsx'.
+    fichier : False -> retourne un io.BytesIO positionné au début ;
+              True  -> écrit dans EXPORT_DIR et retourne le chemin (Path).
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Format invalide : {format}. Attendu : {', '.join(FORMATS)}")
+    if not requete.lstrip().upper().startswith(("SELECT", "WITH")):
+        raise ValueError("Seules les requêtes SELECT peuvent être exportées")
+
+    colonnes, paquets = _parcourir(requete, params, taille_paquet)
+
+    if fichier:
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        chemin = EXPORT_DIR / nom_fichier(nom, format)
+        sortie = open(chemin, 'wb')
+    else:
+        sortie = io.BytesIO()
+
+    try:
+        if format == 'xlsx':
+            _ecrire_xlsx(sortie, colonnes, paquets, feuille=nom)
+        else:
+            _ecrire_csv(sortie, colonnes, paquets, compresser=(format == 'csv.gz'))
+    except Exception:
+        paquets.close()
+        if fichier:
+            sortie.close()
+            chemin.unlink(missing_ok=True)
+        raise
+
+    if fichier:
+        sortie.close()
+        database.logger.info(f"Export écrit : {chemin}")
+        return chemin
+    sortie.seek(0)
+    return sortie
+
+
+def exporter_produits(format='csv', fichier=False):
+    """Catalogue complet avec noms de catégorie et de fournisseur"""
+    return exporter_requete(REQUETE_PRODUITS, format=format, nom='produits', fichier=fichier)
+
+
+def exporter_mouvements(filtres=None, format='csv', fichier=False):
+    """Historique des mouvements, avec les mêmes filtres que get_mouvements"""
+    requete, params = database.requete_mouvements(filtres)
+    return exporter_requete(requete, params, format=format, nom='mouvements', fichier=fichier)
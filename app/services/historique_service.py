@@ -0,0 +1,276 @@
+# app/services/historique_service.py - Stock à une date passée
+"""
+Historique du stock par instantanés : prendre_snapshot recopie la quantité et
+la valeur de chaque produit dans stock_snapshots_lignes, avec l'identifiant du
+dernier mouvement inclus. Le stock à une date passée part de l'instantané le
+plus proche et n'applique que les mouvements qui l'en séparent :
+- instantané antérieur : ses quantités + les mouvements suivants jusqu'à la date
+  (bornés par l'instantané suivant) ;
+- aucun instantané antérieur : instantané suivant (ou stock courant) moins les
+  mouvements postérieurs à la date.
+Le coût est une lecture d'instantané plus un delta borné par l'intervalle
+entre instantanés, au lieu du rejeu de tout le journal des mouvements.
+"""
+
+import time
+from datetime import date, timedelta
+
+try:
+    from config import SNAPSHOT_INTERVALLE_HEURES, SNAPSHOT_RETENTION_JOURS
+except ImportError:  # import via le paquet app
+    from ..config import SNAPSHOT_INTERVALLE_HEURES, SNAPSHOT_RETENTION_JOURS
+
+from models import database
+from services import stock_service
+
+# Effet d'un mouvement sur la quantité : lu dans le journal (avant / après) quand
+# il est renseigné, déduit du type sinon (anciens mouvements)
+DELTA_MOUVEMENT = """
+    COALESCE(
+        quantite_apres - quantite_avant,
+        CASE type WHEN 'entree' THEN quantite WHEN 'sortie' THEN -quantite ELSE 0 END
+    )
+"""
+
+
+# ============================================================================
+# PRISE DES INSTANTANÉS
+# ============================================================================
+
+def _prendre_snapshot(conn):
+    # En transaction IMMEDIATE : aucun mouvement ne peut s'intercaler entre la
+    # lecture du dernier identifiant et la copie des quantités
+    snapshot_id = conn.execute("""
+        INSERT INTO stock_snapshots (dernier_mouvement_id)
+        SELECT COALESCE(MAX(id), 0) FROM mouvements
+    """).lastrowid
+    conn.execute("""
+        INSERT INTO stock_snapshots_lignes (snapshot_id, produit_id, quantite, prix_vente, valeur_stock)
+        SELECT ?, id, COALESCE(quantite, 0), COALESCE(prix_vente, 0),
+               COALESCE(quantite, 0) * COALESCE(prix_vente, 0)
+        FROM produits
+    """, (snapshot_id,))
+    conn.execute("""
+        UPDATE stock_snapshots
+        SET (nb_produits, valeur_totale) = (
+            SELECT COUNT(*), COALESCE(SUM(valeur_stock), 0)
+            FROM stock_snapshots_lignes WHERE snapshot_id = ?
+        )
+        WHERE id = ?
+    """, (snapshot_id, snapshot_id))
+
+    purges = 0
+    if SNAPSHOT_RETENTION_JOURS > 0:
+        limite = f"-{SNAPSHOT_RETENTION_JOURS} days"
+        conn.execute("""
+            DELETE FROM stock_snapshots_lignes WHERE snapshot_id IN (
+                SELECT id FROM stock_snapshots WHERE date_snapshot < datetime('now', ?)
+            )
+        """, (limite,))
+        purges = conn.execute(
+            "DELETE FROM stock_snapshots WHERE date_snapshot < datetime('now', ?)", (limite,)
+        ).rowcount
+    return snapshot_id, purges
+
+
+def prendre_snapshot():
+    """
+    Enregistre un instantané de la quantité et de la valeur (prix de vente) de
+    tout le catalogue et purge ceux qui dépassent SNAPSHOT_RETENTION_JOURS.
+    Retourne {'snapshot_id', 'purges', 'duree'}.
+    """
+    debut = time.perf_counter()
+    with database.transaction() as conn:
+        snapshot_id, purges = _prendre_snapshot(conn)
+    duree = time.perf_counter() - debut
+    database.logger.info(f"Instantané du stock {snapshot_id} enregistré ({duree:.1f} s, {purges} purgé(s))")
+    return {'snapshot_id': snapshot_id, 'purges': purges, 'duree': duree}
+
+
+def _snapshot_si_du(conn, intervalle_heures):
+    # Revérifié dans la transaction : plusieurs demandes en file n'en écrivent qu'un
+    recent = conn.execute(
+        "SELECT 1 FROM stock_snapshots WHERE date_snapshot >= datetime('now', ?)",
+        (f"-{intervalle_heures} hours",)
+    ).fetchone()
+    if recent:
+        return None
+    snapshot_id, _ = _prendre_snapshot(conn)
+    database.logger.info(f"Instantané du stock {snapshot_id} enregistré")
+    return snapshot_id
+
+
+def _signaler_echec(future):
+    if not future.cancelled() and future.exception() is not None:
+        database.logger.error(f"Échec de l'instantané du stock: {future.exception()}")
+
+
+def snapshot_si_du(intervalle_heures=SNAPSHOT_INTERVALLE_HEURES):
+    """
+    Demande un instantané si le dernier date de plus de intervalle_heures.
+    L'écriture (copie de tout le catalogue) est confiée au thread rédacteur de
+    stock_service, comme toute écriture de stock : elle ne prend pas le verrou
+    d'écriture depuis la page. Retourne le Future de la demande (résultat :
+    identifiant de l'instantané, ou None s'il n'était plus dû), ou None si
+    aucun instantané n'est dû.
+    """
+    if not _snapshot_du(intervalle_heures):
+        return None
+    future = stock_service.soumettre_commande(_snapshot_si_du, intervalle_heures)
+    future.add_done_callback(_signaler_echec)
+    return future
+
+
+@database.lecture_en_cache
+def _snapshot_du(intervalle_heures):
+    return database.fetch_one(
+        "SELECT 1 as recent FROM stock_snapshots WHERE date_snapshot >= datetime('now', ?)",
+        (f"-{intervalle_heures} hours",)
+    ) is None
+
+
+@database.lecture_en_cache
+def get_snapshots(limit=30):
+    """Les derniers instantanés (plus récents d'abord)"""
+    return database.fetch_all("""
+        SELECT id, date_snapshot, dernier_mouvement_id, nb_produits, valeur_totale
+        FROM stock_snapshots
+        ORDER BY date_snapshot DESC
+        LIMIT ?
+    """, (limit,))
+
+
+# ============================================================================
+# STOCK À UNE DATE
+# ============================================================================
+
+def _requete_stock_at(jour):
+    """
+    Requête (et paramètres) du stock de chaque produit à la fin du jour donné :
+    colonnes produit_id, quantite, prix_vente, valeur_stock.
+    """
+    fin = (database._date_iso(jour) + timedelta(days=1)).isoformat()
+
+    # Stock courant : tous les mouvements jusqu'à maintenant sont déjà appliqués
+    if fin > date.today().isoformat():
+        return """
+            SELECT id as produit_id, quantite, prix_vente, quantite * prix_vente as valeur_stock
+            FROM produits
+        """, ()
+
+    avant = database.fetch_one("""
+        SELECT id, dernier_mouvement_id FROM stock_snapshots
+        WHERE date_snapshot < ? ORDER BY date_snapshot DESC LIMIT 1
+    """, (fin,))
+    apres = database.fetch_one("""
+        SELECT id, date_snapshot, dernier_mouvement_id FROM stock_snapshots
+        WHERE date_snapshot >= ? ORDER BY date_snapshot LIMIT 1
+    """, (fin,))
+    borne = apres['dernier_mouvement_id'] if apres else database.fetch_one(
+        "SELECT COALESCE(MAX(id), 0) as id FROM mouvements"
+    )['id']
+
+    if avant:
+        # Avant la date : instantané + mouvements suivants (parcours de la clé primaire
+        # entre les deux instantanés). Produits créés depuis l'instantané (identifiants
+        # AUTOINCREMENT supérieurs aux siens) et avant la date : leur quantité initiale,
+        # saisie sans mouvement, est le quantite_avant de leur premier mouvement après
+        # l'instantané, ou leur quantité courante s'ils n'en ont aucun.
+        return f"""
+            WITH delta AS (
+                SELECT produit_id, SUM({DELTA_MOUVEMENT}) as delta
+                FROM mouvements
+                WHERE id > ? AND id <= ? AND date_mouvement < ?
+                GROUP BY produit_id
+            ),
+            nouveaux AS (
+                SELECT
+                    p.id as produit_id,
+                    p.prix_vente,
+                    COALESCE(
+                        (SELECT m.quantite_avant FROM mouvements m
+                         WHERE m.produit_id = p.id AND m.id > ? ORDER BY m.id LIMIT 1),
+                        p.quantite
+                    ) as quantite
+                FROM produits p
+                WHERE p.id > (SELECT COALESCE(MAX(produit_id), 0) FROM stock_snapshots_lignes WHERE snapshot_id = ?)
+                  AND p.date_creation < ?
+            )
+            SELECT s.produit_id, s.quantite + COALESCE(d.delta, 0) as quantite, s.prix_vente,
+                   (s.quantite + COALESCE(d.delta, 0)) * s.prix_vente as valeur_stock
+            FROM stock_snapshots_lignes s
+            LEFT JOIN delta d ON d.produit_id = s.produit_id
+            WHERE s.snapshot_id = ?
+            UNION ALL
+            SELECT n.produit_id, n.quantite + COALESCE(d.delta, 0), n.prix_vente,
+                   (n.quantite + COALESCE(d.delta, 0)) * n.prix_vente
+            FROM nouveaux n
+            LEFT JOIN delta d ON d.produit_id = n.produit_id
+        """, (avant['dernier_mouvement_id'], borne, fin,
+              avant['dernier_mouvement_id'], avant['id'], fin, avant['id'])
+
+    # Date antérieure au plus ancien instantané : on remonte depuis l'instantané
+    # suivant (ou le stock courant) en retirant les mouvements postérieurs à la date,
+    # lus sur l'index des dates entre la date et l'instantané
+    if apres:
+        base = """
+            SELECT s.produit_id, s.quantite, s.prix_vente
+            FROM stock_snapshots_lignes s
+            LEFT JOIN produits p ON p.id = s.produit_id
+            WHERE s.snapshot_id = ? AND (p.date_creation IS NULL OR p.date_creation < ?)
+        """
+        params = (apres['id'], fin)
+        jusqu_a = apres['date_snapshot']
+    else:
+        base = "SELECT id as produit_id, quantite, prix_vente FROM produits WHERE date_creation < ?"
+        params = (fin,)
+        jusqu_a = '9999'
+    return f"""
+        WITH delta AS (
+            SELECT produit_id, SUM({DELTA_MOUVEMENT}) as delta
+            FROM mouvements
+            WHERE date_mouvement >= ? AND date_mouvement <= ? AND id <= ?
+            GROUP BY produit_id
+        )
+        SELECT b.produit_id, b.quantite - COALESCE(d.delta, 0) as quantite, b.prix_vente,
+               (b.quantite - COALESCE(d.delta, 0)) * b.prix_vente as valeur_stock
+        FROM ({base}) b
+        LEFT JOIN delta d ON d.produit_id = b.produit_id
+    """, (fin, jusqu_a, borne) + params
+
+
+def get_stock_at(jour):
+    """
+    Stock de chaque produit à la fin du jour donné (date ou 'YYYY-MM-DD') :
+    [{produit_id, reference, nom, quantite, prix_vente, valeur_stock}].
+    La valeur utilise le prix de vente de l'instantané de départ.
+    Non mis en cache : une entrée par date aurait la taille du catalogue.
+    """
+    requete, params = _requete_stock_at(jour)
+    return database.fetch_all(f"""
+        SELECT h.produit_id, p.reference, p.nom, h.quantite, h.prix_vente, h.valeur_stock
+        FROM ({requete}) h
+        LEFT JOIN produits p ON p.id = h.produit_id
+        ORDER BY h.produit_id
+    """, params)
+
+
+@database.lecture_en_cache
+def get_valorisation_at(jour, n=10):
+    """
+    Valorisation du stock à la fin du jour donné : {'valeur_totale', 'nb_produits', 'top'},
+    top étant les n produits de plus forte valeur (mêmes colonnes que top_produits_par_valeur).
+    """
+    requete, params = _requete_stock_at(jour)
+    totaux = database.fetch_one(f"""
+        SELECT COUNT(*) as nb_produits, COALESCE(SUM(valeur_stock), 0) as valeur_totale
+        FROM ({requete})
+    """, params)
+    top = database.fetch_all(f"""
+        SELECT h.produit_id as id, p.reference, p.nom, h.quantite, h.prix_vente, h.valeur_stock
+        FROM ({requete}) h
+        JOIN produits p ON p.id = h.produit_id
+        ORDER BY h.valeur_stock DESC
+        LIMIT ?
+    """, params + (n,))
+    return {**totaux, 'top': top}
@@ -0,0 +1,660 @@
+# app/services/rapport_service.py - Agrégats de la page Rapports
+"""
+Service de rapports : séries pré-agrégées en SQL (depuis mouvements_daily),
+granularité choisie selon la période, nombre de points borné.
+Le détail ligne à ligne reste paginé (curseur) ; l'export passe par export_service.
+Les ventilations libres (produit x catégorie x fournisseur x jour x type) sont
+calculées par masques NumPy sur un cube colonnaire des mouvements.
+La classification ABC/XYZ du catalogue est calculée en lot et stockée en table.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from models import database
+
+# Granularités de la plus fine à la plus grossière, avec leur durée approximative en jours
+GRANULARITES = {'jour': 1, 'semaine': 7, 'mois': 30}
+
+# Nombre maximal de périodes renvoyées pour une série (lisibilité et taille des graphiques)
+POINTS_MAX = 120
+
+
+def choisir_granularite(date_debut, date_fin, points_max=POINTS_MAX):
+    """Granularité la plus fine qui tient en points_max périodes entre les deux dates"""
+    nb_jours = (database._date_iso(date_fin) - database._date_iso(date_debut)).days + 1
+    for granularite, jours in GRANULARITES.items():
+        if nb_jours / jours <= points_max:
+            return granularite
+    return 'mois'
+
+
+def _bornes(filtres):
+    """Période effective : celle des filtres, complétée par les premiers/derniers mouvements"""
+    filtres = filtres or {}
+    if filtres.get('date_debut') and filtres.get('date_fin'):
+        return filtres['date_debut'], filtres['date_fin']
+    bornes = database.get_bornes_mouvements(filtres)
+    if not bornes or bornes['debut'] is None:
+        return None, None
+    return filtres.get('date_debut') or bornes['debut'], filtres.get('date_fin') or bornes['fin']
+
+
+def get_serie(filtres=None, granularite=None, points_max=POINTS_MAX):
+    """
+    Série des volumes par période et par type de mouvement.
+    Sans granularité imposée, elle est choisie d'après la période (jour, semaine, mois).
+    Retourne {'granularite', 'lignes': [{'periode', 'type', 'quantite', 'nb_mouvements'}]},
+    limitée aux points_max périodes les plus récentes.
+    """
+    if granularite is None:
+        debut, fin = _bornes(filtres)
+        if debut is None:
+            return {'granularite': 'jour', 'lignes': []}
+        granularite = choisir_granularite(debut, fin, points_max)
+
+    lignes = database.get_serie_mouvements(filtres, granularite)
+
+    periodes = sorted({ligne['periode'] for ligne in lignes})
+    if len(periodes) > points_max:
+        premiere = periodes[-points_max]
+        lignes = [ligne for ligne in lignes if ligne['periode'] >= premiere]
+
+    return {'granularite': granularite, 'lignes': lignes}
+
+
+def get_resume(filtres=None):
+    """
+    Totaux de la période filtrée.
+    Retourne {'nb_mouvements', 'par_type': {type: {'quantite', 'nb_mouvements'}}}
+    """
+    par_type = {
+        ligne['type']: {'quantite': ligne['quantite'], 'nb_mouvements': ligne['nb_mouvements']}
+        for ligne in database.get_totaux_mouvements(filtres)
+    }
+    return {
+        'nb_mouvements': sum(t['nb_mouvements'] for t in par_type.values()),
+        'par_type': par_type,
+    }
+
+
+def get_top_produits(filtres=None, limit=10):
+    """Produits au plus fort volume de mouvements sur la période filtrée"""
+    return database.get_volumes_produits(filtres, limit=limit)
+
+
+def get_detail_page(filtres=None, curseur=None, taille_page=50):
+    """Une page du détail des mouvements (pagination par curseur)"""
+    return database.get_mouvements_page(filtres, curseur=curseur, taille_page=taille_page)
+
+
+
+# ============================================================================
+# CUBE COLONNAIRE DES MOUVEMENTS
+# ============================================================================
+# Une ligne par mouvement, une colonne NumPy par dimension ou mesure. Le cube est
+# complété depuis le dernier mouvements.id intégré et persisté en fichiers .npy
+# (rechargés en mmap au redémarrage). Catégorie et fournisseur sont ceux du
+# produit aujourd'hui ; la valeur est quantité x prix de vente à l'intégration.
+
+COLONNES_CUBE = {
+    'mouvement_id': np.int64,
+    'produit': np.int32,
+    'categorie': np.int32,    # 0 : sans catégorie
+    'fournisseur': np.int32,  # 0 : sans fournisseur
+    'jour': np.int32,         # jours depuis le 1970-01-01
+    'type': np.int8,          # indice dans database.TYPES_MOUVEMENT
+    'quantite': np.int32,
+    'valeur': np.float64,
+}
+DIMENSIONS_CUBE = ('produit', 'categorie', 'fournisseur', 'jour', 'type')
+VERSION_CUBE = 2
+
+# Délai minimal (secondes) entre deux écritures du cube sur disque. Les lignes
+# intégrées depuis la dernière écriture sont relues du journal au redémarrage.
+CUBE_PERSISTANCE_DELAI = 30.0
+
+# Au-delà de ce nombre de combinaisons possibles, les groupes sont formés par tri
+GROUPES_DENSES_MAX = 5_000_000
+
+# Lignes lues en base par paquet lors de l'intégration
+CUBE_TAILLE_PAQUET = 50000
+
+# Table des libellés de chaque dimension codée par identifiant
+TABLES_LIBELLES = {'produit': 'produits', 'categorie': 'categories', 'fournisseur': 'fournisseurs'}
+# Identifiants par requête de libellés (sous la limite de paramètres de SQLite)
+LIBELLES_TAILLE_PAQUET = 500
+
+EPOQUE = date(1970, 1, 1)
+
+REQUETE_CUBE = f"""
+    SELECT
+        m.id,
+        m.produit_id,
+        CAST(julianday(DATE(m.date_mouvement)) - 2440587.5 AS INTEGER),
+        CASE m.type {' '.join(f"WHEN '{t}' THEN {i}" for i, t in enumerate(database.TYPES_MOUVEMENT))} END,
+        m.quantite,
+        m.quantite * COALESCE(p.prix_vente, 0)
+    FROM mouvements m
+    LEFT JOIN produits p ON p.id = m.produit_id
+    WHERE m.id > ?
+    ORDER BY m.id
+"""
+
+_cube_lock = threading.Lock()
+_cube = {'dossier': None, 'generation': None, 'persiste': None}
+
+
+def _dossier_cube():
+    return Path(database.DB_PATH).parent / "cube"
+
+
+def _cube_vide():
+    return {
+        'colonnes': {nom: np.empty(0, dtype=dtype) for nom, dtype in COLONNES_CUBE.items()},
+        'lignes': 0,
+        'watermark': 0,
+        'dimensions': None,
+        'compteurs': None,
+    }
+
+
+def _charger_cube(dossier):
+    """Cube persisté (colonnes en mmap, lecture seule), ou cube vide s'il est absent ou incohérent"""
+    try:
+        meta = json.loads((dossier / "cube.json").read_text())
+        if meta['version'] != VERSION_CUBE:
+            return _cube_vide()
+        colonnes = {nom: np.load(dossier / f"{nom}.npy", mmap_mode='r') for nom in COLONNES_CUBE}
+        dimensions = tuple(np.load(dossier / f"dim_{nom}.npy") for nom in ('categorie', 'fournisseur'))
+    except (OSError, ValueError, KeyError):
+        return _cube_vide()
+    if any(len(colonne) != meta['lignes'] for colonne in colonnes.values()):
+        return _cube_vide()
+    return {
+        'colonnes': colonnes,
+        'lignes': meta['lignes'],
+        'watermark': meta['watermark'],
+        'dimensions': dimensions,
+        'compteurs': tuple(meta['compteurs']),
+    }
+
+
+def _persister_cube(dossier, cube):
+    """Écrit chaque colonne dans un fichier temporaire puis le renomme ; cube.json en dernier"""
+    dossier.mkdir(parents=True, exist_ok=True)
+    fichiers = _vues_cube(cube)
+    fichiers['dim_categorie'], fichiers['dim_fournisseur'] = cube['dimensions']
+    for nom, tableau in fichiers.items():
+        temporaire = dossier / f"{nom}.tmp.npy"
+        np.save(temporaire, tableau)
+        os.replace(temporaire, dossier / f"{nom}.npy")
+    meta = {
+        'version': VERSION_CUBE,
+        'watermark': cube['watermark'],
+        'lignes': cube['lignes'],
+        'compteurs': list(cube['compteurs']),
+    }
+    (dossier / "cube.tmp.json").write_text(json.dumps(meta))
+    os.replace(dossier / "cube.tmp.json", dossier / "cube.json")
+
+
+def _vues_cube(cube):
+    """Lignes occupées de chaque colonne (les tampons ont une capacité d'avance)"""
+    return {nom: colonne[:cube['lignes']] for nom, colonne in cube['colonnes'].items()}
+
+
+def _lire_dimensions(conn):
+    """Catégorie et fournisseur de chaque produit, indexés par produit_id"""
+    lignes = np.array(
+        conn.execute(
+            "SELECT id, COALESCE(categorie_id, 0), COALESCE(fournisseur_id, 0) FROM produits"
+        ).fetchall(),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    taille = int(lignes[:, 0].max()) + 1 if len(lignes) else 1
+    categorie = np.zeros(taille, dtype=np.int32)
+    fournisseur = np.zeros(taille, dtype=np.int32)
+    categorie[lignes[:, 0]] = lignes[:, 1]
+    fournisseur[lignes[:, 0]] = lignes[:, 2]
+    return categorie, fournisseur
+
+
+def _produits_modifies(avant, apres):
+    """Identifiants des produits dont la catégorie ou le fournisseur a changé"""
+    taille = max(len(avant[0]), len(apres[0]))
+    modifies = np.zeros(taille, dtype=bool)
+    for ancienne, nouvelle in zip(avant, apres):
+        modifies |= np.pad(ancienne, (0, taille - len(ancienne))) != np.pad(nouvelle, (0, taille - len(nouvelle)))
+    return np.flatnonzero(modifies)
+
+
+def _projeter(dimension, produits):
+    """dimension[produit] pour chaque ligne ; 0 pour les produits disparus"""
+    resultat = np.zeros(len(produits), dtype=np.int32)
+    connus = produits < len(dimension)
+    resultat[connus] = dimension[produits[connus]]
+    return resultat
+
+
+def _lire_nouvelles_lignes(conn, watermark):
+    """Mouvements postérieurs au watermark, en colonnes (sans catégorie ni fournisseur)"""
+    cursor = conn.execute(REQUETE_CUBE, (watermark,))
+    paquets = []
+    while True:
+        lignes = cursor.fetchmany(CUBE_TAILLE_PAQUET)
+        if not lignes:
+            break
+        paquets.append(np.array([tuple(ligne) for ligne in lignes], dtype=np.float64))
+    if not paquets:
+        return None
+    tableau = np.concatenate(paquets)
+    return {
+        nom: tableau[:, i].astype(COLONNES_CUBE[nom])
+        for i, nom in enumerate(('mouvement_id', 'produit', 'jour', 'type', 'quantite', 'valeur'))
+    }
+
+
+def _ajouter_lignes(colonnes, lignes, nouvelles):
+    """
+    Écrit les nouvelles lignes après les lignes occupées. Les tampons ne sont
+    réalloués (capacité x 1.5) que pleins ou en lecture seule (mmap) : l'ajout
+    coûte le nombre de lignes ajoutées, et les vues déjà rendues restent valides.
+    """
+    total = lignes + len(nouvelles['mouvement_id'])
+    capacite = len(colonnes['mouvement_id'])
+    if total > capacite or not colonnes['mouvement_id'].flags.writeable:
+        capacite = max(total, int(capacite * 1.5)) + CUBE_TAILLE_PAQUET
+        agrandies = {}
+        for nom, colonne in colonnes.items():
+            agrandies[nom] = np.empty(capacite, dtype=COLONNES_CUBE[nom])
+            agrandies[nom][:lignes] = colonne[:lignes]
+        colonnes = agrandies
+    for nom, valeurs in nouvelles.items():
+        colonnes[nom][lignes:total] = valeurs
+    return colonnes, total
+
+
+def _rafraichir_cube(etat):
+    """
+    Intègre les nouveaux mouvements et les changements de catégorie/fournisseur.
+    Sans changement, le coût est celui de deux lectures de meta et de MAX(id) :
+    - mouvements modifiés ou supprimés (compteur de meta), ou base remplacée :
+      reconstruction complète ;
+    - produits ajoutés, supprimés ou reclassés (compteur de meta) : relecture des
+      dimensions et reprojection des seules lignes des produits reclassés ;
+    - nouveaux mouvements : ajout au-delà du watermark.
+    """
+    conn = database.get_pooled_connection()
+    cube = etat['cube']
+    compteurs = database._compteurs_modifications(conn)
+    dernier_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM mouvements").fetchone()[0]
+
+    reinitialise = (
+        cube['compteurs'] is None
+        or compteurs[0] != cube['compteurs'][0]
+        or dernier_id < cube['watermark']
+    )
+    if reinitialise:
+        cube = _cube_vide()
+    colonnes, lignes, dimensions = cube['colonnes'], cube['lignes'], cube['dimensions']
+
+    modifie = reinitialise
+    if dimensions is None or compteurs[1] != cube['compteurs'][1]:
+        nouvelles_dimensions = _lire_dimensions(conn)
+        if dimensions is not None and lignes:
+            # Produit reclassé : seules ses lignes sont reprojetées (copie des deux colonnes)
+            concernees = np.flatnonzero(np.isin(
+                colonnes['produit'][:lignes], _produits_modifies(dimensions, nouvelles_dimensions)
+            ))
+            if len(concernees):
+                colonnes = dict(colonnes)
+                for nom, dimension in zip(('categorie', 'fournisseur'), nouvelles_dimensions):
+                    colonnes[nom] = np.array(colonnes[nom])
+                    colonnes[nom][concernees] = _projeter(dimension, colonnes['produit'][concernees])
+                modifie = True
+        dimensions = nouvelles_dimensions
+
+    if dernier_id > cube['watermark']:
+        nouvelles = _lire_nouvelles_lignes(conn, cube['watermark'])
+        if nouvelles is not None:
+            nouvelles['categorie'] = _projeter(dimensions[0], nouvelles['produit'])
+            nouvelles['fournisseur'] = _projeter(dimensions[1], nouvelles['produit'])
+            colonnes, lignes = _ajouter_lignes(colonnes, lignes, nouvelles)
+            modifie = True
+
+    etat['cube'] = {
+        'colonnes': colonnes,
+        'lignes': lignes,
+        'watermark': int(colonnes['mouvement_id'][lignes - 1]) if lignes else 0,
+        'dimensions': dimensions,
+        'compteurs': compteurs,
+    }
+    return modifie
+
+
+def get_cube():
+    """
+    Colonnes du cube à jour ({nom: ndarray}, lecture seule).
+    Chargé depuis le disque au premier appel, puis complété seulement quand
+    la base a changé (génération du cache de lecture).
+    """
+    dossier = _dossier_cube()
+    with _cube_lock:
+        if _cube['dossier'] != dossier:
+            _cube.update(dossier=dossier, generation=None, persiste=None, cube=_charger_cube(dossier))
+
+        generation = database._generation_courante()
+        if _cube['generation'] != generation:
+            if _rafraichir_cube(_cube) and (
+                _cube['persiste'] is None or time.monotonic() - _cube['persiste'] >= CUBE_PERSISTANCE_DELAI
+            ):
+                _persister_cube(dossier, _cube['cube'])
+                _cube['persiste'] = time.monotonic()
+            _cube['generation'] = generation
+        return _vues_cube(_cube['cube'])
+
+
+def reconstruire_cube():
+    """Reconstruit le cube depuis tout le journal et le persiste"""
+    dossier = _dossier_cube()
+    with _cube_lock:
+        _cube.update(dossier=dossier, generation=None, persiste=None, cube=_cube_vide())
+    get_cube()
+    with _cube_lock:
+        _persister_cube(dossier, _cube['cube'])
+        _cube['persiste'] = time.monotonic()
+        return _cube['cube']['lignes']
+
+
+def _valeurs(filtre):
+    return filtre if isinstance(filtre, (list, tuple, set)) else [filtre]
+
+
+def _masque_cube(colonnes, filtres):
+    """Masque booléen des lignes retenues (mêmes clés que les filtres de mouvements)"""
+    masque = np.ones(len(colonnes['mouvement_id']), dtype=bool)
+    if not filtres:
+        return masque
+    if filtres.get('date_debut'):
+        masque &= colonnes['jour'] >= (database._date_iso(filtres['date_debut']) - EPOQUE).days
+    if filtres.get('date_fin'):
+        masque &= colonnes['jour'] <= (database._date_iso(filtres['date_fin']) - EPOQUE).days
+    if filtres.get('type_mouvement'):
+        # Même normalisation que database._filtres_mouvements : casse ignorée,
+        # 'tous' sans filtre, type inconnu sans résultat
+        types = {t.lower() for t in _valeurs(filtres['type_mouvement'])}
+        if 'tous' not in types:
+            codes = [i for i, t in enumerate(database.TYPES_MOUVEMENT) if t in types]
+            masque &= np.isin(colonnes['type'], codes)
+    for cle, colonne in (('produit_id', 'produit'), ('categorie_id', 'categorie'),
+                         ('fournisseur_id', 'fournisseur')):
+        if filtres.get(cle) is not None:
+            masque &= np.isin(colonnes[colonne], [v or 0 for v in _valeurs(filtres[cle])])
+    return masque
+
+
+def _libelles(dimension, codes):
+    """Libellés lisibles des codes d'une dimension"""
+    if dimension == 'jour':
+        return {code: (EPOQUE + timedelta(days=int(code))).isoformat() for code in codes}
+    if dimension == 'type':
+        return {code: database.TYPES_MOUVEMENT[code] for code in codes}
+    # Seuls les codes présents dans le résultat sont lus (id, nom), par paquets
+    codes = list(codes)
+    noms = {}
+    for i in range(0, len(codes), LIBELLES_TAILLE_PAQUET):
+        paquet = codes[i:i + LIBELLES_TAILLE_PAQUET]
+        noms.update(
+            (row['id'], row['nom']) for row in database.fetch_all(
+                f"SELECT id, nom FROM {TABLES_LIBELLES[dimension]} WHERE id IN ({','.join('?' * len(paquet))})",
+                paquet
+            )
+        )
+    return {code: noms.get(code) for code in codes}
+
+
+def somme_cube(filtres=None, par=None):
+    """
+    Somme des quantités et valeurs d'une tranche du cube, et nombre de mouvements.
+    filtres : date_debut, date_fin, type_mouvement, produit_id, categorie_id,
+              fournisseur_id (valeur unique ou liste)
+    par : None (total), une dimension ou un tuple de dimensions de DIMENSIONS_CUBE.
+    Retourne {'quantite', 'valeur', 'nb_mouvements'} pour un total, sinon une liste
+    de dicts (code et libellé de chaque dimension) par quantité décroissante.
+    """
+    colonnes = get_cube()
+    masque = _masque_cube(colonnes, filtres)
+    quantite = colonnes['quantite'][masque]
+    valeur = colonnes['valeur'][masque]
+
+    if par is None:
+        return {
+            'quantite': int(quantite.sum(dtype=np.int64)),
+            'valeur': float(valeur.sum()),
+            'nb_mouvements': int(masque.sum()),
+        }
+
+    dimensions = (par,) if isinstance(par, str) else tuple(par)
+    inconnues = set(dimensions) - set(DIMENSIONS_CUBE)
+    if inconnues:
+        raise ValueError(f"Dimensions invalides : {', '.join(sorted(inconnues))}. Attendu : {', '.join(DIMENSIONS_CUBE)}")
+
+    # Clé de groupe entière unique : codes décalés combinés en base mixte
+    cles = np.zeros(int(masque.sum()), dtype=np.int64)
+    origines, etendues = [], []
+    for d in dimensions:
+        codes = colonnes[d][masque].astype(np.int64)
+        origine = int(codes.min()) if len(codes) else 0
+        etendue = int(codes.max()) - origine + 1 if len(codes) else 1
+        cles = cles * etendue + (codes - origine)
+        origines.append(origine)
+        etendues.append(etendue)
+
+    if np.prod(etendues, dtype=np.float64) <= GROUPES_DENSES_MAX:
+        # Peu de combinaisons possibles : comptage direct, sans tri
+        nombres = np.bincount(cles, minlength=int(np.prod(etendues)))
+        presentes = np.flatnonzero(nombres)
+        quantites = np.bincount(cles, weights=quantite, minlength=len(nombres))[presentes]
+        valeurs = np.bincount(cles, weights=valeur, minlength=len(nombres))[presentes]
+        nombres = nombres[presentes]
+    else:
+        presentes, inverse = np.unique(cles, return_inverse=True)
+        quantites = np.bincount(inverse, weights=quantite)
+        valeurs = np.bincount(inverse, weights=valeur)
+        nombres = np.bincount(inverse)
+
+    groupes = np.stack(
+        [np.asarray(i) + o for i, o in zip(np.unravel_index(presentes, etendues), origines)], axis=1
+    ) if len(presentes) else np.empty((0, len(dimensions)), dtype=np.int64)
+
+    libelles = {d: _libelles(d, set(groupes[:, i].tolist())) for i, d in enumerate(dimensions)}
+    lignes = []
+    for g in np.argsort(-quantites, kind='stable'):
+        ligne = {}
+        for i, d in enumerate(dimensions):
+            code = int(groupes[g, i])
+            ligne[d] = code
+            ligne[f"{d}_libelle"] = libelles[d][code]
+        ligne.update(quantite=int(quantites[g]), valeur=float(valeurs[g]), nb_mouvements=int(nombres[g]))
+        lignes.append(ligne)
+    return lignes
+
+
+# ============================================================================
+# CLASSIFICATION ABC / XYZ
+# ============================================================================
+# ABC : part cumulée de la valeur consommée (sorties x prix de vente), produits
+# triés par valeur décroissante. XYZ : coefficient de variation de la demande
+# mensuelle. Calculée en lot pour tout le catalogue, stockée dans classification_stock.
+
+CLASSES_ABC = ('A', 'B', 'C')
+CLASSES_XYZ = ('X', 'Y', 'Z')
+
+# Part cumulée de la valeur (avant le produit) sous laquelle il est classé A, puis B
+SEUILS_ABC = (0.80, 0.95)
+# Coefficient de variation de la demande mensuelle jusqu'auquel il est classé X, puis Y
+SEUILS_XYZ = (0.5, 1.0)
+# Nombre de mois de demande pris en compte
+CLASSIFICATION_MOIS = 12
+
+REQUETE_CLASSIFICATION = """
+    SELECT
+        cl.*,
+        p.reference as produit_reference,
+        p.nom as produit_nom,
+        p.quantite
+    FROM classification_stock cl
+    JOIN produits p ON p.id = cl.produit_id
+"""
+
+
+def _indice_mois(jour):
+    return jour.year * 12 + jour.month - 1
+
+
+def calculer_classification(nb_mois=CLASSIFICATION_MOIS, date_fin=None):
+    """
+    Recalcule la classification ABC/XYZ et la valorisation du stock de tout le
+    catalogue en une passe vectorisée (demande mensuelle lue dans mouvements_monthly).
+    Retourne {'produits', 'duree'}.
+    """
+    if nb_mois < 1:
+        raise ValueError("La classification porte sur au moins un mois")
+    debut_calcul = time.perf_counter()
+    fin = database._date_iso(date_fin or date.today())
+    dernier = _indice_mois(fin)
+    premier = dernier - nb_mois + 1
+
+    database._assurer_mouvements_daily()
+    # to_array n'accepte pas de NULL : quantités et prix absents comptés à 0
+    produits = database.to_array("""
+        SELECT id, COALESCE(quantite, 0), COALESCE(prix_achat, 0), COALESCE(prix_vente, 0)
+        FROM produits ORDER BY id
+    """, dtype=np.float64)
+    ventes = database.to_array("""
+        SELECT produit_id, CAST(substr(mois, 1, 4) AS INTEGER) * 12 + CAST(substr(mois, 6, 2) AS INTEGER) - 1 - ?,
+               COALESCE(quantite_totale, 0)
+        FROM mouvements_monthly
+        WHERE mois BETWEEN ? AND ? AND type = 'sortie'
+    """, (premier, f"{premier // 12:04d}-{premier % 12 + 1:02d}", f"{fin.year:04d}-{fin.month:02d}"),
+        dtype=np.int64)
+
+    ids = produits[:, 0].astype(np.int64)
+    quantites, prix_achat, prix_vente = produits[:, 1], produits[:, 2], produits[:, 3]
+    nb_produits = len(ids)
+
+    # Demande mensuelle en matrice produits x mois (produits supprimés écartés)
+    lignes = np.searchsorted(ids, ventes[:, 0])
+    connues = lignes < nb_produits
+    connues[connues] = ids[lignes[connues]] == ventes[connues, 0]
+    demande = np.bincount(
+        lignes[connues] * nb_mois + ventes[connues, 1],
+        weights=ventes[connues, 2],
+        minlength=nb_produits * nb_mois,
+    ).reshape(nb_produits, nb_mois)
+
+    # ABC : part cumulée de la valeur consommée, du produit le plus consommé au moins consommé
+    valeur = demande.sum(axis=1) * prix_vente
+    total = valeur.sum()
+    ordre = np.argsort(-valeur, kind='stable')
+    part_cumulee = np.empty(nb_produits)
+    part_cumulee[ordre] = np.cumsum(valeur[ordre]) / total if total > 0 else 0.0
+    part_avant = part_cumulee - (valeur / total if total > 0 else 0.0)
+    abc = np.where(part_avant < SEUILS_ABC[0], 0, np.where(part_avant < SEUILS_ABC[1], 1, 2))
+    abc[valeur <= 0] = 2
+
+    # XYZ : coefficient de variation de la demande mensuelle (pas de demande : Z)
+    moyenne = demande.mean(axis=1)
+    cv = np.divide(demande.std(axis=1), moyenne, out=np.full(nb_produits, np.nan), where=moyenne > 0)
+    xyz = np.where(cv <= SEUILS_XYZ[0], 0, np.where(cv <= SEUILS_XYZ[1], 1, 2))
+
+    horodatage = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM classification_stock")
+        conn.executemany("""
+            INSERT INTO classification_stock
+            (produit_id, classe_abc, classe_xyz, valeur_consommation, part_cumulee,
+             coefficient_variation, valeur_stock_achat, valeur_stock_vente, date_calcul)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, zip(
+            ids.tolist(),
+            np.array(CLASSES_ABC)[abc].tolist(),
+            np.array(CLASSES_XYZ)[xyz].tolist(),
+            valeur.tolist(),
+            part_cumulee.tolist(),
+            [None if np.isnan(c) else c for c in cv.tolist()],
+            (quantites * prix_achat).tolist(),
+            (quantites * prix_vente).tolist(),
+            [horodatage] * nb_produits,
+        ))
+
+    duree = time.perf_counter() - debut_calcul
+    database.logger.info(f"Classification ABC/XYZ recalculée: {nb_produits} produits ({duree:.1f} s)")
+    return {'produits': nb_produits, 'duree': duree}
+
+
+@database.lecture_en_cache
+def get_calcul_classification():
+    """Date du dernier calcul (None s'il n'a jamais été fait) et nombre de produits classés"""
+    return database.fetch_one(
+        "SELECT MAX(date_calcul) as date_calcul, COUNT(*) as nb_produits FROM classification_stock"
+    )
+
+
+@database.lecture_en_cache
+def get_matrice_abc_xyz():
+    """Nombre de produits, valeur consommée et valeur du stock par couple de classes"""
+    return database.fetch_all("""
+        SELECT
+            classe_abc, classe_xyz,
+            COUNT(*) as nb_produits,
+            SUM(valeur_consommation) as valeur_consommation,
+            SUM(valeur_stock_achat) as valeur_stock_achat,
+            SUM(valeur_stock_vente) as valeur_stock_vente
+        FROM classification_stock
+        GROUP BY classe_abc, classe_xyz
+        ORDER BY classe_abc, classe_xyz
+    """)
+
+
+@database.lecture_en_cache
+def get_classification_page(classes_abc=CLASSES_ABC, classes_xyz=CLASSES_XYZ, page=1, taille_page=50):
+    """
+    Une page de la classification, produits les plus consommés d'abord.
+    Retourne {'lignes', 'page', 'a_suivante', 'total'}
+    """
+    classes_abc, classes_xyz = tuple(classes_abc), tuple(classes_xyz)
+    if set(classes_abc) - set(CLASSES_ABC) or set(classes_xyz) - set(CLASSES_XYZ):
+        raise ValueError(f"Classes invalides. Attendu : {', '.join(CLASSES_ABC)} et {', '.join(CLASSES_XYZ)}")
+    if not classes_abc or not classes_xyz:
+        return {'lignes': [], 'page': 1, 'a_suivante': False, 'total': 0}
+
+    page = max(1, int(page))
+    condition = (
+        f"cl.classe_abc IN ({', '.join('?' for _ in classes_abc)}) "
+        f"AND cl.classe_xyz IN ({', '.join('?' for _ in classes_xyz)})"
+    )
+    params = classes_abc + classes_xyz
+    lignes = database.fetch_all(f"""
+        {REQUETE_CLASSIFICATION}
+        WHERE {condition}
+        ORDER BY cl.valeur_consommation DESC, cl.produit_id
+        LIMIT ? OFFSET ?
+    """, params + (taille_page + 1, (page - 1) * taille_page))
+    total = database.fetch_one(
+        f"SELECT COUNT(*) as nb FROM classification_stock cl JOIN produits p ON p.id = cl.produit_id WHERE {condition}",
+        params
+    )['nb']
+    return {
+        'lignes': lignes[:taille_page],
+        'page': page,
+        'a_suivante': len(lignes) > taille_page,
+        'total': total,
+    }
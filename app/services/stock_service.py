@@ -0,0 +1,212 @@
+# app/services/stock_service.py - Écritures de stock sérialisées
+"""
+Service d'écriture du stock : un thread rédacteur unique consomme une file de
+commandes (mouvement unitaire ou lot) et les valide par groupes : toutes les
+commandes arrivées pendant l'écriture du groupe précédent (et pendant la
+fenêtre ECRITURE_FENETRE_MS) partagent une seule transaction et un seul commit.
+Chaque commande est isolée dans un SAVEPOINT : une erreur (stock insuffisant,
+produit inconnu...) n'annule que sa propre commande. Son résultat ou son
+erreur est rendu par un Future.
+Les sessions Streamlit ne se disputent plus le verrou d'écriture SQLite.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as DelaiDepasse
+
+try:
+    from config import ECRITURE_FENETRE_MS, ECRITURE_GROUPE_MAX
+except ImportError:  # import via le paquet app
+    from ..config import ECRITURE_FENETRE_MS, ECRITURE_GROUPE_MAX
+
+from models import database
+
+# Attente maximale (secondes) du résultat d'une commande par les fonctions bloquantes
+DELAI_RESULTAT = 30.0
+
+_ARRET = object()  # sentinelle de fin de la file
+
+_file = queue.Queue()
+_verrou = threading.Lock()
+_redacteur = {'thread': None}
+_compteurs = {'commandes': 0, 'groupes': 0, 'erreurs': 0, 'plus_grand_groupe': 0}
+
+# ============================================================================
+# THREAD RÉDACTEUR
+# ============================================================================
+
+def _mouvement(conn, produit_id, quantite, type_mouvement, motif, utilisateur, document_ref):
+    quantite_avant, quantite_apres = database._appliquer_mouvement(
+        conn, produit_id, quantite, type_mouvement, motif, utilisateur, document_ref
+    )
+    return {'quantite_avant': quantite_avant, 'quantite_apres': quantite_apres}
+
+def _appliquer_commande(conn, fonction, args):
+    """Exécute une commande dans un SAVEPOINT : en cas d'erreur, seule elle est annulée"""
+    conn.execute("SAVEPOINT commande")
+    try:
+        resultat = fonction(conn, *args)
+    except Exception:
+        conn.execute("ROLLBACK TO commande")
+        conn.execute("RELEASE commande")
+        raise
+    conn.execute("RELEASE commande")
+    return resultat
+
+def _executer_groupe(groupe):
+    """Applique un groupe de commandes en une transaction, puis résout leurs Futures"""
+    groupe = [commande for commande in groupe if commande[2].set_running_or_notify_cancel()]
+    if not groupe:
+        return
+
+    issues = []
+    try:
+        with database.transaction() as conn:
+            for fonction, args, future in groupe:
+                try:
+                    issues.append((future, _appliquer_commande(conn, fonction, args), None))
+                except Exception as e:
+                    issues.append((future, None, e))
+            database._rafraichir_mouvements_daily(conn)
+    except Exception as e:
+        # Transaction impossible ou commit refusé : aucune commande du groupe n'est écrite
+        database.logger.error(f"Échec du groupe d'écriture ({len(groupe)} commandes): {e}")
+        _compteurs['erreurs'] += len(groupe)
+        for _, _, future in groupe:
+            future.set_exception(e)
+        return
+
+    erreurs = sum(1 for _, _, erreur in issues if erreur is not None)
+    _compteurs['commandes'] += len(groupe)
+    _compteurs['groupes'] += 1
+    _compteurs['erreurs'] += erreurs
+    _compteurs['plus_grand_groupe'] = max(_compteurs['plus_grand_groupe'], len(groupe))
+    database.logger.info(f"Groupe d'écriture: {len(groupe)} commandes, {erreurs} en erreur")
+
+    # Résultats rendus après le commit : une commande réussie est durable
+    for future, resultat, erreur in issues:
+        if erreur is None:
+            future.set_result(resultat)
+        else:
+            future.set_exception(erreur)
+
+def _boucle_redacteur():
+    """Attend une commande, y joint celles déjà en file ou reçues pendant la fenêtre, les écrit"""
+    fenetre = ECRITURE_FENETRE_MS / 1000
+    arret = False
+    try:
+        while not arret:
+            commande = _file.get()
+            if commande is _ARRET:
+                break
+            groupe = [commande]
+            limite = time.monotonic() + fenetre
+            while len(groupe) < ECRITURE_GROUPE_MAX:
+                try:
+                    commande = _file.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+                if commande is _ARRET:
+                    arret = True
+                    break
+                groupe.append(commande)
+            _executer_groupe(groupe)
+    finally:
+        database.release_connection()
+
+def _demarrer():
+    """Démarre le thread rédacteur s'il ne tourne pas déjà"""
+    with _verrou:
+        thread = _redacteur['thread']
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_boucle_redacteur, name="stock-redacteur", daemon=True)
+            thread.start()
+            _redacteur['thread'] = thread
+        return thread
+
+def arreter(delai=5.0):
+    """Traite les commandes en attente puis arrête le thread rédacteur"""
+    with _verrou:
+        thread = _redacteur['thread']
+        _redacteur['thread'] = None
+    if thread is not None and thread.is_alive():
+        _file.put(_ARRET)
+        thread.join(delai)
+
+atexit.register(arreter)
+
+# ============================================================================
+# SOUMISSION DES COMMANDES
+# ============================================================================
+
+def _soumettre(fonction, *args):
+    thread = _demarrer()
+    if threading.current_thread() is thread:
+        raise RuntimeError("Une commande ne peut pas être soumise depuis le thread rédacteur")
+    future = Future()
+    _file.put((fonction, args, future))
+    return future
+
+def soumettre_commande(fonction, *args):
+    """
+    Met en file une écriture quelconque, exécutée par le rédacteur comme
+    fonction(conn, *args) dans la transaction de son groupe (et son SAVEPOINT).
+    Retourne un Future rendant le résultat de fonction.
+    """
+    return _soumettre(fonction, *args)
+
+def soumettre_mouvement(produit_id, quantite, type_mouvement="ajustement", motif="",
+                        utilisateur="admin", document_ref=""):
+    """
+    Met en file un mouvement de stock (mêmes paramètres que database.update_stock).
+    Retourne un Future dont le résultat est {'quantite_avant', 'quantite_apres'},
+    ou l'erreur de validation (ValueError) du mouvement.
+    """
+    return _soumettre(_mouvement, produit_id, quantite, type_mouvement, motif, utilisateur, document_ref)
+
+def soumettre_lot(lignes, mode="tout_ou_rien", utilisateur="admin", document_ref=""):
+    """
+    Met en file un lot de mouvements (mêmes paramètres que database.update_stock_batch).
+    Le lot est appliqué comme une seule commande ; le Future rend
+    {'appliquees', 'rejetees', 'lignes'}.
+    """
+    return _soumettre(database._appliquer_lot, list(lignes), mode, utilisateur, document_ref)
+
+def _attendre(future, delai):
+    """
+    Résultat de la commande. Passé le délai, elle est retirée de la file : une
+    commande signalée en échec ne doit pas être écrite plus tard (une nouvelle
+    tentative l'enregistrerait deux fois). Si le rédacteur l'a déjà prise, son
+    issue est attendue jusqu'au commit de son groupe.
+    """
+    try:
+        return future.result(delai)
+    except DelaiDepasse:  # distinct du TimeoutError natif avant Python 3.11
+        if future.cancel():
+            raise DelaiDepasse(
+                f"Écriture non traitée après {delai:g} s : commande annulée, rien n'a été enregistré"
+            ) from None
+        return future.result()
+
+def enregistrer_mouvement(produit_id, quantite, type_mouvement="ajustement", motif="",
+                          utilisateur="admin", document_ref="", delai=DELAI_RESULTAT):
+    """Version bloquante de soumettre_mouvement (remplace database.update_stock)"""
+    return _attendre(
+        soumettre_mouvement(produit_id, quantite, type_mouvement, motif, utilisateur, document_ref),
+        delai
+    )
+
+def enregistrer_lot(lignes, mode="tout_ou_rien", utilisateur="admin", document_ref="",
+                    delai=DELAI_RESULTAT):
+    """Version bloquante de soumettre_lot (remplace database.update_stock_batch)"""
+    return _attendre(soumettre_lot(lignes, mode, utilisateur, document_ref), delai)
+
+def get_stats_redacteur():
+    """Compteurs du thread rédacteur : commandes, groupes, taille moyenne des groupes, file"""
+    return {
+        **_compteurs,
+        'taille_moyenne': _compteurs['commandes'] / _compteurs['groupes'] if _compteurs['groupes'] else 0.0,
+        'en_attente': _file.qsize(),
+    }
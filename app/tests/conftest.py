@@ -0,0 +1,33 @@
+# app/tests/conftest.py - Base temporaire partagée par les tests
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models import database  # noqa: E402
+from services import stock_service  # noqa: E402
+
+
+def _liberer_base():
+    """Arrête le rédacteur et ferme toutes les connexions à la base courante"""
+    stock_service.arreter()
+    database.close_pool()
+    database._fermer_connexion_controle()
+    database._bootstrap['pret'] = False
+    database.vider_cache()
+
+
+@pytest.fixture
+def base(tmp_path):
+    """Base neuve (schéma et données de démo) créée par init_database dans un dossier temporaire"""
+    logging.disable(logging.INFO)
+    chemin_origine = database.DB_PATH
+    _liberer_base()
+    database.DB_PATH = tmp_path / "test.db"
+    database.assurer_schema()
+    yield database
+    _liberer_base()
+    database.DB_PATH = chemin_origine
+    logging.disable(logging.NOTSET)
@@ -0,0 +1,12 @@
+# app/tests/test_alerte_service.py - Couverture du stock
+from services import alerte_service
+
+
+def test_couverture_quantite_null(base):
+    nb_produits = base.fetch_one("SELECT COUNT(*) as nb FROM produits")['nb']
+    base.execute_query("UPDATE produits SET quantite = NULL WHERE id = (SELECT MIN(id) FROM produits)")
+
+    resultat = alerte_service.calculer_couverture()
+
+    assert resultat['produits'] == nb_produits
+    assert base.fetch_one("SELECT COUNT(*) as nb FROM couverture_stock")['nb'] == nb_produits
@@ -0,0 +1,45 @@
+# app/tests/test_cache.py - Cache de lecture
+from services import alerte_service, rapport_service
+
+
+def test_arguments_liste_mis_en_cache(base):
+    page = alerte_service.get_alertes_page(['ouverte'])
+    assert alerte_service.get_alertes_page(['ouverte']) == page
+    assert alerte_service.get_alertes_page(('ouverte',)) == page
+    assert base.get_cache_stats()['fonctions']['get_alertes_page']['hits'] == 2
+
+    classification = rapport_service.get_classification_page(['A'], {'X'})
+    assert rapport_service.get_classification_page(['A'], {'X'}) == classification
+
+
+def test_argument_non_hachable_non_mis_en_cache(base):
+    appels = []
+
+    @base.lecture_en_cache
+    def lecture(filtre):
+        appels.append(filtre)
+        return [filtre]
+
+    assert lecture(bytearray(b'x')) == [bytearray(b'x')]
+    assert lecture(bytearray(b'x')) == [bytearray(b'x')]
+    assert len(appels) == 2
+
+
+def test_cache_borne_en_lignes(base, monkeypatch):
+    monkeypatch.setattr(base, 'CACHE_LIGNES_MAX', 100)
+
+    @base.lecture_en_cache
+    def lecture(n):
+        return [{'i': i} for i in range(n)]
+
+    lecture(60)
+    lecture(30)
+    assert base.get_cache_stats()['lignes'] == 90
+    # Le dépassement du budget évince l'entrée la plus ancienne
+    lecture(40)
+    assert base.get_cache_stats()['lignes'] == 70
+    # Un résultat plus grand que le budget n'est pas conservé
+    lecture(150)
+    assert base.get_cache_stats()['lignes'] == 70
+    lecture(150)
+    assert base.get_cache_stats()['fonctions']['lecture']['hits'] == 0
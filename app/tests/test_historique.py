@@ -0,0 +1,61 @@
+# app/tests/test_historique.py - Stock à une date passée
+from datetime import date, timedelta
+
+from services import historique_service
+
+
+def jour(recul):
+    return date.today() - timedelta(days=recul)
+
+
+def dater(base, table, identifiant, colonne, recul, heure="12:00:00"):
+    with base.transaction() as conn:
+        conn.execute(f"UPDATE {table} SET {colonne} = ? WHERE id = ?",
+                     (f"{jour(recul).isoformat()} {heure}", identifiant))
+
+
+def stock_du_produit(produit_id, recul):
+    lignes = [l for l in historique_service.get_stock_at(jour(recul)) if l['produit_id'] == produit_id]
+    return lignes[0]['quantite'] if lignes else None
+
+
+def test_produit_cree_apres_instantane(base):
+    # Instantané à J-10, produit créé à J-8 avec 10 unités (sans mouvement), sortie de 3 à J-5
+    snapshot_id = historique_service.prendre_snapshot()['snapshot_id']
+    dater(base, 'stock_snapshots', snapshot_id, 'date_snapshot', 10)
+    categorie_id = base.get_all_categories()[0]['id']
+    produit_id = base.add_produit({'reference': 'HIST-1', 'nom': 'Nouveau', 'categorie_id': categorie_id,
+                                   'quantite': 10, 'prix_vente': 2.0})
+    dater(base, 'produits', produit_id, 'date_creation', 8)
+    base.update_stock(produit_id, 3, 'sortie')
+    mouvement_id = base.fetch_one("SELECT MAX(id) as id FROM mouvements")['id']
+    dater(base, 'mouvements', mouvement_id, 'date_mouvement', 5)
+
+    assert stock_du_produit(produit_id, 9) is None
+    assert stock_du_produit(produit_id, 7) == 10
+    assert stock_du_produit(produit_id, 3) == 7
+    assert stock_du_produit(produit_id, 0) == 7
+
+
+def test_produit_cree_apres_instantane_sans_mouvement(base):
+    snapshot_id = historique_service.prendre_snapshot()['snapshot_id']
+    dater(base, 'stock_snapshots', snapshot_id, 'date_snapshot', 10)
+    categorie_id = base.get_all_categories()[0]['id']
+    produit_id = base.add_produit({'reference': 'HIST-2', 'nom': 'Sans mouvement',
+                                   'categorie_id': categorie_id, 'quantite': 4})
+    dater(base, 'produits', produit_id, 'date_creation', 6)
+
+    assert stock_du_produit(produit_id, 7) is None
+    assert stock_du_produit(produit_id, 5) == 4
+    valorisation = historique_service.get_valorisation_at(jour(5))
+    assert valorisation['nb_produits'] == len(base.get_all_produits())
+
+
+def test_snapshot_si_du_ecrit_par_le_redacteur(base):
+    future = historique_service.snapshot_si_du()
+    snapshot_id = future.result(10)
+    assert snapshot_id is not None
+    ligne = base.fetch_one("SELECT nb_produits FROM stock_snapshots WHERE id = ?", (snapshot_id,))
+    assert ligne['nb_produits'] == len(base.get_all_produits())
+    # Plus dû : aucune nouvelle demande
+    assert historique_service.snapshot_si_du() is None
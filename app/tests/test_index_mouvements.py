@@ -0,0 +1,85 @@
+# app/tests/test_index_mouvements.py - Plans d'exécution des requêtes indexées
+"""
+Vérifie par EXPLAIN QUERY PLAN, sur une base temporaire créée par
+init_database, que les filtres de l'historique, la pagination par clé et la
+requête des produits en alerte cherchent dans leurs index au lieu de parcourir
+les tables.
+
+Usage : python -m pytest app/tests
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models import database  # noqa: E402
+
+PERIODE = {'date_debut': '2024-01-01', 'date_fin': '2024-01-31'}
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    logging.disable(logging.INFO)
+    chemin_origine = database.DB_PATH
+    database.close_pool()
+    database.DB_PATH = tmp_path_factory.mktemp("base") / "test.db"
+    database._bootstrap['pret'] = False
+    database.init_database()
+    yield database.get_pooled_connection()
+    database.close_pool()
+    database.DB_PATH = chemin_origine
+    database._bootstrap['pret'] = False
+    logging.disable(logging.NOTSET)
+
+
+def plan(conn, requete, params=()):
+    """Détail de chaque étape du plan (colonne 'detail' de EXPLAIN QUERY PLAN)"""
+    return [ligne[3] for ligne in conn.execute(f"EXPLAIN QUERY PLAN {requete}", params)]
+
+
+def requetes_executees(conn, fonction, *args):
+    """Requêtes SQL exécutées par fonction, paramètres liés"""
+    requetes = []
+    conn.set_trace_callback(requetes.append)
+    try:
+        fonction(*args)
+    finally:
+        conn.set_trace_callback(None)
+    return [requete for requete in requetes if "SELECT" in requete]
+
+
+def etape_mouvements(etapes):
+    return next(etape for etape in etapes if etape.startswith(("SEARCH m ", "SCAN m ")))
+
+
+@pytest.mark.parametrize("filtres, index", [
+    (PERIODE, "idx_mouvements_date"),
+    (dict(PERIODE, type_mouvement='Entree'), "idx_mouvements_type_date"),
+    (dict(PERIODE, produit_id=1), "idx_mouvements_produit_date"),
+])
+def test_filtres_historique(conn, filtres, index):
+    etape = etape_mouvements(plan(conn, *database.requete_mouvements(filtres)))
+    assert etape.startswith(f"SEARCH m USING INDEX {index} (")
+    assert "date_mouvement>? AND date_mouvement<?" in etape
+
+
+def test_page_par_cle(conn):
+    curseur = database._encoder_curseur('suivant', {'date_mouvement': '2024-01-15 10:00:00', 'id': 10})
+    requete, = requetes_executees(conn, database.get_mouvements_page, PERIODE, curseur)
+    etapes = plan(conn, requete)
+    assert etape_mouvements(etapes).startswith("SEARCH m USING INDEX idx_mouvements_date (")
+    assert not any("TEMP B-TREE" in etape for etape in etapes)
+
+
+def test_produits_en_alerte(conn):
+    requete, = requetes_executees(conn, database.get_produits_en_alerte)
+    etapes = plan(conn, requete)
+    assert etapes[0].startswith("SEARCH p USING INDEX idx_produits_alerte (")
+
+
+def test_seuil_sans_expression_parcourt_la_table(conn):
+    # La forme "quantite <= seuil_min" ne peut pas utiliser l'index d'expression
+    assert plan(conn, "SELECT id FROM produits WHERE quantite <= seuil_min") == ["SCAN produits"]
@@ -0,0 +1,215 @@
+# app/tests/test_invariants.py - Cohérence des données dérivées du journal des mouvements
+"""
+Les compteurs (stats), agrégats (mouvements_daily et dérivés), le cube des
+rapports, la pagination par clé et les instantanés sont tenus à jour de façon
+incrémentale : chacun est comparé ici à un recalcul complet depuis les tables
+de base après une activité mêlant les différents chemins d'écriture.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from services import historique_service, rapport_service, stock_service
+
+
+def jour(recul):
+    return date.today() - timedelta(days=recul)
+
+
+def activite(base):
+    """
+    Ajouts et suppressions de produits, mouvements unitaires, par lot, via le
+    rédacteur et écrits hors update_stock
+    """
+    categories = [c['id'] for c in base.get_all_categories()]
+    nouveaux = [
+        base.add_produit({'reference': f'INV-{i}', 'nom': f'Invariant {i}',
+                          'categorie_id': categories[i % len(categories)],
+                          'quantite': 10 * i, 'seuil_min': 8, 'prix_vente': 1.5 * i})
+        for i in range(1, 5)
+    ]
+    produits = [p['id'] for p in base.get_all_produits()]
+
+    for i, produit_id in enumerate(produits):
+        base.update_stock(produit_id, 5 + i, 'entree')
+        base.update_stock(produit_id, 2, 'sortie')
+    base.update_stock(nouveaux[0], 3, 'ajustement')
+    lot = [(p, 'sortie', 1, "lot") for p in produits] + [(produits[0], 'sortie', 10**6, "lot")]
+    base.update_stock_batch(lot, mode='meilleur_effort')
+    for future in [stock_service.soumettre_mouvement(p, 4, 'entree') for p in produits]:
+        future.result(10)
+
+    # Mouvements historiques écrits directement (imports), sur plusieurs jours et à heures identiques
+    with base.transaction() as conn:
+        for recul in range(1, 8):
+            for produit_id in produits[:3]:
+                for type_mouvement in ('entree', 'sortie'):
+                    conn.execute(
+                        "INSERT INTO mouvements (produit_id, type, quantite, date_mouvement) VALUES (?, ?, ?, ?)",
+                        (produit_id, type_mouvement, recul, f"{jour(recul).isoformat()} 09:00:00")
+                    )
+
+    base.execute_query("DELETE FROM mouvements WHERE id = (SELECT MIN(id) FROM mouvements)")
+    base.execute_query("UPDATE produits SET prix_vente = prix_vente + 1 WHERE id = ?", (produits[0],))
+    base.delete_produit(nouveaux[-1])
+    base.add_fournisseur("Fournisseur invariant")
+    base.add_categorie("Catégorie invariant")
+
+
+def test_stats_par_triggers_egales_au_recalcul(base):
+    activite(base)
+    stats = base.fetch_one("SELECT * FROM stats")
+    requete_categories = "SELECT * FROM stats_categories WHERE nb_produits > 0 ORDER BY categorie_id"
+    categories = base.fetch_all(requete_categories)
+
+    base.recompute_statistiques()
+
+    recalcul = base.fetch_one("SELECT * FROM stats")
+    assert stats == {**recalcul, 'valeur_totale': pytest.approx(recalcul['valeur_totale'])}
+    assert categories == base.fetch_all(requete_categories)
+
+
+def test_mouvements_daily_egal_au_journal(base):
+    activite(base)
+    base._assurer_mouvements_daily()
+
+    journal = base.fetch_all("""
+        SELECT produit_id, DATE(date_mouvement) as jour, type,
+               SUM(quantite) as quantite_totale, COUNT(*) as nb_mouvements
+        FROM mouvements GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+    """)
+    requete_daily = """
+        SELECT produit_id, jour, type, quantite_totale, nb_mouvements
+        FROM mouvements_daily WHERE nb_mouvements > 0 ORDER BY 1, 2, 3
+    """
+    assert base.fetch_all(requete_daily) == journal
+    # Agrégats dérivés tenus par triggers sur mouvements_daily
+    assert base.fetch_all("""
+        SELECT jour, type, quantite_totale, nb_mouvements
+        FROM mouvements_daily_totaux WHERE nb_mouvements > 0 ORDER BY 1, 2
+    """) == base.fetch_all("""
+        SELECT DATE(date_mouvement) as jour, type,
+               SUM(quantite) as quantite_totale, COUNT(*) as nb_mouvements
+        FROM mouvements GROUP BY 1, 2 ORDER BY 1, 2
+    """)
+    assert base.fetch_all("""
+        SELECT produit_id, mois, type, quantite_totale, nb_mouvements
+        FROM mouvements_monthly WHERE nb_mouvements > 0 ORDER BY 1, 2, 3
+    """) == base.fetch_all("""
+        SELECT produit_id, strftime('%Y-%m', date_mouvement) as mois, type,
+               SUM(quantite) as quantite_totale, COUNT(*) as nb_mouvements
+        FROM mouvements GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+    """)
+
+    # Reconstruction partielle depuis un mouvement intermédiaire
+    milieu = base.fetch_one("SELECT id FROM mouvements ORDER BY id LIMIT 1 OFFSET 10")['id']
+    base.rebuild_mouvements_daily(depuis_id=milieu)
+    assert base.fetch_all(requete_daily) == journal
+
+
+def _cube_par_sql(base, condition="", params=()):
+    return {
+        (l['produit_id'], l['type']): (l['quantite'], pytest.approx(l['valeur']), l['nb'])
+        for l in base.fetch_all(f"""
+            SELECT m.produit_id, m.type, SUM(m.quantite) as quantite,
+                   SUM(m.quantite * COALESCE(p.prix_vente, 0)) as valeur, COUNT(*) as nb
+            FROM mouvements m LEFT JOIN produits p ON p.id = m.produit_id
+            WHERE 1 = 1 {condition}
+            GROUP BY m.produit_id, m.type
+        """, params)
+    }
+
+
+def _cube_par_produit_et_type(filtres=None):
+    return {
+        (l['produit'], l['type_libelle']): (l['quantite'], l['valeur'], l['nb_mouvements'])
+        for l in rapport_service.somme_cube(filtres, par=('produit', 'type'))
+    }
+
+
+def test_cube_egal_au_sql(base):
+    # Cube construit avant l'activité : les écritures suivantes passent par l'intégration incrémentale
+    rapport_service.somme_cube()
+    activite(base)
+
+    assert _cube_par_produit_et_type() == _cube_par_sql(base)
+
+    categorie_id = base.get_all_categories()[0]['id']
+    filtres = {'date_debut': jour(5), 'date_fin': jour(2), 'categorie_id': categorie_id}
+    assert _cube_par_produit_et_type(filtres) == _cube_par_sql(
+        base, "AND DATE(m.date_mouvement) BETWEEN ? AND ? AND p.categorie_id = ?",
+        (jour(5).isoformat(), jour(2).isoformat(), categorie_id)
+    )
+    total = rapport_service.somme_cube()
+    assert total['nb_mouvements'] == base.fetch_one("SELECT COUNT(*) as nb FROM mouvements")['nb']
+
+    # Le cube reconstruit de zéro donne le même résultat
+    rapport_service.reconstruire_cube()
+    assert _cube_par_produit_et_type() == _cube_par_sql(base)
+
+
+def test_pagination_par_cle_sans_doublon_ni_oubli(base):
+    activite(base)
+    attendu = [l['id'] for l in base.fetch_all(
+        "SELECT id FROM mouvements ORDER BY date_mouvement DESC, id DESC"
+    )]
+
+    pages = []
+    page = base.get_mouvements_page(taille_page=7)
+    pages.append([l['id'] for l in page['lignes']])
+    while page['suivant']:
+        page = base.get_mouvements_page(curseur=page['suivant'], taille_page=7)
+        pages.append([l['id'] for l in page['lignes']])
+    assert [i for p in pages for i in p] == attendu
+    assert all(len(p) == 7 for p in pages[:-1])
+
+    # Retour en arrière depuis la dernière page : mêmes pages dans l'ordre inverse
+    retour = []
+    while page['precedent']:
+        page = base.get_mouvements_page(curseur=page['precedent'], taille_page=7)
+        retour.append([l['id'] for l in page['lignes']])
+    assert retour == pages[-2::-1]
+
+
+def test_stock_a_une_date_egal_au_rejeu_du_journal(base):
+    # Catalogue créé à J-30 ; un produit ajouté à J-12. Mouvements chaque jour de
+    # J-20 à J-1, instantanés à J-15, J-9 et J-4 (après les mouvements du jour)
+    base.execute_query("UPDATE produits SET date_creation = ?", (f"{jour(30).isoformat()} 08:00:00",))
+    categorie_id = base.get_all_categories()[0]['id']
+
+    for recul in range(20, 0, -1):
+        if recul == 12:
+            nouveau = base.add_produit({'reference': 'INV-HIST', 'nom': 'Ajouté', 'categorie_id': categorie_id,
+                                        'quantite': 7, 'prix_vente': 3.0})
+            base.execute_query("UPDATE produits SET date_creation = ? WHERE id = ?",
+                               (f"{jour(12).isoformat()} 08:00:00", nouveau))
+        produits = [p['id'] for p in base.fetch_all(
+            "SELECT id FROM produits WHERE date_creation < ?", (jour(recul - 1).isoformat(),)
+        )]
+        premier = base.fetch_one("SELECT COALESCE(MAX(id), 0) as id FROM mouvements")['id']
+        for i, produit_id in enumerate(produits):
+            base.update_stock(produit_id, recul + i, 'entree')
+            base.update_stock(produit_id, 1 + recul % 3, 'sortie')
+        base.execute_query("UPDATE mouvements SET date_mouvement = ? WHERE id > ?",
+                           (f"{jour(recul).isoformat()} 10:00:00", premier))
+        if recul in (15, 9, 4):
+            snapshot_id = historique_service.prendre_snapshot()['snapshot_id']
+            base.execute_query("UPDATE stock_snapshots SET date_snapshot = ? WHERE id = ?",
+                               (f"{jour(recul).isoformat()} 18:00:00", snapshot_id))
+
+    courant = {p['id']: (p['quantite'], p['date_creation']) for p in base.fetch_all(
+        "SELECT id, quantite, date_creation FROM produits"
+    )}
+    mouvements = base.fetch_all(
+        "SELECT produit_id, date_mouvement, quantite_apres - quantite_avant as delta FROM mouvements"
+    )
+
+    for recul in range(22, -1, -1):
+        fin = jour(recul - 1).isoformat()
+        rejeu = {
+            produit_id: quantite - sum(m['delta'] for m in mouvements
+                                       if m['produit_id'] == produit_id and m['date_mouvement'] >= fin)
+            for produit_id, (quantite, creation) in courant.items() if creation < fin
+        }
+        stock = {l['produit_id']: l['quantite'] for l in historique_service.get_stock_at(jour(recul))}
+        assert stock == rejeu, f"J-{recul}"
@@ -0,0 +1,31 @@
+# app/tests/test_rapport_service.py - Cube et libellés des rapports
+from services import rapport_service, stock_service
+
+
+def test_libelles_lus_par_paquets(base, monkeypatch):
+    monkeypatch.setattr(rapport_service, 'LIBELLES_TAILLE_PAQUET', 2)
+    produits = {p['id']: p['nom'] for p in base.get_all_produits()}
+    codes = set(produits) | {10**9}
+
+    assert rapport_service._libelles('produit', codes) == {**produits, 10**9: None}
+
+
+def test_somme_cube_par_produit_libellee(base):
+    produits = {p['id']: p['nom'] for p in base.get_all_produits()}
+    for produit_id in produits:
+        stock_service.soumettre_mouvement(produit_id, 1, 'entree').result(10)
+    lignes = rapport_service.somme_cube(par='produit')
+    assert len(lignes) == len(produits)
+    for ligne in lignes:
+        assert ligne['produit_libelle'] == produits[ligne['produit']]
+
+
+def test_classification_quantite_et_prix_null(base):
+    nb_produits = base.fetch_one("SELECT COUNT(*) as nb FROM produits")['nb']
+    base.execute_query("""
+        UPDATE produits SET quantite = NULL, prix_achat = NULL, prix_vente = NULL
+        WHERE id = (SELECT MIN(id) FROM produits)
+    """)
+
+    assert rapport_service.calculer_classification()['produits'] == nb_produits
+    assert base.fetch_one("SELECT COUNT(*) as nb FROM classification_stock")['nb'] == nb_produits
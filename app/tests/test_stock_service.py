@@ -0,0 +1,134 @@
+# app/tests/test_stock_service.py - Thread rédacteur des écritures de stock
+import threading
+
+import pytest
+
+from services import stock_service
+
+
+def bloquer_redacteur():
+    """Occupe le rédacteur jusqu'à libération : les commandes suivantes restent en file"""
+    demarre, liberation = threading.Event(), threading.Event()
+
+    def attendre(conn):
+        demarre.set()
+        liberation.wait(10)
+
+    future = stock_service.soumettre_commande(attendre)
+    assert demarre.wait(10)
+    return liberation, future
+
+
+def produit(base, quantite=20):
+    categorie_id = base.get_all_categories()[0]['id']
+    return base.add_produit({'reference': f'TEST-{quantite}', 'nom': 'Test',
+                             'categorie_id': categorie_id, 'quantite': quantite})
+
+
+def quantite(base, produit_id):
+    return base.get_produit_by_id(produit_id)['quantite']
+
+
+def nb_mouvements(base, produit_id):
+    return base.fetch_one("SELECT COUNT(*) as n FROM mouvements WHERE produit_id = ?", (produit_id,))['n']
+
+
+def test_commande_expiree_en_file_jamais_appliquee(base):
+    produit_id = produit(base)
+    liberation, bloquante = bloquer_redacteur()
+    with pytest.raises(stock_service.DelaiDepasse):
+        stock_service.enregistrer_mouvement(produit_id, 5, 'entree', delai=0.1)
+    liberation.set()
+    bloquante.result(10)
+    # Une commande soumise après l'annulée est traitée : la file a bien été vidée jusque-là
+    stock_service.enregistrer_mouvement(produit_id, 1, 'entree')
+    assert quantite(base, produit_id) == 21
+    assert nb_mouvements(base, produit_id) == 1
+
+
+def test_commande_en_cours_au_delai_attendue(base):
+    demarre, liberation = threading.Event(), threading.Event()
+
+    def lente(conn):
+        demarre.set()
+        liberation.wait(10)
+        return 'ecrite'
+
+    future = stock_service.soumettre_commande(lente)
+    assert demarre.wait(10)
+    threading.Timer(0.2, liberation.set).start()
+    assert stock_service._attendre(future, 0.05) == 'ecrite'
+
+
+def test_commandes_en_file_validees_en_un_groupe(base):
+    produit_id = produit(base)
+    avant = stock_service.get_stats_redacteur()
+    liberation, bloquante = bloquer_redacteur()
+    futures = [stock_service.soumettre_mouvement(produit_id, 1, 'entree') for _ in range(5)]
+    liberation.set()
+    resultats = [future.result(10) for future in futures]
+
+    assert [r['quantite_apres'] for r in resultats] == [21, 22, 23, 24, 25]
+    apres = stock_service.get_stats_redacteur()
+    # Un groupe pour la commande bloquante, un seul pour les cinq mouvements
+    assert apres['groupes'] - avant['groupes'] == 2
+    assert apres['plus_grand_groupe'] >= 5
+    assert quantite(base, produit_id) == 25
+    bloquante.result(10)
+
+
+def test_erreur_annule_seulement_sa_commande(base):
+    produit_id = produit(base)
+
+    def ecrit_puis_echoue(conn):
+        base._appliquer_mouvement(conn, produit_id, 100, 'entree', "", "test", "")
+        raise RuntimeError("échec après écriture")
+
+    liberation, _ = bloquer_redacteur()
+    premiere = stock_service.soumettre_mouvement(produit_id, 2, 'entree')
+    en_echec = stock_service.soumettre_commande(ecrit_puis_echoue)
+    refusee = stock_service.soumettre_mouvement(produit_id, 1000, 'sortie')
+    derniere = stock_service.soumettre_mouvement(produit_id, 3, 'sortie')
+    liberation.set()
+
+    assert premiere.result(10) == {'quantite_avant': 20, 'quantite_apres': 22}
+    with pytest.raises(RuntimeError):
+        en_echec.result(10)
+    with pytest.raises(ValueError, match="Stock insuffisant"):
+        refusee.result(10)
+    assert derniere.result(10) == {'quantite_avant': 22, 'quantite_apres': 19}
+    # Les écritures de la commande en échec ont été annulées avec son SAVEPOINT
+    assert quantite(base, produit_id) == 19
+    assert nb_mouvements(base, produit_id) == 2
+
+
+def test_commande_annulee_avant_traitement_ignoree(base):
+    produit_id = produit(base)
+    liberation, _ = bloquer_redacteur()
+    annulee = stock_service.soumettre_mouvement(produit_id, 5, 'entree')
+    assert annulee.cancel()
+    suivante = stock_service.soumettre_mouvement(produit_id, 1, 'entree')
+    liberation.set()
+
+    assert suivante.result(10)['quantite_apres'] == 21
+    assert nb_mouvements(base, produit_id) == 1
+
+
+@pytest.mark.parametrize("mode, appliquees, stock_final", [
+    ('tout_ou_rien', 0, 20),
+    ('meilleur_effort', 2, 23),
+])
+def test_lot(base, mode, appliquees, stock_final):
+    produit_id = produit(base)
+    lignes = [
+        (produit_id, 'entree', 5, "lot"),
+        (produit_id, 'sortie', 500, "lot"),
+        (produit_id, 'sortie', 2, "lot"),
+    ]
+    resultat = stock_service.enregistrer_lot(lignes, mode=mode)
+
+    assert resultat['appliquees'] == appliquees
+    assert resultat['rejetees'] == 1
+    assert [l['statut'] for l in resultat['lignes']][1] == 'rejetee'
+    assert quantite(base, produit_id) == stock_final
+    assert nb_mouvements(base, produit_id) == appliquees